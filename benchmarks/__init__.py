@@ -0,0 +1 @@
+"""Measures the puzzle entry points at growing input scales, see python -m benchmarks --help."""
@@ -0,0 +1,66 @@
+import argparse
+import sys
+
+from benchmarks.suite import (ENTRY_VARIANT, format_measurements, get_regressions, get_variant_names, load_baseline,
+                              REGRESSION_THRESHOLD, REPEAT, REPEAT_SWEEP, run_suite, save_baseline, SCALES, SWEEPS,
+                              WARMUP)
+from runner.registry import parse_puzzle_keys
+
+
+def main(argv: list | None = None) -> int:
+    """Runs the benchmark suite, prints the measurements and checks them against a baseline.
+    Returns 1 when a measurement regressed, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Benchmarks the puzzles' entry points and variants on growing inputs.")
+    parser.add_argument('puzzles', nargs='*',
+                        help="puzzles to benchmark, '3' for both parts of day 3 or '3.2' for part 2 only; default all")
+    parser.add_argument('-s', '--scales', type=int, nargs='+', default=list(SCALES),
+                        help='input scales, each the real input repeated that many times (default: %(default)s)')
+    parser.add_argument('-v', '--variants', nargs='+', default=[ENTRY_VARIANT], choices=get_variant_names(),
+                        metavar='VARIANT',
+                        help="variants to time, e.g. 'bisect' or 'parallel', or 'all'; a variant is timed for the "
+                             'puzzles that have it (choices: %(choices)s; default: %(default)s)')
+    parser.add_argument('--sweeps', nargs='+', default=[REPEAT_SWEEP], choices=[REPEAT_SWEEP, *SWEEPS],
+                        help=f"inputs to time on: '{REPEAT_SWEEP}' for the real input at every scale, or a sweep of "
+                             "generated inputs for its day's puzzles (choices: %(choices)s; default: %(default)s)")
+    parser.add_argument('-r', '--repeat', type=int, default=REPEAT,
+                        help='timed calls per measurement, of which the best is kept (default: %(default)s)')
+    parser.add_argument('--warmup', type=int, default=WARMUP,
+                        help='untimed calls before the timed ones (default: %(default)s)')
+    parser.add_argument('-b', '--baseline', help='JSON baseline to compare the measurements with')
+    parser.add_argument('-t', '--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='fraction over the baseline that counts as a regression (default: %(default)s)')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write the measurements to PATH as the new baseline')
+    parser.add_argument('--inputs', metavar='DIRECTORY',
+                        help='keep the inputs in DIRECTORY and reuse the generated ones in later runs; '
+                             'by default they are written to a temporary directory and removed')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='worker processes; more than one makes the timings contend (default: %(default)s)')
+    arguments = parser.parse_args(argv)
+
+    try:
+        keys = parse_puzzle_keys(arguments.puzzles)
+    except ValueError as error:
+        parser.error(str(error))
+
+    measurements = run_suite(keys, tuple(arguments.scales), arguments.inputs, arguments.workers,
+                             variants=tuple(arguments.variants), sweeps=tuple(arguments.sweeps),
+                             repeat=arguments.repeat, warmup=arguments.warmup)
+    print(format_measurements(measurements))
+
+    if arguments.save_baseline:
+        save_baseline(measurements, arguments.save_baseline)
+
+    if arguments.baseline:
+        regressions = get_regressions(measurements, load_baseline(arguments.baseline), arguments.threshold)
+        for regression in regressions:
+            print('Regression:', regression)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,327 @@
+import json
+import math
+import os
+import shutil
+import statistics
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from generators.inputs import GENERATORS, write_input
+from runner.registry import get_input_file, load_module, PUZZLES
+from runner.run import get_peak_rss_kb
+
+SCALES = (1, 10, 100, 1000)
+# A measurement regresses when it is this fraction slower, or bigger, than its baseline
+REGRESSION_THRESHOLD = 0.25
+# Every measurement is the best of REPEAT timed calls, after WARMUP untimed calls that import and page in everything
+REPEAT = 3
+WARMUP = 1
+
+# A way of solving a puzzle: its name, the function of the solver module and the arguments after the input file
+Variant = namedtuple('Variant', ['name', 'function', 'arguments'])
+ENTRY_VARIANT = 'entry'  # The puzzle's entry function from the registry
+ALL_VARIANTS = 'all'
+# The variants of each puzzle besides its entry function. The parallel variants use every CPU,
+# but like their callers solve files under PARALLEL_MIN_BYTES in process.
+VARIANTS = {
+    (1, 1): (Variant('batch', 'get_sum_digit_values_batch', ()),
+             Variant('parallel', 'get_sum_digit_values_parallel', ())),
+    (1, 2): (Variant('batch', 'get_sum_any_numeric_values_batch', ()),
+             Variant('parallel', 'get_sum_any_numeric_values_parallel', ())),
+    (2, 1): (Variant('parallel', 'get_sum_of_possible_game_numbers_parallel', (12, 13, 14)),),
+    (2, 2): (Variant('parallel', 'get_sum_of_power_of_minimum_required_cubes_for_each_color_parallel', ()),),
+    (3, 1): tuple(Variant(name, function, arguments) for name, function, arguments in (
+        ('linear', 'sum_of_part_numbers', ('linear',)),
+        ('bisect', 'sum_of_part_numbers', ('bisect',)),
+        ('grid', 'sum_of_part_numbers', ('grid',)),
+        ('streaming-linear', 'sum_of_part_numbers_streaming', ('linear',)),
+        ('streaming-bisect', 'sum_of_part_numbers_streaming', ('bisect',)),
+        ('parallel-linear', 'sum_of_part_numbers', ('linear', None)),
+        ('parallel-bisect', 'sum_of_part_numbers', ('bisect', None)))),
+    (3, 2): tuple(Variant(name, function, arguments) for name, function, arguments in (
+        ('linear', 'sum_of_gear_ratios', ('linear',)),
+        ('bisect', 'sum_of_gear_ratios', ('bisect',)),
+        ('grid', 'sum_of_gear_ratios', ('grid',)),
+        ('streaming-linear', 'sum_of_gear_ratios_streaming', ('linear',)),
+        ('streaming-bisect', 'sum_of_gear_ratios_streaming', ('bisect',)),
+        ('parallel-linear', 'sum_of_gear_ratios', ('linear', None)),
+        ('parallel-bisect', 'sum_of_gear_ratios', ('bisect', None)))),
+    (4, 1): (Variant('batch', 'get_results_batch', ()),
+             Variant('parallel', 'get_results_parallel', ())),
+}
+
+REPEAT_SWEEP = 'repeat'  # The real input repeated vertically, once for each of the scales
+# Synthetic inputs that vary one knob of a day's generator, at a fixed size and the other knobs' defaults
+Sweep = namedtuple('Sweep', ['day', 'knob', 'values', 'size', 'knobs'])
+SWEEPS = {
+    'width': Sweep(3, 'width', (140, 1400, 14000, 140000), 140, {}),  # Up to rows 1000 times as wide as the real ones
+    'number_rate': Sweep(3, 'number_rate', (0.05, 0.1, 0.2, 0.4), 1400, {}),
+    'symbol_rate': Sweep(3, 'symbol_rate', (0.05, 0.1, 0.2, 0.4), 1400, {}),
+    'cards': Sweep(4, 'size', (1000, 10_000, 100_000, 1_000_000, 10_000_000), 1000, {}),  # The real input has 209
+}
+
+Measurement = namedtuple('Measurement', ['day', 'part', 'scale', 'lines', 'wall', 'lines_per_second', 'peak_rss_kb',
+                                         'variant', 'sweep', 'median'],
+                         defaults=[ENTRY_VARIANT, REPEAT_SWEEP, None])
+
+
+def get_measurement_key(measurement: Measurement) -> str:
+    """Names a measurement by its puzzle, its variant unless it is the entry function, and its input.
+    Returns the key of the measurement in a baseline.
+    >>> get_measurement_key(Measurement(3, 1, 100, 14000, 0.1, 140000, 0))
+    '3.1x100'
+    >>> get_measurement_key(Measurement(3, 1, 1400, 140, 0.1, 1400, 0, 'bisect', 'width'))
+    '3.1:bisect width=1400'
+    """
+    key = f'{measurement.day}.{measurement.part}'
+    if measurement.variant != ENTRY_VARIANT:
+        key += f':{measurement.variant}'
+    if measurement.sweep == REPEAT_SWEEP:
+        return f'{key}x{measurement.scale}'
+
+    return f'{key} {measurement.sweep}={measurement.scale}'
+
+
+def get_variants(day: int, part: int, names: Tuple[str, ...] = (ENTRY_VARIANT,)) -> List[Variant]:
+    """Picks the variants of a puzzle by name, ENTRY_VARIANT for its entry function or ALL_VARIANTS for every one.
+    Names the puzzle has no variant for are skipped, since most variants exist for some puzzles only.
+    Returns the list of Variants in VARIANTS order, after the entry function.
+    >>> [variant.name for variant in get_variants(3, 1, ('grid', 'batch', ENTRY_VARIANT))]
+    ['entry', 'grid']
+    >>> [variant.name for variant in get_variants(4, 1, (ALL_VARIANTS,))]
+    ['entry', 'batch', 'parallel']
+    """
+    puzzle = PUZZLES[(day, part)]
+    variants = [Variant(ENTRY_VARIANT, puzzle.function, puzzle.arguments)] + list(VARIANTS.get((day, part), ()))
+
+    return [variant for variant in variants if ALL_VARIANTS in names or variant.name in names]
+
+
+def get_variant_names() -> List[str]:
+    """Returns the names that get_variants accepts."""
+    names = [ENTRY_VARIANT, ALL_VARIANTS]
+    for variants in VARIANTS.values():
+        names.extend(variant.name for variant in variants if variant.name not in names)
+
+    return names
+
+
+def write_scaled_input(day: int, part: int, scale: int, directory: str) -> Tuple[str, int]:
+    """Writes a puzzle's real input repeated scale times, one copy after the other, into directory.
+    Repeating whole copies keeps every line valid, and for day03 stacks the schematic vertically.
+    Returns the path of the scaled input and its number of lines.
+    >>> import tempfile
+    >>> directory = tempfile.mkdtemp()
+    >>> path, lines = write_scaled_input(3, 1, 10, directory)
+    >>> lines
+    1400
+    >>> shutil.rmtree(directory)
+    """
+    with open(get_input_file(day, part), 'rb') as f:
+        data = f.read()
+    if not data.endswith(b'\n'):
+        data += b'\n'
+
+    path = os.path.join(directory, f'day{day:02d}-problem{part:02d}-x{scale}.txt')
+    with open(path, 'wb') as f:
+        for _ in range(scale):
+            f.write(data)
+
+    return path, data.count(b'\n') * scale
+
+
+def write_generated_input(sweep: str, value: int | float, directory: str) -> Tuple[str, int]:
+    """Writes the input of the SWEEPS sweep at one value of its knob into directory, with the day's generator.
+    The generators are seeded, so an input already in directory is reused rather than generated again,
+    which saves minutes for the largest card counts.
+    Returns the path of the generated input and its number of lines, one per row or card.
+    >>> import tempfile
+    >>> directory = tempfile.mkdtemp()
+    >>> path, lines = write_generated_input('width', 1400, directory)
+    >>> lines, os.path.getsize(path)
+    (140, 196140)
+    >>> shutil.rmtree(directory)
+    """
+    day, knob, _, size, knobs = SWEEPS[sweep]
+    arguments = {'size': size, **knobs, knob: value}
+
+    path = os.path.join(directory, f'day{day:02d}-{sweep}-{value}.txt')
+    if not os.path.exists(path):
+        temporary_path = f'{path}.{os.getpid()}.tmp'  # An interrupted run leaves no partial input to reuse
+        write_input(temporary_path, GENERATORS[day](**arguments))
+        os.replace(temporary_path, path)
+
+    return path, arguments['size']
+
+
+def measure(day: int, part: int, file: str, scale: int | float, lines: int, variant: Variant | None = None,
+            sweep: str = REPEAT_SWEEP, repeat: int = REPEAT, warmup: int = WARMUP) -> Measurement:
+    """Times a variant of a puzzle, its entry function by default, on file: warmup untimed calls,
+    then repeat timed calls of which the best is the wall time. The best call is the one least disturbed
+    by the rest of the machine; the median shows how noisy the calls were. With the parse cache turned on
+    every timed call after the first is a cache hit.
+    Meant to run in a fresh worker process, so the peak RSS belongs to this measurement alone.
+    Returns the Measurement.
+    """
+    if variant is None:
+        variant = get_variants(day, part)[0]
+    function = getattr(load_module(day, part), variant.function)
+
+    for _ in range(warmup):
+        function(file, *variant.arguments)
+
+    timings = []
+    for _ in range(max(repeat, 1)):
+        wall = time.perf_counter()
+        function(file, *variant.arguments)
+        timings.append(time.perf_counter() - wall)
+    wall = min(timings)
+
+    return Measurement(day, part, scale, lines, wall, lines / wall if wall > 0 else math.inf, get_peak_rss_kb(),
+                       variant.name, sweep, statistics.median(timings))
+
+
+def run_suite(keys: List[Tuple[int, int]], scales: Tuple[int, ...] = SCALES, directory: str | None = None,
+              workers: int = 1, variants: Tuple[str, ...] = (ENTRY_VARIANT,), sweeps: Tuple[str, ...] = (REPEAT_SWEEP,),
+              repeat: int = REPEAT, warmup: int = WARMUP) -> List[Measurement]:
+    """Uses measure on the variants picked by get_variants of every (day, part) key, for each of the sweeps:
+    REPEAT_SWEEP times the real input from write_scaled_input at every scale, and a SWEEPS name times
+    the inputs from write_generated_input at every value of its knob, for the keys of the sweep's day.
+    Each measurement runs in a fresh worker process. The default single worker keeps the timings
+    free of contention; the inputs are written to directory, or a temporary one that is removed.
+    Returns the list of Measurements by sweep, puzzle, variant, then scale.
+    >>> [(m.scale, m.lines) for m in run_suite([(1, 1)], scales=(1, 2))]
+    [(1, 1000), (2, 2000)]
+    >>> [(m.variant, m.scale) for m in run_suite([(3, 2)], scales=(1, 2), variants=('bisect', 'streaming-bisect'), \
+repeat=1, warmup=0)]
+    [('bisect', 1), ('bisect', 2), ('streaming-bisect', 1), ('streaming-bisect', 2)]
+    """
+    import tempfile
+
+    owned_directory = directory is None
+    if owned_directory:
+        directory = tempfile.mkdtemp(prefix='benchmarks-')
+    else:
+        os.makedirs(directory, exist_ok=True)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as executor:
+            futures = []
+            for sweep in sweeps:
+                inputs = {}
+                for day, part in keys:
+                    if sweep == REPEAT_SWEEP:
+                        sweep_inputs = [(scale, *write_scaled_input(day, part, scale, directory)) for scale in scales]
+                    elif SWEEPS[sweep].day == day:
+                        for value in SWEEPS[sweep].values:
+                            if value not in inputs:
+                                inputs[value] = write_generated_input(sweep, value, directory)
+                        sweep_inputs = [(value, *inputs[value]) for value in SWEEPS[sweep].values]
+                    else:
+                        continue
+
+                    for variant in get_variants(day, part, variants):
+                        for scale, file, lines in sweep_inputs:
+                            futures.append(executor.submit(measure, day, part, file, scale, lines, variant, sweep,
+                                                           repeat, warmup))
+            return [future.result() for future in futures]
+    finally:
+        if owned_directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def get_scaling_exponents(measurements: List[Measurement]) -> Dict[str, float]:
+    """Estimates how the time of each puzzle variant grows between successive scales of a sweep, as the exponent k
+    in time ~ scale ** k: about 1 for linear work and 2 for quadratic work.
+    Returns the exponent of each measurement after the first scale of its series, by measurement key.
+    >>> get_scaling_exponents([Measurement(3, 1, 1, 140, 0.01, 14000, 0), Measurement(3, 1, 10, 1400, 0.1, 14000, 0), \
+Measurement(3, 1, 100, 14000, 10.0, 1400, 0)])
+    {'3.1x10': 1.0, '3.1x100': 2.0}
+    """
+    exponents = {}
+    previous = None
+
+    for measurement in measurements:
+        if previous is not None and previous.wall > 0 and measurement.wall > 0 and previous.scale != measurement.scale \
+                and (previous.day, previous.part, previous.variant, previous.sweep) \
+                == (measurement.day, measurement.part, measurement.variant, measurement.sweep):
+            exponent = math.log(measurement.wall / previous.wall) / math.log(measurement.scale / previous.scale)
+            exponents[get_measurement_key(measurement)] = round(exponent, 2)
+        previous = measurement
+
+    return exponents
+
+
+def save_baseline(measurements: List[Measurement], path: str) -> None:
+    """Writes the measurements to path as a JSON baseline keyed by get_measurement_key."""
+    baseline = {get_measurement_key(measurement): measurement._asdict() for measurement in measurements}
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> Dict[str, dict]:
+    """Returns the JSON baseline saved by save_baseline at path."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def get_regressions(measurements: List[Measurement], baseline: Dict[str, dict],
+                    threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Compares the wall time and peak RSS of every measurement with its baseline entry,
+    ignoring measurements the baseline does not have.
+    Returns a message for every value more than threshold worse than its baseline.
+    >>> baseline = {'3.1x10': {'wall': 0.1, 'peak_rss_kb': 1000}}
+    >>> get_regressions([Measurement(3, 1, 10, 1400, 0.2, 7000, 1100)], baseline)
+    ['3.1x10 wall 0.2000 s is 100% over the baseline 0.1000 s']
+    >>> get_regressions([Measurement(3, 1, 10, 1400, 0.2, 7000, 1100)], baseline, threshold=1.5)
+    []
+    """
+    regressions = []
+
+    for measurement in measurements:
+        key = get_measurement_key(measurement)
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+
+        for field, value_format in (('wall', '{:.4f} s'), ('peak_rss_kb', '{:.0f} kB')):
+            value, expected_value = getattr(measurement, field), expected.get(field)
+            if value is None or not expected_value:
+                continue
+            if value > expected_value * (1 + threshold):
+                regressions.append(f'{key} {field} {value_format.format(value)} is {value / expected_value - 1:.0%} '
+                                   f'over the baseline {value_format.format(expected_value)}')
+
+    return regressions
+
+
+def format_measurements(measurements: List[Measurement]) -> str:
+    """Lays out the measurements as a table with a row per puzzle, variant and input, including the best
+    and median wall times and the scaling exponent.
+    Returns the table.
+    >>> print(format_measurements([Measurement(3, 1, 1, 140, 0.01, 14000, 20480), \
+Measurement(3, 1, 10, 1400, 0.1, 14000, 20480, median=0.12), \
+Measurement(3, 1, 1400, 140, 0.02, 7000, 20480, 'bisect', 'width', 0.02)]))
+    puzzle variant                         input      lines    best s  median s      lines/s   exponent   peak RSS
+       3.1 entry                              x1        140    0.0100                  14000               20.0 MB
+       3.1 entry                             x10       1400    0.1000    0.1200        14000       1.00    20.0 MB
+       3.1 bisect                     width=1400        140    0.0200    0.0200         7000               20.0 MB
+    """
+    exponents = get_scaling_exponents(measurements)
+    lines = [f'{"puzzle":>6} {"variant":<16} {"input":>20} {"lines":>10} {"best s":>9} {"median s":>9} '
+             f'{"lines/s":>12} {"exponent":>10} {"peak RSS":>10}']
+
+    for measurement in measurements:
+        exponent = exponents.get(get_measurement_key(measurement))
+        exponent = f'{exponent:.2f}' if exponent is not None else ''
+        median = f'{measurement.median:.4f}' if measurement.median is not None else ''
+        peak = f'{measurement.peak_rss_kb / 1024:7.1f} MB' if measurement.peak_rss_kb is not None else ''
+        scale = f'x{measurement.scale}' if measurement.sweep == REPEAT_SWEEP else \
+            f'{measurement.sweep}={measurement.scale}'
+        lines.append(f'{measurement.day:>4}.{measurement.part} {measurement.variant:<16} {scale:>20} '
+                     f'{measurement.lines:>10} {measurement.wall:>9.4f} {median:>9} '
+                     f'{measurement.lines_per_second:>12.0f} {exponent:>10} {peak:>10}')
+
+    return '\n'.join(lines)
@@ -0,0 +1 @@
+"""Helpers shared by the solvers under day*/problem*/main.py."""
@@ -0,0 +1,21 @@
+try:
+    import numpy as np
+except ImportError:  # Only the batch functions call these helpers, and only once NumPy is known to be installed
+    np = None
+
+
+def get_line_bounds(data: 'np.ndarray') -> ():
+    """Finds the start and end offsets of every line in a uint8 buffer from its newline positions.
+    A final line without a trailing newline is included.
+    Returns a tuple of the start offsets and the (exclusive) end offsets.
+    >>> get_line_bounds(np.frombuffer(b'ab\\ncde\\nf', dtype=np.uint8))
+    (array([0, 3, 7]), array([2, 6, 8]))
+    >>> get_line_bounds(np.frombuffer(b'', dtype=np.uint8))
+    (array([], dtype=int64), array([], dtype=int64))
+    """
+    ends = np.flatnonzero(data == ord('\n'))
+    if len(data) > 0 and (len(ends) == 0 or ends[-1] != len(data) - 1):
+        ends = np.append(ends, len(data))
+    starts = np.concatenate(([0], ends[:-1] + 1)) if len(ends) > 0 else ends.copy()
+
+    return starts, ends
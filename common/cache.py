@@ -0,0 +1,174 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from typing import Callable, List, Sequence
+
+# Set to a directory to cache parsed inputs between runs; caching is off when it is not set
+CACHE_DIR_VARIABLE = 'AOC_PARSE_CACHE'
+
+CACHE_MAGIC = b'AOCPARSE'
+# Magic, number of arrays, then a typecode and an item count per array; the data follows, 8-byte aligned
+HEADER_FORMAT = '<8sI'
+ARRAY_HEADER_FORMAT = '<cQ'
+ALIGNMENT = 8
+
+
+def pack_integers(values: Sequence[int]) -> array:
+    """Packs integers into an array for cached_arrays: array('q') when they all fit in a signed 64-bit integer,
+    otherwise their decimal text, one value per line, in an array('B') that unpack_integers turns back into ints.
+    Returns the array.
+    >>> pack_integers([467, 35])
+    array('q', [467, 35])
+    >>> bytes(pack_integers([467, 12345678901234567890]))
+    b'467\\n12345678901234567890'
+    """
+    try:
+        return array('q', values)
+    except OverflowError:
+        return array('B', b'\n'.join(str(value).encode() for value in values))
+
+
+def unpack_integers(values: array | memoryview) -> Sequence[int]:
+    """Reverses pack_integers on an array or on its cached memoryview.
+    Returns the 64-bit values as they are, or the list of the integers written as text.
+    >>> list(unpack_integers(pack_integers([467, 35])))
+    [467, 35]
+    >>> unpack_integers(memoryview(pack_integers([467, 12345678901234567890])))
+    [467, 12345678901234567890]
+    """
+    typecode = values.typecode if isinstance(values, array) else values.format
+    if typecode != 'B':
+        return values
+
+    return [int(value) for value in bytes(values).split(b'\n')] if len(values) > 0 else []
+
+
+def get_cache_dir() -> str | None:
+    """Reads the cache directory from the CACHE_DIR_VARIABLE environment variable.
+    Returns the directory, or None when caching is off.
+    """
+    return os.environ.get(CACHE_DIR_VARIABLE) or None
+
+
+def get_content_hash(file: str) -> str:
+    """Hashes the contents of file, so a cache entry is found again only while the input is unchanged.
+    Returns the hex SHA-256 digest.
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile('wb', suffix='.txt', delete=False) as f:
+    ...     _ = f.write(b'abc')
+    >>> get_content_hash(f.name)[:16]
+    'ba7816bf8f01cfea'
+    >>> os.remove(f.name)
+    """
+    with open(file, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def get_cache_path(file: str, name: str, version: int, cache_dir: str) -> str:
+    """Names the cache entry of the name parser at version for the contents of file.
+    Returns the path of the entry in cache_dir.
+    """
+    return os.path.join(cache_dir, f'{name}-v{version}-{get_content_hash(file)}.bin')
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def store_arrays(path: str, arrays: Sequence[array]) -> None:
+    """Writes the arrays to path in the cache format, through a temporary file
+    so a concurrent reader never sees a partial entry.
+    """
+    header = struct.pack(HEADER_FORMAT, CACHE_MAGIC, len(arrays))
+    header += b''.join(struct.pack(ARRAY_HEADER_FORMAT, values.typecode.encode(), len(values)) for values in arrays)
+
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as f:
+        f.write(header)
+        for values in arrays:
+            f.write(b'\0' * (_align(f.tell()) - f.tell()))
+            values.tofile(f)
+    os.replace(temporary_path, path)
+
+
+def load_arrays(path: str) -> List[memoryview] | None:
+    """Memory-maps a cache entry written by store_arrays and casts each array's bytes in place.
+    Nothing is read or copied until the values are used; the mapping stays open while any view is alive.
+    Returns the list of typed memoryviews, or None if there is no valid entry at path.
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):  # No entry, or an empty one
+        return None
+
+    view = memoryview(mapped)
+    try:
+        magic, count = struct.unpack_from(HEADER_FORMAT, view)
+        if magic != CACHE_MAGIC:
+            return None
+
+        offset = struct.calcsize(HEADER_FORMAT)
+        array_headers = []
+        for _ in range(count):
+            typecode, length = struct.unpack_from(ARRAY_HEADER_FORMAT, view, offset)
+            array_headers.append((typecode.decode(), length))
+            offset += struct.calcsize(ARRAY_HEADER_FORMAT)
+
+        arrays = []
+        for typecode, length in array_headers:
+            offset = _align(offset)
+            size = length * array(typecode).itemsize
+            if offset + size > len(view):
+                return None
+            arrays.append(view[offset:offset + size].cast(typecode))
+            offset += size
+    except struct.error:  # A truncated entry
+        return None
+
+    return arrays
+
+
+def cached_arrays(file: str, name: str, version: int, parse: Callable[[str], Sequence[array]],
+                  cache_dir: str | None = None) -> Sequence[array] | List[memoryview]:
+    """Uses parse(file) to build the arrays of a parsed input, unless they are already cached.
+    Entries are keyed by the name of the parser, its version and the hash of the file contents, so bumping
+    version or changing the file misses the old entries. cache_dir defaults to get_cache_dir();
+    without a cache directory parse is always called.
+    Returns the arrays from parse, or zero-copy typed memoryviews of the cached arrays from load_arrays.
+    >>> import tempfile
+    >>> directory = tempfile.mkdtemp()
+    >>> with tempfile.NamedTemporaryFile('wb', suffix='.txt', delete=False) as f:
+    ...     _ = f.write(b'1 2 3\\n')
+    >>> def parse(file):
+    ...     print('Parsing')
+    ...     return [array('i', [1, 2, 3]), array('B', [7])]
+    >>> cached_arrays(f.name, 'numbers', 1, parse, directory)
+    Parsing
+    [array('i', [1, 2, 3]), array('B', [7])]
+    >>> [values.tolist() for values in cached_arrays(f.name, 'numbers', 1, parse, directory)]
+    [[1, 2, 3], [7]]
+    >>> [values.tolist() for values in cached_arrays(f.name, 'numbers', 2, parse, directory)]
+    Parsing
+    [[1, 2, 3], [7]]
+    >>> import shutil
+    >>> shutil.rmtree(directory)
+    >>> os.remove(f.name)
+    """
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return parse(file)
+
+    path = get_cache_path(file, name, version, cache_dir)
+    arrays = load_arrays(path)
+    if arrays is not None:
+        return arrays
+
+    arrays = parse(file)
+    os.makedirs(cache_dir, exist_ok=True)
+    store_arrays(path, arrays)
+
+    return arrays
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Iterator
+
+# Set to a file path to turn the shared instrumentation on for a whole main.py run,
+# whose run_entry writes the recorded data there as JSON
+INSTRUMENTATION_VARIABLE = 'AOC_INSTRUMENT'
+
+
+class Instrumentation:
+    """Named counters, value distributions and per-stage timers for the solvers' hot paths.
+    Nothing is recorded until it is enabled, and callers guard every update with `if instrumentation.enabled:`,
+    so a disabled run pays a single attribute check where it used to check its debug flags.
+    >>> probe = Instrumentation()
+    >>> probe.enabled
+    False
+    >>> probe.enable()
+    >>> probe.count('day03.lines_parsed')
+    >>> probe.count('day03.spans_found', 3)
+    >>> with probe.stage('day03.parse'):
+    ...     pass
+    >>> probe.record('day03.adjacency_comparisons_per_row', 4)
+    >>> probe.record('day03.adjacency_comparisons_per_row', 2)
+    >>> probe.to_dict()['counters']
+    {'day03.lines_parsed': 1, 'day03.spans_found': 3}
+    >>> probe.to_dict()['distributions']
+    {'day03.adjacency_comparisons_per_row': {'count': 2, 'total': 6, 'mean': 3.0, 'min': 2, 'max': 4}}
+    >>> probe.to_dict()['stages']['day03.parse']['calls']
+    1
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.counters = Counter()
+        self.distributions = {}  # [count, total, minimum, maximum] by name
+        self.stage_seconds = defaultdict(float)
+        self.stage_calls = Counter()
+
+    def enable(self, enabled: bool = True) -> None:
+        """Turns recording on, or off with enabled=False, keeping what was recorded so far."""
+        self.enabled = enabled
+
+    def reset(self) -> None:
+        """Forgets all counters, distributions and timers."""
+        self.counters.clear()
+        self.distributions.clear()
+        self.stage_seconds.clear()
+        self.stage_calls.clear()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Adds amount to the counter name."""
+        self.counters[name] += amount
+
+    def record(self, name: str, value: int | float) -> None:
+        """Adds value to the distribution name, which keeps the count, total, minimum and maximum of its values."""
+        distribution = self.distributions.get(name)
+        if distribution is None:
+            self.distributions[name] = [1, value, value, value]
+        else:
+            distribution[0] += 1
+            distribution[1] += value
+            distribution[2] = min(distribution[2], value)
+            distribution[3] = max(distribution[3], value)
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] += time.perf_counter() - start
+            self.stage_calls[name] += 1
+
+    def stage(self, name: str) -> ContextManager:
+        """Times the body of a with statement as the stage name, adding up repeated calls.
+        Returns a context manager, which does nothing while recording is off.
+        """
+        if not self.enabled:
+            return nullcontext()
+
+        return self._timed(name)
+
+    def to_dict(self) -> dict:
+        """Returns the counters, the distributions and the seconds and calls of every stage, sorted by name."""
+        return {
+            'counters': dict(sorted(self.counters.items())),
+            'distributions': {name: {'count': count, 'total': total, 'mean': total / count, 'min': minimum,
+                                     'max': maximum}
+                              for name, (count, total, minimum, maximum) in sorted(self.distributions.items())},
+            'stages': {name: {'seconds': self.stage_seconds[name], 'calls': self.stage_calls[name]}
+                       for name in sorted(self.stage_seconds)},
+        }
+
+    def to_json(self, file: str | None = None) -> str:
+        """Exports to_dict as JSON, also writing it to file when one is given.
+        Returns the JSON text.
+        """
+        text = json.dumps(self.to_dict(), indent=2)
+        if file is not None:
+            with open(file, 'w') as f:
+                f.write(text)
+
+        return text
+
+
+# Shared by every solver, so one run collects the counters of all the functions it calls
+instrumentation = Instrumentation(bool(os.environ.get(INSTRUMENTATION_VARIABLE)))
@@ -0,0 +1,89 @@
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Tuple
+
+# Files smaller than this are reduced in the calling process
+PARALLEL_MIN_BYTES = 1 << 20
+# Extra chunks per worker even out the load when lines differ in cost
+CHUNKS_PER_WORKER = 4
+
+
+def get_chunk_offsets(file: str, chunk_count: int) -> List[Tuple[int, int]]:
+    """Splits file into at most chunk_count byte ranges of roughly equal size, each starting at the beginning of a line.
+    Returns a list of (start, end) tuples covering the whole file.
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile('wb', suffix='.txt', delete=False) as f:
+    ...     _ = f.write(b'aaaa\\nbb\\ncccccc\\nd\\n')
+    >>> get_chunk_offsets(f.name, 3)
+    [(0, 8), (8, 15), (15, 17)]
+    >>> get_chunk_offsets(f.name, 1)
+    [(0, 17)]
+    >>> os.remove(f.name)
+    """
+    with open(file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or chunk_count <= 1:
+            return [(0, size)]
+
+        offsets = [0]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for chunk in range(1, chunk_count):
+                newline = mapped.find(b'\n', max(size * chunk // chunk_count, offsets[-1]))
+                if newline == -1 or newline + 1 >= size:
+                    break
+                if newline + 1 > offsets[-1]:
+                    offsets.append(newline + 1)
+        offsets.append(size)
+
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def get_halo_offsets(file: str, start: int, end: int) -> Tuple[int, int]:
+    """Widens the newline-aligned byte range [start, end) of file by one whole line on each side,
+    for chunks whose lines also need their neighbouring lines, such as the rows of a grid.
+    Returns a (halo_start, halo_end) tuple; the range is not widened past the ends of the file.
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile('wb', suffix='.txt', delete=False) as f:
+    ...     _ = f.write(b'aaaa\\nbb\\ncccccc\\nd\\n')
+    >>> get_halo_offsets(f.name, 8, 15)
+    (5, 17)
+    >>> get_halo_offsets(f.name, 0, 8)
+    (0, 15)
+    >>> get_halo_offsets(f.name, 15, 17)
+    (8, 17)
+    >>> os.remove(f.name)
+    """
+    with open(file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if start >= end or size == 0:
+            return start, end
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            halo_start = mapped.rfind(b'\n', 0, start - 1) + 1 if start > 0 else 0
+            halo_end = end
+            if end < size:
+                newline = mapped.find(b'\n', end)
+                halo_end = size if newline == -1 else newline + 1
+
+    return halo_start, halo_end
+
+
+def reduce_chunks(file: str, reduce_chunk: Callable[[str, int, int], object],
+                  workers: int | None = None, min_bytes: int = PARALLEL_MIN_BYTES) -> list:
+    """Calls reduce_chunk(file, start, end) for newline-aligned chunks of file in a pool of worker processes.
+    reduce_chunk must be picklable, i.e. a module-level function or a functools.partial of one.
+    Files smaller than min_bytes, or a single worker, are reduced in this process as one chunk.
+    Returns the list of partial results in file order, for the caller to combine.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    size = os.path.getsize(file)
+    if workers <= 1 or size < min_bytes:
+        return [reduce_chunk(file, 0, size)]
+
+    offsets = get_chunk_offsets(file, workers * CHUNKS_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(reduce_chunk, file, start, end) for start, end in offsets]
+        return [future.result() for future in futures]
@@ -0,0 +1,196 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import tracemalloc
+from collections import Counter, defaultdict, namedtuple
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+from common.instrumentation import instrumentation, INSTRUMENTATION_VARIABLE
+
+# Set to a directory to profile the solve of a main.py entry point run through run_entry
+PROFILE_VARIABLE = 'AOC_PROFILE'
+# Set to a number of allocation sites to also trace memory allocations with tracemalloc
+PROFILE_MEMORY_VARIABLE = 'AOC_PROFILE_MEMORY'
+TOP_FUNCTIONS = 20
+# Collapsed stacks stop at this many frames, or where less than this fraction of the profile's time is spent,
+# and the deeper calls are folded into the last frame. cProfile records caller edges rather than stacks,
+# so every path through the call graph is a candidate stack, and their number grows exponentially with depth.
+MAX_STACK_DEPTH = 64
+MIN_STACK_SHARE = 1e-4
+
+# The return value of the profiled call, its pstats.Stats and the printed top-N report
+ProfileResult = namedtuple('ProfileResult', ['result', 'stats', 'report'])
+
+
+def get_function_label(function: Tuple[str, int, str]) -> str:
+    """Names a pstats function key (file, line, name) for a stack frame, with at most the last three parts of
+    the path so the solvers' main.py files can be told apart. Semicolons separate frames in collapsed stacks,
+    so they are replaced.
+    Returns the label.
+    >>> get_function_label(('/root/package/day03/problem01/main.py', 74, 'get_match_data'))
+    'day03/problem01/main.py:74(get_match_data)'
+    >>> get_function_label(('~', 0, "<method 'finditer' of 're.Pattern' objects>"))
+    "<method 'finditer' of 're.Pattern' objects>"
+    """
+    file, line, name = function
+    if file == '~':  # A built-in function
+        label = name
+    else:
+        label = f'{"/".join(Path(file).parts[-3:])}:{line}({name})'
+
+    return label.replace(';', ',')
+
+
+def get_collapsed_stacks(stats: pstats.Stats, max_depth: int = MAX_STACK_DEPTH,
+                         min_share: float = MIN_STACK_SHARE) -> Dict[str, float]:
+    """Rebuilds the call stacks of a profile from the caller edges that cProfile records, walking down from
+    the functions without callers. A function's own time is split between its stacks in proportion to the
+    cumulative time each caller spent in it, which is exact for functions with a single caller.
+    Recursive calls are folded into the outermost frame. A stack of max_depth frames, or with less than
+    min_share of the profile's total time, is not walked further: its whole time is counted as its own.
+    Each level of the walk then divides at most the total time between its stacks, so there are at most
+    max_depth / min_share of them however many paths the call graph has, and together they keep the
+    cumulative time of the functions without callers.
+    Returns the seconds of own time of every stack, keyed by its frames' labels joined with semicolons.
+    >>> def squares(n):
+    ...     return sum([i * i for i in range(n)])
+    >>> stats = profile_call(squares, 1000).stats
+    >>> stacks = get_collapsed_stacks(stats)
+    >>> any(stack.endswith('(squares);<built-in method builtins.sum>') for stack in stacks)
+    True
+    >>> max(stack.count(';') + 1 for stack in get_collapsed_stacks(stats, max_depth=2))
+    2
+    """
+    callees = defaultdict(list)
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees[caller].append((function, edge[3]))
+
+    stacks = Counter()
+    min_seconds = stats.total_tt * min_share
+
+    def walk(function, seconds, frames, path):
+        frames = frames + (get_function_label(function),)
+        if len(frames) >= max_depth or seconds < min_seconds:
+            stacks[';'.join(frames)] += seconds
+            return
+
+        own_seconds, cumulative_seconds = stats.stats[function][2:4]
+        children = [(callee, edge_seconds) for callee, edge_seconds in callees[function] if callee not in path]
+        # Under recursion the callees' cumulative times overlap, so they are scaled to fit in the caller's
+        spent = max(cumulative_seconds, own_seconds + sum(edge_seconds for _, edge_seconds in children))
+        share = seconds / spent if spent else 0.0
+
+        # The stack keeps the time its children do not get, including that of the recursive calls left out
+        stacks[';'.join(frames)] += seconds - sum(edge_seconds * share for _, edge_seconds in children)
+        for callee, edge_seconds in children:
+            walk(callee, edge_seconds * share, frames, path | {callee})
+
+    for function, (_, _, _, cumulative_seconds, callers) in stats.stats.items():
+        if not callers:
+            walk(function, cumulative_seconds, (), {function})
+
+    return dict(stacks)
+
+
+def format_collapsed_stacks(stacks: Dict[str, float]) -> str:
+    """Lays out stacks from get_collapsed_stacks in the collapsed format of flamegraph.pl, speedscope and
+    inferno: a line per stack with its frames joined by semicolons and its own time in microseconds.
+    Returns the text, leaving out stacks that round to no time.
+    >>> print(format_collapsed_stacks({'main;parse': 0.25, 'main': 0.0000001, 'main;solve': 0.5}), end='')
+    main;parse 250000
+    main;solve 500000
+    """
+    lines = [f'{stack} {round(seconds * 1_000_000)}' for stack, seconds in sorted(stacks.items())
+             if round(seconds * 1_000_000) > 0]
+
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def get_top_allocations(snapshot: tracemalloc.Snapshot, top: int) -> str:
+    """Lists the top allocation sites by size of a tracemalloc snapshot.
+    Returns the report.
+    """
+    lines = [f'Top {top} allocation sites by size:']
+    lines.extend(f'{statistic.size / 1024:>10.1f} KiB {statistic.count:>9} blocks  {statistic.traceback}'
+                 for statistic in snapshot.statistics('lineno')[:top])
+
+    return '\n'.join(lines) + '\n'
+
+
+def profile_call(function: Callable, *arguments: Any, output: str | None = None, top: int = TOP_FUNCTIONS,
+                 memory_top: int = 0) -> ProfileResult:
+    """Calls function with arguments under cProfile and reports the top functions by cumulative time.
+    With output the profile is also written to output.pstats, for pstats or snakeviz, and to output.collapsed,
+    with the stacks of get_collapsed_stacks for flamegraph tools. With memory_top the call is traced with
+    tracemalloc as well, and the report ends with that many top allocation sites.
+    Returns a ProfileResult with the return value of the call, the pstats.Stats and the report.
+    >>> def squares(n):
+    ...     return sum([i * i for i in range(n)])
+    >>> profiled = profile_call(squares, 1000, top=3, memory_top=1)
+    >>> profiled.result
+    332833500
+    >>> 'Ordered by: cumulative time' in profiled.report, 'Top 1 allocation sites by size:' in profiled.report
+    (True, True)
+    """
+    if memory_top:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(function, *arguments)
+    finally:
+        snapshot = tracemalloc.take_snapshot() if memory_top else None
+        if memory_top:
+            tracemalloc.stop()
+
+    report = io.StringIO()
+    stats = pstats.Stats(profiler, stream=report)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    if snapshot is not None:
+        report.write(get_top_allocations(snapshot, memory_top))
+
+    if output is not None:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        stats.dump_stats(f'{output}.pstats')
+        with open(f'{output}.collapsed', 'w') as f:
+            f.write(format_collapsed_stacks(get_collapsed_stacks(stats)))
+
+    return ProfileResult(result, stats, report.getvalue())
+
+
+def run_entry(function: Callable, *arguments: Any) -> Any:
+    """Calls a main.py entry function with arguments, profiling it with profile_call when the PROFILE_VARIABLE
+    environment variable names a directory. The profile files are named after the function in that directory,
+    and the report goes to stderr so the answer stays alone on stdout. When the INSTRUMENTATION_VARIABLE
+    environment variable names a file, the shared instrumentation recorded during the run is written there.
+    Returns the return value of the call.
+    >>> run_entry(sum, [1, 2, 3])
+    6
+    >>> import json, tempfile
+    >>> os.environ[INSTRUMENTATION_VARIABLE] = os.path.join(tempfile.mkdtemp(), 'instrumentation.json')
+    >>> run_entry(sum, [1, 2, 3])
+    6
+    >>> with open(os.environ.pop(INSTRUMENTATION_VARIABLE)) as f:
+    ...     sorted(json.load(f))
+    ['counters', 'distributions', 'stages']
+    """
+    directory = os.environ.get(PROFILE_VARIABLE)
+    if directory:
+        output = os.path.join(directory, function.__name__)
+        profiled = profile_call(function, *arguments, output=output,
+                                memory_top=int(os.environ.get(PROFILE_MEMORY_VARIABLE) or 0))
+        print(profiled.report, file=sys.stderr)
+        print(f'Profile written to {output}.pstats and {output}.collapsed', file=sys.stderr)
+        result = profiled.result
+    else:
+        result = function(*arguments)
+
+    instrumentation_file = os.environ.get(INSTRUMENTATION_VARIABLE)
+    if instrumentation_file:
+        instrumentation.to_json(instrumentation_file)
+        print(f'Instrumentation written to {instrumentation_file}', file=sys.stderr)
+
+    return result
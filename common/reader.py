@@ -0,0 +1,57 @@
+import mmap
+import os
+from pathlib import Path
+from typing import Iterator
+
+
+def get_module_file(module_file: str, *parts: str) -> str:
+    """Finds a file relative to the directory of module_file, usually a solver's __file__, rather than the
+    working directory, so its input and doctest files are found wherever it is run from.
+    Returns the absolute path.
+    >>> get_module_file('/root/package/day01/problem01/main.py', 'resources', 'input.txt')
+    '/root/package/day01/problem01/resources/input.txt'
+    """
+    return str(Path(module_file).resolve().parent.joinpath(*parts))
+
+
+def read_lines(file: str, start: int = 0, end: int | None = None) -> Iterator[memoryview]:
+    """Memory-maps file and yields each line as a memoryview slice of the mapping, without the line terminator.
+    Only the lines beginning in the byte range [start, end) are read; start should be the first byte of a line.
+    Nothing is decoded or copied; a slice is released as soon as the next line is requested,
+    so convert it with bytes() if it has to outlive the iteration.
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile('wb', suffix='.txt', delete=False) as f:
+    ...     _ = f.write(b'1abc2\\r\\npqr3stu8vwx\\n\\ntreb7uchet')
+    >>> [bytes(line) for line in read_lines(f.name)]
+    [b'1abc2', b'pqr3stu8vwx', b'', b'treb7uchet']
+    >>> [bytes(line) for line in read_lines(f.name, 7, 20)]
+    [b'pqr3stu8vwx', b'']
+    >>> os.remove(f.name)
+    """
+    with open(file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if end is None or end > size:
+            end = size
+        if start >= end:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            line = None
+            try:
+                while start < end:
+                    line_end = mapped.find(b'\n', start)
+                    if line_end == -1:
+                        line_end = size
+                    next_start = line_end + 1
+                    if line_end > start and mapped[line_end - 1] == ord('\r'):
+                        line_end -= 1
+
+                    line = view[start:line_end]
+                    yield line
+                    line.release()
+                    start = next_start
+            finally:
+                if line is not None:
+                    line.release()
+                view.release()
@@ -1,11 +1,38 @@
-import re
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterable
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed by the batch functions
+    np = None
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from common.arrays import get_line_bounds  # noqa: E402
+from common.cache import cached_arrays, get_cache_dir  # noqa: E402
+from common.instrumentation import instrumentation  # noqa: E402
+from common.parallel import PARALLEL_MIN_BYTES, reduce_chunks  # noqa: E402
+from common.profiling import run_entry  # noqa: E402
+from common.reader import get_module_file, read_lines  # noqa: E402
 
 # debug = True
 debug = False
 
+INPUT_FILE = get_module_file(__file__, 'resources', 'input.txt')
+TEST_FILE = get_module_file(__file__, 'tests', 'doctest-get_sum_digit_values.txt')
+
+PARSER_VERSION = 1  # Bump when get_line_values changes, so cached line values are not reused
+
+# Keyed by both the character and its byte value so lines can be str, bytes or memoryview
+DIGIT_VALUES = {**{str(digit): digit for digit in range(10)},
+                **{ord(str(digit)): digit for digit in range(10)}}
 
-def get_digit_value(line: str) -> int:
+
+def get_digit_value(line: str | bytes) -> int:
     """Gets the first and last numeric digits from a line.
+    Scans inward from both ends of the line so no intermediate strings are built.
     Returns the concatenated digits as a two-digit number.
     >>> get_digit_value("1abc2")
     12
@@ -15,37 +42,142 @@ def get_digit_value(line: str) -> int:
     15
     >>> get_digit_value("treb7uchet")
     77
+    >>> get_digit_value(b"pqr3stu8vwx")
+    38
+    >>> get_digit_value(memoryview(b"a1b2c3d4e5f"))
+    15
+    >>> get_digit_value("abc")
+    Traceback (most recent call last):
+    ...
+    ValueError: No digit found in line: 'abc'
+    >>> get_digit_value(memoryview(b"abc"))
+    Traceback (most recent call last):
+    ...
+    ValueError: No digit found in line: 'abc'
     """
-    rex = re.compile(r'\D+')
-    digits = re.sub(rex, '', line)
-    if debug:
-        print(digits)
+    first = None
+    for character in line:
+        first = DIGIT_VALUES.get(character)
+        if first is not None:
+            break
 
-    first, last = str(digits[0]), str(digits[-1])
-    # if debug:
-    #     print(first + last)
+    if first is None:
+        text = line if isinstance(line, str) else bytes(line).decode(errors='replace')  # Not a memoryview's repr
+        raise ValueError('No digit found in line: ' + repr(text))
 
-    value = int(first + last)
-    if debug:
-        print(value)
+    for character in reversed(line):
+        last = DIGIT_VALUES.get(character)
+        if last is not None:
+            break
+
+    value = first * 10 + last
+    if instrumentation.enabled:
+        instrumentation.count('day01.lines_parsed')
 
     return value
 
 
+def sum_digit_values(lines: Iterable[str | bytes]) -> int:
+    """Converts the first and last numeric digits from each line into a two-digit number.
+    Lines are consumed one at a time so the iterable can be a file, a generator or a list.
+    Returns the sum of all such numbers.
+    >>> sum_digit_values(["1abc2", "pqr3stu8vwx", "a1b2c3d4e5f", "treb7uchet"])
+    142
+    >>> sum_digit_values([b"1abc2\\n", b"treb7uchet\\n"])
+    89
+    """
+    total = 0
+    for line in lines:
+        total += get_digit_value(line)
+
+    return total
+
+
+def get_line_values(file: str) -> [array]:
+    """Converts the first and last numeric digits from each line in a file into a two-digit number.
+    Returns a list holding the array of the numbers of all lines, in the form cached by cached_arrays.
+    >>> get_line_values(TEST_FILE)
+    [array('B', [12, 38, 15, 77])]
+    """
+    with instrumentation.stage('day01.parse'):
+        return [array('B', (get_digit_value(line) for line in read_lines(file)))]
+
+
+def load_line_values(file: str) -> array | memoryview:
+    """Uses get_line_values, through the parse cache when it is turned on, to get the number of each line.
+    Returns the numbers of all lines in the file.
+    >>> list(load_line_values(TEST_FILE))
+    [12, 38, 15, 77]
+    """
+    return cached_arrays(file, 'day01-problem01-line-values', PARSER_VERSION, get_line_values)[0]
+
+
 def get_sum_digit_values(file: str) -> int:
+    """Converts the first and last numeric digits from each line in a file into a two-digit number
+    with sum_digit_values while the file is being read, so memory does not grow with the number of lines.
+    When the parse cache is turned on the numbers come from load_line_values instead,
+    so re-runs against an unchanged file skip the parsing.
+    Returns the sum of all such numbers in the file.
+    >>> get_sum_digit_values(TEST_FILE)
+    142
+    """
+    if get_cache_dir() is not None:
+        return sum(load_line_values(file))
+
+    with instrumentation.stage('day01.parse'):
+        return sum_digit_values(read_lines(file))
+
+
+def sum_digit_values_in_chunk(file: str, start: int, end: int) -> int:
+    """Uses sum_digit_values on the lines in the byte range [start, end) of a file.
+    Returns the sum for that chunk.
+    >>> sum_digit_values_in_chunk(TEST_FILE, 6, 30)
+    53
+    """
+    return sum_digit_values(read_lines(file, start, end))
+
+
+def get_sum_digit_values_parallel(file: str, workers: int | None = None,
+                                  min_bytes: int = PARALLEL_MIN_BYTES) -> int:
+    """Splits a file into newline-aligned chunks and uses sum_digit_values_in_chunk on each in a worker process.
+    Files smaller than min_bytes, or a single worker, are summed sequentially.
+    Returns the sum of all two-digit numbers in the file.
+    >>> get_sum_digit_values_parallel(TEST_FILE, workers=2, min_bytes=0)
+    142
+    """
+    return sum(reduce_chunks(file, sum_digit_values_in_chunk, workers, min_bytes))
+
+
+def get_sum_digit_values_batch(file: str) -> int:
     """Converts the first and last numeric digits from each line in a file into a two-digit number.
+    Reads the whole file as one uint8 buffer and finds the first and last digit of every line
+    with vectorized searches over the digit positions, so there is no per-line Python work.
+    Falls back to get_sum_digit_values when NumPy is not installed.
     Returns the sum of all such numbers in the file.
-    >>> get_sum_digit_values("tests/doctest-get_sum_digit_values.txt")
+    >>> get_sum_digit_values_batch(TEST_FILE)
     142
     """
-    values = []
+    if np is None:
+        return get_sum_digit_values(file)
+
+    data = np.fromfile(file, dtype=np.uint8)
+    starts, ends = get_line_bounds(data)
 
-    with open(file, 'r') as f:
-        for line in f:
-            values.append(get_digit_value(line))
-        f.close()
+    digit_positions = np.flatnonzero((data >= ord('0')) & (data <= ord('9')))
+    first_indexes = np.searchsorted(digit_positions, starts)
+    last_indexes = np.searchsorted(digit_positions, ends) - 1
+    if np.any(first_indexes > last_indexes):
+        line_number = int(np.argmax(first_indexes > last_indexes)) + 1
+        raise ValueError('No digit found in line ' + str(line_number))
+
+    first_digits = data[digit_positions[first_indexes]].astype(np.int64) - ord('0')
+    last_digits = data[digit_positions[last_indexes]].astype(np.int64) - ord('0')
+    total = int(first_digits.sum() * 10 + last_digits.sum())
+    if debug:
+        print(total)
 
-    return sum(values)
+    return total
 
 
-print(get_sum_digit_values('resources/input.txt'))
+if __name__ == '__main__':
+    print(run_entry(get_sum_digit_values, INPUT_FILE))
@@ -1,8 +1,28 @@
-# import re
-import regex as re
+import sys
+from array import array
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed by the batch functions
+    np = None
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from common.arrays import get_line_bounds  # noqa: E402
+from common.cache import cached_arrays, get_cache_dir  # noqa: E402
+from common.instrumentation import instrumentation  # noqa: E402
+from common.parallel import PARALLEL_MIN_BYTES, reduce_chunks  # noqa: E402
+from common.profiling import run_entry  # noqa: E402
+from common.reader import get_module_file, read_lines  # noqa: E402
 
 # debug = True
 debug = False
+
+INPUT_FILE = get_module_file(__file__, 'resources', 'input.txt')
+TEST_FILE = get_module_file(__file__, 'tests', 'doctest-get_sum_numeric_values.txt')
+
+PARSER_VERSION = 1  # Bump when get_line_values changes, so cached line values are not reused
 digit_words = {
     'one': 1,
     'two': 2,
@@ -14,11 +34,68 @@ digit_words = {
     'eight': 8,
     'nine': 9
 }
-rex = re.compile(r'(\d)|(one)|(two)|(three)|(four)|(five)|(six)|(seven)|(eight)|(nine)')
+digits_and_words = {**{str(digit): digit for digit in range(10)}, **digit_words}
+
+VALUE_KEY = 'Value'
+
 
+def build_trie(words: {str: int}) -> dict:
+    """Builds a trie of nested dictionaries from the words, storing each word's value under VALUE_KEY.
+    Every edge is keyed by both the character and its byte value so str and bytes lines walk the same trie.
+    Returns the root node of the trie.
+    >>> trie = build_trie({'one': 1, 'on': 9})
+    >>> trie['o'] is trie[ord('o')]
+    True
+    >>> trie['o']['n'][VALUE_KEY], trie['o']['n']['e'][VALUE_KEY]
+    (9, 1)
+    """
+    trie = {}
+    for word, value in words.items():
+        node = trie
+        for character in word:
+            child = node.get(character)
+            if child is None:
+                child = {}
+                node[character] = child
+                node[ord(character)] = child
+            node = child
+        node[VALUE_KEY] = value
+
+    return trie
+
+
+forward_trie = build_trie(digits_and_words)
+backward_trie = build_trie({word[::-1]: value for word, value in digits_and_words.items()})
+
+
+def match_at(line: str | bytes, position: int, trie: dict, step: int) -> int | None:
+    """Walks the trie over line starting at position, moving step characters at a time.
+    Returns the value of the first word completed, or None if the walk falls off the trie.
+    >>> match_at('xtwone', 1, forward_trie, 1)
+    2
+    >>> match_at('xtwone', 5, backward_trie, -1)
+    1
+    >>> match_at('xtwone', 0, forward_trie, 1)
+    """
+    node = trie
+    while 0 <= position < len(line):
+        node = node.get(line[position])
+        if node is None:
+            return None
 
-def get_numeric_value_of_digit_or_word(line: str) -> int:
+        value = node.get(VALUE_KEY)
+        if value is not None:
+            return value
+
+        position += step
+
+    return None
+
+
+def get_numeric_value_of_digit_or_word(line: str | bytes) -> int:
     """Gets the first and last numeric values whether expressed as a digit or word from a line.
+    The first value is found scanning forward with forward_trie and the last scanning backward
+    with backward_trie, so each line stops as soon as both ends are found.
     Returns the concatenated digits as a two-digit number.
     >>> get_numeric_value_of_digit_or_word("two1nine")
     29
@@ -36,48 +113,157 @@ def get_numeric_value_of_digit_or_word(line: str) -> int:
     76
     >>> get_numeric_value_of_digit_or_word("three98oneightzn")
     38
+    >>> get_numeric_value_of_digit_or_word(b"eightwoneight")
+    88
+    >>> get_numeric_value_of_digit_or_word(memoryview(b"xtwone3four"))
+    24
+    >>> get_numeric_value_of_digit_or_word("abc")
+    Traceback (most recent call last):
+    ...
+    ValueError: No digit or digit word found in line: 'abc'
+    >>> get_numeric_value_of_digit_or_word(memoryview(b"abc"))
+    Traceback (most recent call last):
+    ...
+    ValueError: No digit or digit word found in line: 'abc'
     """
-    digits = []
-    matches_list = re.findall(rex, line, overlapped=True)
-    # if debug:
-    #     print(matches_list)
-
-    for match_list in matches_list:
-        for match in match_list:
-            if match != '':
-                # if debug:
-                #     print(match)
-                digit = digit_words.get(match) if match in digit_words.keys() else match
-                # if debug:
-                #     print(digit)
-
-                digits.append(digit)
-
-    first, last = str(digits[0]), str(digits[-1])
-    # if debug:
-    #     print(first + last)
-
-    value = int(first + last)
-    if debug:
-        print(value)
+    first = None
+    for position in range(len(line)):
+        first = match_at(line, position, forward_trie, 1)
+        if first is not None:
+            break
+
+    if first is None:
+        text = line if isinstance(line, str) else bytes(line).decode(errors='replace')  # Not a memoryview's repr
+        raise ValueError('No digit or digit word found in line: ' + repr(text))
+
+    for position in range(len(line) - 1, -1, -1):
+        last = match_at(line, position, backward_trie, -1)
+        if last is not None:
+            break
+
+    value = first * 10 + last
+    if instrumentation.enabled:
+        instrumentation.count('day01.lines_parsed')
 
     return value
 
 
+def get_line_values(file: str) -> [array]:
+    """Converts the first and last numeric values from each line in a file into a two-digit number.
+    Returns a list holding the array of the numbers of all lines, in the form cached by cached_arrays.
+    >>> get_line_values(TEST_FILE)
+    [array('B', [29, 83, 13, 24, 42, 14, 76])]
+    """
+    with instrumentation.stage('day01.parse'):
+        return [array('B', (get_numeric_value_of_digit_or_word(line) for line in read_lines(file)))]
+
+
+def load_line_values(file: str) -> array | memoryview:
+    """Uses get_line_values, through the parse cache when it is turned on, to get the number of each line.
+    Returns the numbers of all lines in the file.
+    >>> list(load_line_values(TEST_FILE))
+    [29, 83, 13, 24, 42, 14, 76]
+    """
+    return cached_arrays(file, 'day01-problem02-line-values', PARSER_VERSION, get_line_values)[0]
+
+
 def get_sum_any_numeric_values(file: str) -> int:
+    """Converts the first and last numeric values from each line in a file into a two-digit number
+    with get_numeric_value_of_digit_or_word while the file is being read, so memory does not grow with the
+    number of lines. When the parse cache is turned on the numbers come from load_line_values instead,
+    so re-runs against an unchanged file skip the parsing.
+    Returns the sum of all such numbers in the file.
+    >>> get_sum_any_numeric_values(TEST_FILE)
+    281
+    """
+    if get_cache_dir() is not None:
+        return sum(load_line_values(file))
+
+    with instrumentation.stage('day01.parse'):
+        return sum(get_numeric_value_of_digit_or_word(line) for line in read_lines(file))
+
+
+def get_sum_any_numeric_values_in_chunk(file: str, start: int, end: int) -> int:
+    """Uses get_numeric_value_of_digit_or_word on the lines in the byte range [start, end) of a file.
+    Returns the sum for that chunk.
+    >>> get_sum_any_numeric_values_in_chunk(TEST_FILE, 9, 38)
+    96
+    """
+    total = 0
+    for line in read_lines(file, start, end):
+        total += get_numeric_value_of_digit_or_word(line)
+
+    return total
+
+
+def get_sum_any_numeric_values_parallel(file: str, workers: int | None = None,
+                                        min_bytes: int = PARALLEL_MIN_BYTES) -> int:
+    """Splits a file into newline-aligned chunks and uses get_sum_any_numeric_values_in_chunk on each
+    in a worker process. Files smaller than min_bytes, or a single worker, are summed sequentially.
+    Returns the sum of all two-digit numbers in the file.
+    >>> get_sum_any_numeric_values_parallel(TEST_FILE, workers=2, min_bytes=0)
+    281
+    """
+    return sum(reduce_chunks(file, get_sum_any_numeric_values_in_chunk, workers, min_bytes))
+
+
+def get_digit_or_word_values(data: 'np.ndarray') -> 'np.ndarray':
+    """Marks every position in a uint8 buffer where a digit or digit word starts.
+    Each word is detected by comparing the buffer against itself shifted by each letter offset.
+    Returns an int8 array holding the value starting at each position, or -1 where nothing starts.
+    >>> get_digit_or_word_values(np.frombuffer(b'xtwone3', dtype=np.uint8))
+    array([-1,  2, -1,  1, -1, -1,  3], dtype=int8)
+    """
+    values = np.full(len(data), -1, dtype=np.int8)
+
+    is_digit = (data >= ord('0')) & (data <= ord('9'))
+    values[is_digit] = data[is_digit] - ord('0')
+
+    for word, value in digit_words.items():
+        word_length = len(word)
+        if len(data) < word_length:
+            continue
+
+        candidate_count = len(data) - word_length + 1
+        is_word = data[:candidate_count] == ord(word[0])
+        for offset in range(1, word_length):
+            is_word &= data[offset:offset + candidate_count] == ord(word[offset])
+        values[:candidate_count][is_word] = value
+
+    return values
+
+
+def get_sum_any_numeric_values_batch(file: str) -> int:
     """Converts the first and last numeric values from each line in a file into a two-digit number.
+    Reads the whole file as one uint8 buffer, marks digits and digit words with get_digit_or_word_values
+    and picks the first and last value of every line with vectorized searches, so there is no per-line Python work.
+    Falls back to get_sum_any_numeric_values when NumPy is not installed.
     Returns the sum of all such numbers in the file.
-    >>> get_sum_any_numeric_values("tests/doctest-get_sum_numeric_values.txt")
+    >>> get_sum_any_numeric_values_batch(TEST_FILE)
     281
     """
-    values = []
+    if np is None:
+        return get_sum_any_numeric_values(file)
 
-    with open(file, 'r') as f:
-        for line in f:
-            values.append(get_numeric_value_of_digit_or_word(line))
-        f.close()
+    data = np.fromfile(file, dtype=np.uint8)
+    starts, ends = get_line_bounds(data)
+
+    values = get_digit_or_word_values(data)
+    value_positions = np.flatnonzero(values >= 0)
+    first_indexes = np.searchsorted(value_positions, starts)
+    last_indexes = np.searchsorted(value_positions, ends) - 1
+    if np.any(first_indexes > last_indexes):
+        line_number = int(np.argmax(first_indexes > last_indexes)) + 1
+        raise ValueError('No digit or digit word found in line ' + str(line_number))
+
+    first_values = values[value_positions[first_indexes]].astype(np.int64)
+    last_values = values[value_positions[last_indexes]].astype(np.int64)
+    total = int(first_values.sum() * 10 + last_values.sum())
+    if debug:
+        print(total)
 
-    return sum(values)
+    return total
 
 
-print(get_sum_any_numeric_values('resources/input.txt'))
+if __name__ == '__main__':
+    print(run_entry(get_sum_any_numeric_values, INPUT_FILE))
@@ -1,13 +1,96 @@
+import math
+import os
+import re
+import sys
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from functools import partial
+from itertools import accumulate
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from common.cache import cached_arrays  # noqa: E402
+from common.instrumentation import instrumentation  # noqa: E402
+from common.parallel import PARALLEL_MIN_BYTES, reduce_chunks  # noqa: E402
+from common.profiling import run_entry  # noqa: E402
+from common.reader import get_module_file, read_lines  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed to vectorize the column queries
+    np = None
+
 # debug = True
 debug = False
 
+INPUT_FILE = get_module_file(__file__, 'resources', 'input.txt')
+TEST_FILE = get_module_file(__file__, 'tests', 'doctest-get_sum_of_possible_game_numbers.txt')
+
 RED = 'red'
 GREEN = 'green'
 BLUE = 'blue'
 
+# Keyed by both the str and the bytes first letter of a color, as found by rex_cubes and rex_cubes_bytes
+COLOR_INDEXES = {
+    'r': 0, b'r': 0,
+    'g': 1, b'g': 1,
+    'b': 2, b'b': 2
+}
+
+rex_game = re.compile(r'Game (\d+)')
+rex_cubes = re.compile(r'(\d+) ([rgb])')
+rex_game_bytes = re.compile(rb'Game (\d+)')
+rex_cubes_bytes = re.compile(rb'(\d+) ([rgb])')
+
+GameColumns = namedtuple('GameColumns', ['game_numbers', 'red', 'green', 'blue'])
+PARSER_VERSION = 2  # Bump when parse_game_columns changes, so cached columns are not reused
+
+# Largest dominance table GameIndex builds before falling back to its red buckets
+MAX_INDEX_TABLE_CELLS = 1 << 22
+# A run of about the square root of the games, whole red maximums at a time, sorted by green maximum.
+# Every block_size games along it are a block, whose blue maximums are kept sorted with the running sums
+# of their game numbers: block_sums[b][i] is the sum of the game numbers of the i lowest blues of block b.
+RedBucket = namedtuple('RedBucket', ['reds', 'greens', 'blues', 'game_numbers', 'block_size', 'block_blues',
+                                     'block_sums'])
+
+# (modification time, GameIndex) by absolute file path, see get_game_index
+game_indexes = {}
 
-def get_maximum_number_of_cubes_for_each_color_in_game(game_line: str) -> ():
+
+def tokenize_game_line(game_line: str | bytes) -> (int, int, int, int):
+    """Finds every cube count and the first letter of its color with one findall of a compiled regex,
+    keeping the maximum for each color. The line can be str, bytes or a memoryview line slice from read_lines.
+    Returns a tuple of the game number and the maximum number of red, green and blue cubes.
+    >>> tokenize_game_line('Game 3: 8 green, 6 blue, 20 red; 5 blue, 4 red, 13 green; 5 green, 1 red')
+    (3, 20, 13, 6)
+    >>> tokenize_game_line(b'Game 100: 12 blue\\n')
+    (100, 0, 0, 12)
+    """
+    if isinstance(game_line, str):
+        game_rex, cubes_rex = rex_game, rex_cubes
+    else:
+        game_rex, cubes_rex = rex_game_bytes, rex_cubes_bytes
+
+    maximums = [0, 0, 0]
+    for number, color in cubes_rex.findall(game_line):
+        color_index = COLOR_INDEXES[color]
+        number = int(number)
+        if maximums[color_index] < number:
+            maximums[color_index] = number
+    game_number = int(game_rex.match(game_line).group(1))
+
+    if instrumentation.enabled:
+        instrumentation.count('day02.lines_parsed')
+
+    return game_number, maximums[0], maximums[1], maximums[2]
+
+
+def get_maximum_number_of_cubes_for_each_color_in_game(game_line: str | bytes) -> ():
     """Extracts the game number and the maximum number of cubes of each color found during the game.
+    Uses tokenize_game_line, so the line can also be bytes or a memoryview line slice from read_lines.
     Returns a tuple of the game number and a dictionary with the maximum number of cubes for each color.
     >>> get_maximum_number_of_cubes_for_each_color_in_game(\
     'Game 1: 3 blue, 4 red; 1 red, 2 green, 6 blue; 2 green')
@@ -24,24 +107,17 @@ def get_maximum_number_of_cubes_for_each_color_in_game(game_line: str) -> ():
     >>> get_maximum_number_of_cubes_for_each_color_in_game(\
     'Game 5: 6 red, 1 blue, 3 green; 2 blue, 1 red, 2 green')
     (5, {'red': 6, 'green': 3, 'blue': 2})
+    >>> get_maximum_number_of_cubes_for_each_color_in_game(\
+    memoryview(b'Game 12: 3 blue, 4 red; 1 red, 2 green, 6 blue; 2 green'))
+    (12, {'red': 4, 'green': 2, 'blue': 6})
     """
-    game_number_string, game_results_string = game_line.split(':')
+    game_number, red, green, blue = tokenize_game_line(game_line)
 
     max_number_of_cubes_by_color = {
-        RED: 0,
-        GREEN: 0,
-        BLUE: 0
+        RED: red,
+        GREEN: green,
+        BLUE: blue
     }
-    for game_result_string in game_results_string.split(';'):
-        for cube_count_by_color_string in game_result_string.split(','):
-            number, color = cube_count_by_color_string.strip().split(' ')
-            if max_number_of_cubes_by_color[color] < int(number):
-                max_number_of_cubes_by_color[color] = int(number)
-
-    game_number = int(game_number_string.replace('Game ', ''))
-    if debug:
-        print(game_number)
-        print(max_number_of_cubes_by_color)
 
     return game_number, max_number_of_cubes_by_color
 
@@ -49,56 +125,288 @@ def get_maximum_number_of_cubes_for_each_color_in_game(game_line: str) -> ():
 def parse_game_data(file: str) -> {}:
     """Extracts the game number and the maximum number of cubes of each color found during the game.
     Returns a dictionary indexed by the game number containing the maximum number of cubes for each color.
-    >>> parse_game_data('tests/doctest-get_sum_of_possible_game_numbers.txt')
+    >>> parse_game_data(TEST_FILE)
     {1: {'red': 4, 'green': 2, 'blue': 6}, 2: {'red': 1, 'green': 3, 'blue': 4}, 3: {'red': 20, 'green': 13, 'blue': 6}, 4: {'red': 14, 'green': 3, 'blue': 15}, 5: {'red': 6, 'green': 3, 'blue': 2}}
     """
     games = {}
 
-    with open(file, 'r') as f:
-        for line in f:
-            game_number, game_result = get_maximum_number_of_cubes_for_each_color_in_game(line)
-            if debug:
-                print(game_number)
-                print(game_result)
-            games[game_number] = game_result
-        f.close()
+    for line in read_lines(file):
+        game_number, game_result = get_maximum_number_of_cubes_for_each_color_in_game(line)
+        games[game_number] = game_result
 
     if debug:
         print(games)
     return games
 
 
+def parse_game_columns(file: str) -> GameColumns:
+    """Extracts the game number and the maximum number of cubes of each color found during each game.
+    Uses tokenize_game_line and stores the results column by column
+    in unsigned 64-bit arrays instead of a dictionary per game.
+    Returns a GameColumns of the game numbers and the red, green and blue maximums.
+    >>> parse_game_columns(TEST_FILE)
+    GameColumns(game_numbers=array('Q', [1, 2, 3, 4, 5]), red=array('Q', [4, 1, 20, 14, 6]), \
+green=array('Q', [2, 3, 13, 3, 3]), blue=array('Q', [6, 4, 6, 15, 2]))
+    """
+    columns = GameColumns(array('Q'), array('Q'), array('Q'), array('Q'))
+
+    with instrumentation.stage('day02.parse'):
+        for line in read_lines(file):
+            game_number, red, green, blue = tokenize_game_line(line)
+            columns.game_numbers.append(game_number)
+            columns.red.append(red)
+            columns.green.append(green)
+            columns.blue.append(blue)
+
+    if debug:
+        print(columns)
+    return columns
+
+
+def load_game_columns(file: str) -> GameColumns:
+    """Uses parse_game_columns, through the parse cache when it is turned on, so re-runs against
+    an unchanged file load the columns without parsing it.
+    Returns a GameColumns of the game numbers and the red, green and blue maximums.
+    >>> list(load_game_columns(TEST_FILE).game_numbers)
+    [1, 2, 3, 4, 5]
+    """
+    return GameColumns(*cached_arrays(file, 'day02-problem01-game-columns', PARSER_VERSION, parse_game_columns))
+
+
+def get_sum_of_possible_game_numbers_from_columns(columns: GameColumns,
+                                                  max_red: int, max_green: int, max_blue: int) -> int:
+    """Masks the games whose maximum number of cubes of every color is within the limits.
+    The mask and sum are vectorized over the columns when NumPy is installed.
+    Returns the sum of the game numbers of the possible games.
+    >>> columns = GameColumns(array('Q', [1, 2, 3]), array('Q', [4, 1, 20]), \
+    array('Q', [2, 3, 13]), array('Q', [6, 4, 6]))
+    >>> get_sum_of_possible_game_numbers_from_columns(columns, 12, 13, 14)
+    3
+    >>> get_sum_of_possible_game_numbers_from_columns(columns, 20, 13, 14)
+    6
+    """
+    if np is None:
+        return sum(game_number for game_number, red, green, blue in zip(*columns)
+                   if red <= max_red and green <= max_green and blue <= max_blue)
+
+    game_numbers, red, green, blue = (np.frombuffer(column, dtype=np.uint64) for column in columns)
+    is_possible = (red <= max_red) & (green <= max_green) & (blue <= max_blue)
+
+    return int(game_numbers[is_possible].sum(dtype=np.int64))
+
+
 def get_sum_of_possible_game_numbers(file: str, max_red: int, max_green: int, max_blue: int) -> int:
     """Extracts the game number and the maximum number of cubes of each color found during the game.
     Returns a dictionary indexed by the game number containing the maximum number of cubes for each color.
-    >>> get_sum_of_possible_game_numbers('tests/doctest-get_sum_of_possible_game_numbers.txt', 12, 13, 14)
+    >>> get_sum_of_possible_game_numbers(TEST_FILE, 12, 13, 14)
     8
     """
-    possible_game_numbers = []
-    games = parse_game_data(file)
-    # print(games)
-
-    game_limits = {
-        RED: max_red,
-        GREEN: max_green,
-        BLUE: max_blue
-    }
-    # print(game_limits)
+    games = load_game_columns(file)
+    sum_of_possible_game_numbers = get_sum_of_possible_game_numbers_from_columns(games, max_red, max_green, max_blue)
 
-    for game_number in games.keys():
-        game_result = games[game_number]
-        # print(game_number, game_result)
+    if debug:
+        print(sum_of_possible_game_numbers)
+    return sum_of_possible_game_numbers
 
-        if (game_result[RED] <= game_limits[RED]
-                and game_result[GREEN] <= game_limits[GREEN]
-                and game_result[BLUE] <= game_limits[BLUE]):
-            # print(game_result[RED], game_result[GREEN], game_result[BLUE])
-            possible_game_numbers.append(game_number)
 
-    if debug:
-        print(possible_game_numbers)
-    return sum(possible_game_numbers)
+class GameIndex:
+    """Answers possible-game limit queries against one parsed game log without reparsing it.
+    The games are bucketed on the distinct red, green and blue maximums and summed into a 3-D prefix
+    (dominance) table, so a query is three binary searches and one lookup.
+    If the table would exceed max_table_cells the games are instead sorted into RedBuckets by red maximum,
+    and a query binary searches the green and then the blue limit in the buckets within the red limit.
+    >>> index = GameIndex(parse_game_columns(TEST_FILE))
+    >>> index.query(12, 13, 14)
+    8
+    >>> index.query_many([(12, 13, 14), (20, 13, 15), (0, 0, 0)])
+    [8, 15, 0]
+    >>> index = GameIndex(parse_game_columns(TEST_FILE), max_table_cells=0)
+    >>> index.table is None, index.query_many([(12, 13, 14), (20, 13, 15), (0, 0, 0)])
+    (True, [8, 15, 0])
+    """
+
+    def __init__(self, columns: GameColumns, max_table_cells: int = MAX_INDEX_TABLE_CELLS):
+        self.red_values = sorted(set(columns.red))
+        self.green_values = sorted(set(columns.green))
+        self.blue_values = sorted(set(columns.blue))
+
+        shape = (len(self.red_values) + 1, len(self.green_values) + 1, len(self.blue_values) + 1)
+        if shape[0] * shape[1] * shape[2] <= max_table_cells:
+            self.table = self.build_table(columns, shape)
+            self.red_buckets = None
+        else:
+            self.table = None
+            self.red_buckets = self.build_red_buckets(columns)
+            self.bucket_max_reds = [max(bucket.reds) for bucket in self.red_buckets]
+
+    def build_table(self, columns: GameColumns, shape: (int, int, int)) -> 'np.ndarray | List[int]':
+        """Buckets each game number at its red, green and blue value ranks (offset by one so rank 0 is empty)
+        and accumulates the buckets along each axis in turn, with numpy.cumsum when NumPy is installed.
+        Returns the flattened table where cell (i, j, k) holds the sum of the game numbers whose maximums
+        are at most the i-th red, j-th green and k-th blue distinct value.
+        """
+        if np is None:
+            return self.build_table_python(columns, shape)
+
+        game_numbers, red, green, blue = (np.frombuffer(column, dtype=np.uint64) for column in columns)
+        table = np.zeros(shape, dtype=np.int64)
+        np.add.at(table, (np.searchsorted(self.red_values, red) + 1, np.searchsorted(self.green_values, green) + 1,
+                          np.searchsorted(self.blue_values, blue) + 1), game_numbers.astype(np.int64))
+        for axis in range(3):
+            np.cumsum(table, axis=axis, out=table)
+
+        return table.ravel()
+
+    def build_table_python(self, columns: GameColumns, shape: (int, int, int)) -> List[int]:
+        """Does the work of build_table in pure Python, for when NumPy is not installed.
+        Returns the flattened table as a list.
+        >>> columns = parse_game_columns(TEST_FILE)
+        >>> index = GameIndex(columns)
+        >>> shape = (len(index.red_values) + 1, len(index.green_values) + 1, len(index.blue_values) + 1)
+        >>> index.build_table_python(columns, shape) == index.table.tolist()
+        True
+        """
+        red_ranks = {value: rank + 1 for rank, value in enumerate(self.red_values)}
+        green_ranks = {value: rank + 1 for rank, value in enumerate(self.green_values)}
+        blue_ranks = {value: rank + 1 for rank, value in enumerate(self.blue_values)}
+        red_stride, green_stride = shape[1] * shape[2], shape[2]
+
+        table = [0] * (shape[0] * shape[1] * shape[2])
+        for game_number, red, green, blue in zip(*columns):
+            table[red_ranks[red] * red_stride + green_ranks[green] * green_stride + blue_ranks[blue]] += game_number
+
+        for stride, size in ((red_stride, shape[0]), (green_stride, shape[1]), (1, shape[2])):
+            for cell in range(len(table)):
+                if (cell // stride) % size > 0:
+                    table[cell] += table[cell - stride]
+
+        return table
+
+    @staticmethod
+    def build_red_buckets(columns: GameColumns) -> List[RedBucket]:
+        """Sorts the games by red maximum and cuts them into RedBuckets of about the square root of the games,
+        never splitting the games of one red maximum, so only one bucket straddles any red limit.
+        Returns the list of RedBuckets in red order.
+        >>> buckets = GameIndex.build_red_buckets(GameColumns([1, 2, 3, 4], [4, 4, 20, 7], [2, 1, 13, 5], [6, 9, 6, 1]))
+        >>> buckets[0]
+        RedBucket(reds=[4, 4], greens=[1, 2], blues=[9, 6], game_numbers=[2, 1], block_size=1, \
+block_blues=[[9], [6]], block_sums=[[0, 2], [0, 1]])
+        >>> [bucket.reds for bucket in buckets]
+        [[4, 4], [7, 20]]
+        """
+        games = sorted(zip(columns.red, columns.green, columns.blue, columns.game_numbers))
+        bucket_size = max(math.isqrt(len(games)), 1)
+
+        buckets = []
+        start = 0
+        while start < len(games):
+            end = min(start + bucket_size, len(games))
+            while end < len(games) and games[end][0] == games[end - 1][0]:
+                end += 1
+
+            reds, greens, blues, game_numbers = (list(values) for values in
+                                                 zip(*sorted(games[start:end], key=lambda game: game[1:3])))
+            block_size = max(math.isqrt(len(reds)), 1)
+            block_blues, block_sums = [], []
+            for block_start in range(0, len(reds), block_size):
+                block = sorted(zip(blues[block_start:block_start + block_size],
+                                   game_numbers[block_start:block_start + block_size]))
+                block_blues.append([blue for blue, _ in block])
+                block_sums.append(list(accumulate((game_number for _, game_number in block), initial=0)))
+
+            buckets.append(RedBucket(reds, greens, blues, game_numbers, block_size, block_blues, block_sums))
+            start = end
+
+        return buckets
+
+    def query(self, max_red: int, max_green: int, max_blue: int) -> int:
+        """Returns the sum of the game numbers that are possible with the given limits.
+        Against red buckets, the games of a bucket within the green limit are a prefix of it: its whole blocks
+        are summed from a binary search of the blue limit and only the games of its last, partial block are
+        checked one by one, as are the games of the one bucket straddling the red limit.
+        """
+        if self.table is None:
+            total = 0
+            bucket_count = bisect_right(self.bucket_max_reds, max_red)
+            for bucket in self.red_buckets[:bucket_count]:
+                end = bisect_right(bucket.greens, max_green)
+                block_count = end // bucket.block_size
+                for blues, sums in zip(bucket.block_blues[:block_count], bucket.block_sums):
+                    total += sums[bisect_right(blues, max_blue)]
+                for i in range(block_count * bucket.block_size, end):
+                    if bucket.blues[i] <= max_blue:
+                        total += bucket.game_numbers[i]
+
+            if bucket_count < len(self.red_buckets):
+                bucket = self.red_buckets[bucket_count]
+                total += sum(game_number for red, green, blue, game_number
+                             in zip(bucket.reds, bucket.greens, bucket.blues, bucket.game_numbers)
+                             if red <= max_red and green <= max_green and blue <= max_blue)
+            return total
+
+        red_rank = bisect_right(self.red_values, max_red)
+        green_rank = bisect_right(self.green_values, max_green)
+        blue_rank = bisect_right(self.blue_values, max_blue)
+        green_size, blue_size = len(self.green_values) + 1, len(self.blue_values) + 1
+
+        cell = (red_rank * green_size + green_rank) * blue_size + blue_rank
+        return self.table[cell] if np is None else self.table.item(cell)
+
+    def query_many(self, limits: Iterable[Tuple[int, int, int]]) -> List[int]:
+        """Returns the query result for each (max_red, max_green, max_blue) limit triple, in order."""
+        return [self.query(max_red, max_green, max_blue) for max_red, max_green, max_blue in limits]
+
+
+def get_game_index(file: str) -> GameIndex:
+    """Uses load_game_columns to build a GameIndex for a file, reusing the one already built
+    while the file's modification time is unchanged and replacing it once the file changes.
+    Returns the GameIndex for the file.
+    >>> get_game_index(TEST_FILE) is get_game_index(TEST_FILE)
+    True
+    """
+    path = os.path.abspath(file)
+    modified = os.stat(path).st_mtime_ns
+
+    cached = game_indexes.get(path)
+    if cached is not None and cached[0] == modified:
+        return cached[1]
+
+    index = GameIndex(load_game_columns(path))
+    game_indexes[path] = (modified, index)
+
+    return index
+
+
+def get_sum_of_possible_game_numbers_in_chunk(file: str, start: int, end: int,
+                                              max_red: int, max_green: int, max_blue: int) -> int:
+    """Uses tokenize_game_line on the lines in the byte range [start, end) of a file.
+    Returns the sum of the game numbers in that chunk that are possible with the given limits.
+    >>> get_sum_of_possible_game_numbers_in_chunk(TEST_FILE, 55, 193, 12, 13, 14)
+    2
+    """
+    total = 0
+    for line in read_lines(file, start, end):
+        game_number, red, green, blue = tokenize_game_line(line)
+        if red <= max_red and green <= max_green and blue <= max_blue:
+            total += game_number
+
+    return total
+
+
+def get_sum_of_possible_game_numbers_parallel(file: str, max_red: int, max_green: int, max_blue: int,
+                                              workers: int | None = None,
+                                              min_bytes: int = PARALLEL_MIN_BYTES) -> int:
+    """Splits a file into newline-aligned chunks and uses get_sum_of_possible_game_numbers_in_chunk on each
+    in a worker process. Files smaller than min_bytes, or a single worker, are summed sequentially.
+    Returns the sum of the game numbers that are possible with the given limits.
+    >>> get_sum_of_possible_game_numbers_parallel(TEST_FILE, 12, 13, 14, workers=2, min_bytes=0)
+    8
+    """
+    reduce_chunk = partial(get_sum_of_possible_game_numbers_in_chunk,
+                           max_red=max_red, max_green=max_green, max_blue=max_blue)
+    return sum(reduce_chunks(file, reduce_chunk, workers, min_bytes))
 
 
-# print(get_sum_of_possible_game_numbers('tests/doctest-get_sum_of_possible_game_numbers.txt', 12, 13, 14))
-print(get_sum_of_possible_game_numbers('resources/input.txt', 12, 13, 14))
+# print(get_sum_of_possible_game_numbers(TEST_FILE, 12, 13, 14))
+if __name__ == '__main__':
+    print(run_entry(get_sum_of_possible_game_numbers, INPUT_FILE, 12, 13, 14))
@@ -1,13 +1,81 @@
+import re
+import sys
+from array import array
+from collections import namedtuple
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from common.cache import cached_arrays  # noqa: E402
+from common.instrumentation import instrumentation  # noqa: E402
+from common.parallel import PARALLEL_MIN_BYTES, reduce_chunks  # noqa: E402
+from common.profiling import run_entry  # noqa: E402
+from common.reader import get_module_file, read_lines  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed to vectorize the column queries
+    np = None
+
 # debug = True
 debug = False
 
+INPUT_FILE = get_module_file(__file__, 'resources', 'input.txt')
+TEST_FILE = get_module_file(__file__, 'tests',
+                            'doctest-get_sum_of_power_of_minimum_required_cubes_for_each_color.txt')
+
 RED = 'red'
 GREEN = 'green'
 BLUE = 'blue'
 
+# Keyed by both the str and the bytes first letter of a color, as found by rex_cubes and rex_cubes_bytes
+COLOR_INDEXES = {
+    'r': 0, b'r': 0,
+    'g': 1, b'g': 1,
+    'b': 2, b'b': 2
+}
+
+rex_game = re.compile(r'Game (\d+)')
+rex_cubes = re.compile(r'(\d+) ([rgb])')
+rex_game_bytes = re.compile(rb'Game (\d+)')
+rex_cubes_bytes = re.compile(rb'(\d+) ([rgb])')
+
+GameColumns = namedtuple('GameColumns', ['game_numbers', 'red', 'green', 'blue'])
+INT64_MAX = (1 << 63) - 1
+PARSER_VERSION = 2  # Bump when parse_game_columns changes, so cached columns are not reused
+
+
+def tokenize_game_line(game_line: str | bytes) -> (int, int, int, int):
+    """Finds every cube count and the first letter of its color with one findall of a compiled regex,
+    keeping the maximum for each color. The line can be str, bytes or a memoryview line slice from read_lines.
+    Returns a tuple of the game number and the maximum number of red, green and blue cubes.
+    >>> tokenize_game_line('Game 3: 8 green, 6 blue, 20 red; 5 blue, 4 red, 13 green; 5 green, 1 red')
+    (3, 20, 13, 6)
+    >>> tokenize_game_line(b'Game 100: 12 blue\\n')
+    (100, 0, 0, 12)
+    """
+    if isinstance(game_line, str):
+        game_rex, cubes_rex = rex_game, rex_cubes
+    else:
+        game_rex, cubes_rex = rex_game_bytes, rex_cubes_bytes
+
+    maximums = [0, 0, 0]
+    for number, color in cubes_rex.findall(game_line):
+        color_index = COLOR_INDEXES[color]
+        number = int(number)
+        if maximums[color_index] < number:
+            maximums[color_index] = number
+    game_number = int(game_rex.match(game_line).group(1))
+
+    if instrumentation.enabled:
+        instrumentation.count('day02.lines_parsed')
+
+    return game_number, maximums[0], maximums[1], maximums[2]
 
-def get_maximum_number_of_cubes_for_each_color_in_game(game_line: str) -> ():
+
+def get_maximum_number_of_cubes_for_each_color_in_game(game_line: str | bytes) -> ():
     """Extracts the game number and the maximum number of cubes of each color found during the game.
+    Uses tokenize_game_line, so the line can also be bytes or a memoryview line slice from read_lines.
     Returns a tuple of the game number and a dictionary with the maximum number of cubes for each color.
     >>> get_maximum_number_of_cubes_for_each_color_in_game(\
     'Game 1: 3 blue, 4 red; 1 red, 2 green, 6 blue; 2 green')
@@ -24,29 +92,22 @@ def get_maximum_number_of_cubes_for_each_color_in_game(game_line: str) -> ():
     >>> get_maximum_number_of_cubes_for_each_color_in_game(\
     'Game 5: 6 red, 1 blue, 3 green; 2 blue, 1 red, 2 green')
     (5, {'red': 6, 'green': 3, 'blue': 2})
+    >>> get_maximum_number_of_cubes_for_each_color_in_game(\
+    memoryview(b'Game 12: 3 blue, 4 red; 1 red, 2 green, 6 blue; 2 green'))
+    (12, {'red': 4, 'green': 2, 'blue': 6})
     """
-    game_number_string, game_results_string = game_line.split(':')
+    game_number, red, green, blue = tokenize_game_line(game_line)
 
     max_number_of_cubes_by_color = {
-        RED: 0,
-        GREEN: 0,
-        BLUE: 0
+        RED: red,
+        GREEN: green,
+        BLUE: blue
     }
-    for game_result_string in game_results_string.split(';'):
-        for cube_count_by_color_string in game_result_string.split(','):
-            number, color = cube_count_by_color_string.strip().split(' ')
-            if max_number_of_cubes_by_color[color] < int(number):
-                max_number_of_cubes_by_color[color] = int(number)
-
-    game_number = int(game_number_string.replace('Game ', ''))
-    if debug:
-        print(game_number)
-        print(max_number_of_cubes_by_color)
 
     return game_number, max_number_of_cubes_by_color
 
 
-def get_power_of_minimum_required_cubes_for_each_color_in_game(game_line: str) -> ():
+def get_power_of_minimum_required_cubes_for_each_color_in_game(game_line: str | bytes) -> ():
     """Extracts the game number and the maximum number of cubes of each color found during the game.
     Returns a dictionary indexed by the game number containing the maximum number of cubes for each color.
     >>> get_power_of_minimum_required_cubes_for_each_color_in_game(\
@@ -65,57 +126,123 @@ def get_power_of_minimum_required_cubes_for_each_color_in_game(game_line: str) -
     'Game 5: 6 red, 1 blue, 3 green; 2 blue, 1 red, 2 green')
     (5, 36)
     """
-    (game_number, game_result) = get_maximum_number_of_cubes_for_each_color_in_game(game_line)
+    game_number, red, green, blue = tokenize_game_line(game_line)
 
-    game_power = 1
-    for max_number in game_result.values():
-        game_power *= max_number
-
-    if debug:
-        print(game_number, game_power)
-    return game_number, game_power
+    return game_number, red * green * blue
 
 
 def parse_game_data(file: str) -> {}:
     """Extracts the game number and the maximum number of cubes of each color found during the game.
     Returns a dictionary indexed by the game number containing the maximum number of cubes for each color.
-    >>> parse_game_data('tests/doctest-get_sum_of_power_of_minimum_required_cubes_for_each_color.txt')
+    >>> parse_game_data(TEST_FILE)
     {1: 48, 2: 12, 3: 1560, 4: 630, 5: 36}
     """
     games = {}
 
-    with open(file, 'r') as f:
-        for line in f:
-            game_number, game_result = get_power_of_minimum_required_cubes_for_each_color_in_game(line)
-            if debug:
-                print(game_number)
-                print(game_result)
-            games[game_number] = game_result
-        f.close()
+    for line in read_lines(file):
+        game_number, game_result = get_power_of_minimum_required_cubes_for_each_color_in_game(line)
+        games[game_number] = game_result
 
     if debug:
         print(games)
     return games
 
 
+def parse_game_columns(file: str) -> GameColumns:
+    """Extracts the game number and the maximum number of cubes of each color found during each game.
+    Uses tokenize_game_line and stores the results column by column
+    in unsigned 64-bit arrays instead of a dictionary per game.
+    Returns a GameColumns of the game numbers and the red, green and blue maximums.
+    >>> parse_game_columns(TEST_FILE)
+    GameColumns(game_numbers=array('Q', [1, 2, 3, 4, 5]), red=array('Q', [4, 1, 20, 14, 6]), \
+green=array('Q', [2, 3, 13, 3, 3]), blue=array('Q', [6, 4, 6, 15, 2]))
+    """
+    columns = GameColumns(array('Q'), array('Q'), array('Q'), array('Q'))
+
+    with instrumentation.stage('day02.parse'):
+        for line in read_lines(file):
+            game_number, red, green, blue = tokenize_game_line(line)
+            columns.game_numbers.append(game_number)
+            columns.red.append(red)
+            columns.green.append(green)
+            columns.blue.append(blue)
+
+    if debug:
+        print(columns)
+    return columns
+
+
+def load_game_columns(file: str) -> GameColumns:
+    """Uses parse_game_columns, through the parse cache when it is turned on, so re-runs against
+    an unchanged file load the columns without parsing it.
+    Returns a GameColumns of the game numbers and the red, green and blue maximums.
+    >>> list(load_game_columns(TEST_FILE).game_numbers)
+    [1, 2, 3, 4, 5]
+    """
+    return GameColumns(*cached_arrays(file, 'day02-problem02-game-columns', PARSER_VERSION, parse_game_columns))
+
+
+def get_sum_of_power_from_columns(columns: GameColumns) -> int:
+    """Multiplies the red, green and blue columns to get the power of each game.
+    The product and sum are vectorized over the columns when NumPy is installed and the sum cannot overflow
+    an int64; otherwise they are exact Python ints.
+    Returns the sum of the powers of all games.
+    >>> get_sum_of_power_from_columns(GameColumns(array('Q', [1, 2, 3]), array('Q', [4, 1, 20]), \
+    array('Q', [2, 3, 13]), array('Q', [6, 4, 6])))
+    1620
+    >>> get_sum_of_power_from_columns(GameColumns(*(array('Q', [1, 3000000]) for _ in range(4))))
+    27000000000000000001
+    """
+    columns_max = [max(column, default=0) for column in (columns.red, columns.green, columns.blue)]
+    if np is None or columns_max[0] * columns_max[1] * columns_max[2] * len(columns.red) > INT64_MAX:
+        return sum(red * green * blue for red, green, blue in zip(columns.red, columns.green, columns.blue))
+
+    red, green, blue = (np.frombuffer(column, dtype=np.uint64).astype(np.int64)
+                        for column in (columns.red, columns.green, columns.blue))
+
+    return int((red * green * blue).sum())
+
+
 def get_sum_of_power_of_minimum_required_cubes_for_each_color(file: str) -> int:
     """Extracts the game number and the maximum number of cubes of each color found during the game.
     Returns a dictionary indexed by the game number containing the maximum number of cubes for each color.
-    >>> get_sum_of_power_of_minimum_required_cubes_for_each_color(\
-    'tests/doctest-get_sum_of_power_of_minimum_required_cubes_for_each_color.txt')
+    >>> get_sum_of_power_of_minimum_required_cubes_for_each_color(TEST_FILE)
     2286
     """
-    games = parse_game_data(file)
-    # print(games)
-
-    sum_of_games = sum(games.values())
-    # sum_of_games=0
+    games = load_game_columns(file)
+    sum_of_games = get_sum_of_power_from_columns(games)
 
     if debug:
         print(sum_of_games)
     return sum_of_games
 
 
+def get_sum_of_power_in_chunk(file: str, start: int, end: int) -> int:
+    """Uses tokenize_game_line on the lines in the byte range [start, end) of a file.
+    Returns the sum of the game powers in that chunk.
+    >>> get_sum_of_power_in_chunk(TEST_FILE, 55, 193)
+    1572
+    """
+    total = 0
+    for line in read_lines(file, start, end):
+        game_number, red, green, blue = tokenize_game_line(line)
+        total += red * green * blue
+
+    return total
+
+
+def get_sum_of_power_of_minimum_required_cubes_for_each_color_parallel(
+        file: str, workers: int | None = None, min_bytes: int = PARALLEL_MIN_BYTES) -> int:
+    """Splits a file into newline-aligned chunks and uses get_sum_of_power_in_chunk on each in a worker process.
+    Files smaller than min_bytes, or a single worker, are summed sequentially.
+    Returns the sum of the game powers in the file.
+    >>> get_sum_of_power_of_minimum_required_cubes_for_each_color_parallel(TEST_FILE, workers=2, min_bytes=0)
+    2286
+    """
+    return sum(reduce_chunks(file, get_sum_of_power_in_chunk, workers, min_bytes))
+
+
 # print(get_sum_of_power_of_minimum_required_cubes_for_each_color(\
 # 'tests/doctest-doctest-get_sum_of_power_of_minimum_required_cubes_for_each_color.txt', 12, 13, 14))
-print(get_sum_of_power_of_minimum_required_cubes_for_each_color('resources/input.txt'))
+if __name__ == '__main__':
+    print(run_entry(get_sum_of_power_of_minimum_required_cubes_for_each_color, INPUT_FILE))
@@ -1,430 +1,540 @@
 import re
-from typing import Dict, List, Tuple
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque, namedtuple
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from common.cache import cached_arrays, pack_integers, unpack_integers  # noqa: E402
+from common.instrumentation import instrumentation  # noqa: E402
+from common.parallel import PARALLEL_MIN_BYTES, get_halo_offsets, reduce_chunks  # noqa: E402
+from common.profiling import run_entry  # noqa: E402
+from common.reader import get_module_file, read_lines  # noqa: E402
 
 # global_debug = True
 global_debug = False
 
-MATCH_KEY = 'Match'
-START_KEY = 'StartPosition'
-END_KEY = 'EndPosition'
-NUMBER_KEY = 'Number'
-SYMBOL_KEY = 'Symbol'
+INPUT_FILE = get_module_file(__file__, 'resources', 'input.txt')
+TEST_FILE = get_module_file(__file__, 'tests', 'doctest-get_part_numbers.txt')
 
-rex_number = re.compile(r"(\d+)")
-rex_symbol = re.compile(r"([^0-9.\r\n])")
+# Parallel arrays of the 1-based start and end (exclusive) positions and the values of the matches on a line.
+# A number's value is the number itself and a symbol's value is its character code.
+Spans = namedtuple('Spans', ['starts', 'ends', 'values'])
+NO_SPANS = Spans(array('i'), array('i'), array('q'))  # Shared by artificial lines, never appended to
+PARSER_VERSION = 1  # Bump when get_span_arrays or get_grid_part_number_array change, so cached data is not reused
 
+# Engines for finding part numbers, selectable in sum_of_part_numbers for A/B comparisons
+ENGINE_LINEAR = 'linear'  # Scan every symbol on the neighbouring lines for each number
+ENGINE_BISECT = 'bisect'  # Binary search the sorted symbol positions on the neighbouring lines for each number
+ENGINE_GRID = 'grid'  # Check each number against a dilated symbol mask of the whole grid
 
-def get_match_data(line: str, line_number: int, rex: re.Pattern) -> dict:
-    """Extracts strings from line that match the regex along with start and end positions.
-    Returns a dictionary with a list of dictionaries containing matching strings and their positions.
-    >>> get_match_data('467..114..', 1, rex_number)
-    {1: [{'Match': '467', 'StartPosition': 1, 'EndPosition': 4}, \
-{'Match': '114', 'StartPosition': 6, 'EndPosition': 9}]}
-    >>> get_match_data('467..114..', 1, rex_symbol)
-    {1: [None]}
-    >>> get_match_data('...*......', 2, rex_number)
-    {2: [None]}
-    >>> get_match_data('...*......', 2, rex_symbol)
-    {2: [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]}
-    >>> get_match_data('..35..633.', 3, rex_number)
-    {3: [{'Match': '35', 'StartPosition': 3, 'EndPosition': 5}, \
-{'Match': '633', 'StartPosition': 7, 'EndPosition': 10}]}
-    >>> get_match_data('..35..633.', 3, rex_symbol)
-    {3: [None]}
-    >>> get_match_data('......#...', 4, rex_number)
-    {4: [None]}
-    >>> get_match_data('......#...', 4, rex_symbol)
-    {4: [{'Match': '#', 'StartPosition': 7, 'EndPosition': 8}]}
-    >>> get_match_data('617*......', 5, rex_number)
-    {5: [{'Match': '617', 'StartPosition': 1, 'EndPosition': 4}]}
-    >>> get_match_data('617*......', 5, rex_symbol)
-    {5: [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]}
-    >>> get_match_data('.....+.58.', 6, rex_number)
-    {6: [{'Match': '58', 'StartPosition': 8, 'EndPosition': 10}]}
-    >>> get_match_data('.....+.58.', 6, rex_symbol)
-    {6: [{'Match': '+', 'StartPosition': 6, 'EndPosition': 7}]}
-    >>> get_match_data('..592.....', 7, rex_number)
-    {7: [{'Match': '592', 'StartPosition': 3, 'EndPosition': 6}]}
-    >>> get_match_data('..592.....', 7, rex_symbol)
-    {7: [None]}
-    >>> get_match_data('......755.', 8, rex_number)
-    {8: [{'Match': '755', 'StartPosition': 7, 'EndPosition': 10}]}
-    >>> get_match_data('......755.', 8, rex_symbol)
-    {8: [None]}
-    >>> get_match_data('...$.*....', 9, rex_number)
-    {9: [None]}
-    >>> get_match_data('...$.*....', 9, rex_symbol)
-    {9: [{'Match': '$', 'StartPosition': 4, 'EndPosition': 5}, \
-{'Match': '*', 'StartPosition': 6, 'EndPosition': 7}]}
-    >>> get_match_data('.664.598..', 10, rex_number)
-    {10: [{'Match': '664', 'StartPosition': 2, 'EndPosition': 5}, \
-{'Match': '598', 'StartPosition': 6, 'EndPosition': 9}]}
-    >>> get_match_data('.664.598..', 10, rex_symbol)
-    {10: [None]}
+rex_number = re.compile(r"(\d+)")
+rex_symbol = re.compile(r"([^0-9.\r\n])")
+rex_number_bytes = re.compile(rb"(\d+)")
+rex_symbol_bytes = re.compile(rb"([^0-9.\r\n])")
+
+
+def get_match_data(line: str | bytes, rex: re.Pattern) -> Spans:
+    """Extracts the matches of the regex from line along with their start and end positions.
+    A bytes or memoryview line needs a bytes regex.
+    Values are kept in an array('q') until a number does not fit in a signed 64-bit integer,
+    and in a list from then on.
+    Returns a Spans of the start positions, end positions and values of the matches.
+    >>> get_match_data('467..114..', rex_number)
+    Spans(starts=array('i', [1, 6]), ends=array('i', [4, 9]), values=array('q', [467, 114]))
+    >>> get_match_data('467..114..', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('...*......', rex_number)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('...*......', rex_symbol)
+    Spans(starts=array('i', [4]), ends=array('i', [5]), values=array('q', [42]))
+    >>> get_match_data('..35..633.', rex_number)
+    Spans(starts=array('i', [3, 7]), ends=array('i', [5, 10]), values=array('q', [35, 633]))
+    >>> get_match_data('..35..633.', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('......#...', rex_number)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('......#...', rex_symbol)
+    Spans(starts=array('i', [7]), ends=array('i', [8]), values=array('q', [35]))
+    >>> get_match_data('617*......', rex_number)
+    Spans(starts=array('i', [1]), ends=array('i', [4]), values=array('q', [617]))
+    >>> get_match_data('617*......', rex_symbol)
+    Spans(starts=array('i', [4]), ends=array('i', [5]), values=array('q', [42]))
+    >>> get_match_data('.....+.58.', rex_number)
+    Spans(starts=array('i', [8]), ends=array('i', [10]), values=array('q', [58]))
+    >>> get_match_data('.....+.58.', rex_symbol)
+    Spans(starts=array('i', [6]), ends=array('i', [7]), values=array('q', [43]))
+    >>> get_match_data('..592.....', rex_number)
+    Spans(starts=array('i', [3]), ends=array('i', [6]), values=array('q', [592]))
+    >>> get_match_data('..592.....', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('......755.', rex_number)
+    Spans(starts=array('i', [7]), ends=array('i', [10]), values=array('q', [755]))
+    >>> get_match_data('......755.', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('...$.*....', rex_number)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('...$.*....', rex_symbol)
+    Spans(starts=array('i', [4, 6]), ends=array('i', [5, 7]), values=array('q', [36, 42]))
+    >>> get_match_data('.664.598..', rex_number)
+    Spans(starts=array('i', [2, 6]), ends=array('i', [5, 9]), values=array('q', [664, 598]))
+    >>> get_match_data('.664.598..', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('12.1234567890123456789012*', rex_number).values
+    [12, 1234567890123456789012]
     """
-    # local_debug = True
-    local_debug = False
-
-    match_data = {
-        line_number: [None]
-    }
-
-    match_results = rex.split(line)
-    if len(match_results) != 1:
-        position = 1
-        order = 0
-        for match_result in match_results:
-            if len(match_result) > 0:
-                if rex.fullmatch(match_result) is not None:
-                    order += 1
-                    if order == 1:
-                        # match_data[line_number] = {}
-                        match_data[line_number] = []
-
-                    # match_data[line_number][order] = {}
-                    # match_data[line_number][order][MATCH_KEY] = match_result
-                    # match_data[line_number][order][START_KEY] = position
-                    # match_data[line_number][order][END_KEY] = position + len(match_result)
-
-                    # match_data[line_number].append(dict(
-                    #     MATCH_KEY=match_result,
-                    #     START_KEY=position,
-                    #     END_KEY=position + len(match_result)
-                    # ))
-
-                    data = {}
-                    data[MATCH_KEY] = match_result
-                    data[START_KEY] = position
-                    data[END_KEY] = position + len(match_result)
-                    match_data[line_number].append(data)
-
-                    position += len(match_result)
-                else:
-                    position += len(match_result)
-
-    if global_debug or local_debug:
-        print(match_data)
+    match_data = Spans(array('i'), array('i'), array('q'))
+
+    for match in rex.finditer(line):
+        match_result = match.group()
+        match_data.starts.append(match.start() + 1)
+        match_data.ends.append(match.end() + 1)
+        value = int(match_result) if match_result.isdigit() else ord(match_result)
+        try:
+            match_data.values.append(value)
+        except OverflowError:
+            match_data = match_data._replace(values=list(match_data.values) + [value])
+
+    if instrumentation.enabled:
+        instrumentation.count('day03.spans_found', len(match_data.values))
     return match_data
 
 
-def get_numbers_and_symbols(line: str, line_number: int) -> tuple:
-    """Uses get_match_data to extract matching strings with
+def get_numbers_and_symbols(line: str | bytes) -> (Spans, Spans):
+    """Uses get_match_data to extract matches with
     start and end positions from line for both numbers and symbols.
-    Returns a tuple of of the numbers and symbols dictionaries returned from sucessive get_match_data calls.
-    >>> get_numbers_and_symbols('467..114..', 1)
-    ({1: [{'Match': '467', 'StartPosition': 1, 'EndPosition': 4}, \
-{'Match': '114', 'StartPosition': 6, 'EndPosition': 9}]}, \
-{1: [None]})
-    >>> get_numbers_and_symbols('...*......', 2)
-    ({2: [None]}, \
-{2: [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]})
-    >>> get_numbers_and_symbols('..35..633.', 3)
-    ({3: [{'Match': '35', 'StartPosition': 3, 'EndPosition': 5}, \
-{'Match': '633', 'StartPosition': 7, 'EndPosition': 10}]}, \
-{3: [None]})
-    >>> get_numbers_and_symbols('......#...', 4)
-    ({4: [None]}, \
-{4: [{'Match': '#', 'StartPosition': 7, 'EndPosition': 8}]})
-    >>> get_numbers_and_symbols('617*......', 5)
-    ({5: [{'Match': '617', 'StartPosition': 1, 'EndPosition': 4}]}, \
-{5: [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]})
-    >>> get_numbers_and_symbols('.....+.58.', 6)
-    ({6: [{'Match': '58', 'StartPosition': 8, 'EndPosition': 10}]}, \
-{6: [{'Match': '+', 'StartPosition': 6, 'EndPosition': 7}]})
-    >>> get_numbers_and_symbols('..592.....', 7)
-    ({7: [{'Match': '592', 'StartPosition': 3, 'EndPosition': 6}]}, \
-{7: [None]})
-    >>> get_numbers_and_symbols('......755.', 8)
-    ({8: [{'Match': '755', 'StartPosition': 7, 'EndPosition': 10}]}, \
-{8: [None]})
-    >>> get_numbers_and_symbols('...$.*....', 9)
-    ({9: [None]}, \
-{9: [{'Match': '$', 'StartPosition': 4, 'EndPosition': 5}, \
-{'Match': '*', 'StartPosition': 6, 'EndPosition': 7}]})
-    >>> get_numbers_and_symbols('.664.598..', 10)
-    ({10: [{'Match': '664', 'StartPosition': 2, 'EndPosition': 5}, \
-{'Match': '598', 'StartPosition': 6, 'EndPosition': 9}]}, \
-{10: [None]})
+    A bytes or memoryview line is matched with the bytes regexes.
+    Returns a tuple of of the numbers and symbols spans returned from sucessive get_match_data calls.
+    >>> get_numbers_and_symbols('467..114..')
+    (Spans(starts=array('i', [1, 6]), ends=array('i', [4, 9]), values=array('q', [467, 114])), \
+Spans(starts=array('i'), ends=array('i'), values=array('q')))
+    >>> get_numbers_and_symbols('...*......')
+    (Spans(starts=array('i'), ends=array('i'), values=array('q')), Spans(starts=array('i', [4]), ends=array('i', \
+[5]), values=array('q', [42])))
+    >>> get_numbers_and_symbols('..35..633.')
+    (Spans(starts=array('i', [3, 7]), ends=array('i', [5, 10]), values=array('q', [35, 633])), \
+Spans(starts=array('i'), ends=array('i'), values=array('q')))
+    >>> get_numbers_and_symbols('......#...')
+    (Spans(starts=array('i'), ends=array('i'), values=array('q')), Spans(starts=array('i', [7]), ends=array('i', \
+[8]), values=array('q', [35])))
+    >>> get_numbers_and_symbols('617*......')
+    (Spans(starts=array('i', [1]), ends=array('i', [4]), values=array('q', [617])), Spans(starts=array('i', [4]), \
+ends=array('i', [5]), values=array('q', [42])))
+    >>> get_numbers_and_symbols(memoryview(b'617*......'))
+    (Spans(starts=array('i', [1]), ends=array('i', [4]), values=array('q', [617])), Spans(starts=array('i', [4]), \
+ends=array('i', [5]), values=array('q', [42])))
+    >>> get_numbers_and_symbols('.....+.58.')
+    (Spans(starts=array('i', [8]), ends=array('i', [10]), values=array('q', [58])), Spans(starts=array('i', [6]), \
+ends=array('i', [7]), values=array('q', [43])))
+    >>> get_numbers_and_symbols('..592.....')
+    (Spans(starts=array('i', [3]), ends=array('i', [6]), values=array('q', [592])), Spans(starts=array('i'), \
+ends=array('i'), values=array('q')))
+    >>> get_numbers_and_symbols('......755.')
+    (Spans(starts=array('i', [7]), ends=array('i', [10]), values=array('q', [755])), Spans(starts=array('i'), \
+ends=array('i'), values=array('q')))
+    >>> get_numbers_and_symbols('...$.*....')
+    (Spans(starts=array('i'), ends=array('i'), values=array('q')), Spans(starts=array('i', [4, 6]), \
+ends=array('i', [5, 7]), values=array('q', [36, 42])))
+    >>> get_numbers_and_symbols('.664.598..')
+    (Spans(starts=array('i', [2, 6]), ends=array('i', [5, 9]), values=array('q', [664, 598])), \
+Spans(starts=array('i'), ends=array('i'), values=array('q')))
     """
-    # local_debug = True
-    local_debug = False
-
-    # rex_number = re.compile(r"(\d+)")
-    # rex_symbol = re.compile(r"([^0-9.\r\n])")
-
-    numbers = get_match_data(line, line_number, rex_number)
-    symbols = get_match_data(line, line_number, rex_symbol)
-
-    if global_debug or local_debug:
-        # print(numbers)
-        # print(symbols)
-        print(numbers, symbols)
+    if isinstance(line, str):
+        numbers = get_match_data(line, rex_number)
+        symbols = get_match_data(line, rex_symbol)
+    else:
+        numbers = get_match_data(line, rex_number_bytes)
+        symbols = get_match_data(line, rex_symbol_bytes)
+
+    if instrumentation.enabled:
+        instrumentation.count('day03.lines_parsed')
     return numbers, symbols
 
 
-def parse_game_data(file: str) -> []:
+def parse_game_data(file: str) -> [(Spans, Spans)]:
     """Uses get_numbers_and_symbols to extract all the numbers and symbols
     along with thier start and end positions from all lines in a file.
-    Returns a list indexed by the game number containing the maximum number of cubes for each color.
-    >>> parse_game_data('tests/doctest-get_part_numbers.txt')
-    [([None], [None]), \
-([{'Match': '467', 'StartPosition': 1, 'EndPosition': 4}, \
-{'Match': '114', 'StartPosition': 6, 'EndPosition': 9}], \
-[None]), \
-([None], \
-[{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]), \
-([{'Match': '35', 'StartPosition': 3, 'EndPosition': 5}, \
-{'Match': '633', 'StartPosition': 7, 'EndPosition': 10}], \
-[None]), \
-([None], \
-[{'Match': '#', 'StartPosition': 7, 'EndPosition': 8}]), \
-([{'Match': '617', 'StartPosition': 1, 'EndPosition': 4}], \
-[{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]), \
-([{'Match': '58', 'StartPosition': 8, 'EndPosition': 10}], \
-[{'Match': '+', 'StartPosition': 6, 'EndPosition': 7}]), \
-([{'Match': '592', 'StartPosition': 3, 'EndPosition': 6}], \
-[None]), \
-([{'Match': '755', 'StartPosition': 7, 'EndPosition': 10}], \
-[None]), \
-([None], \
-[{'Match': '$', 'StartPosition': 4, 'EndPosition': 5}, \
-{'Match': '*', 'StartPosition': 6, 'EndPosition': 7}]), \
-([{'Match': '664', 'StartPosition': 2, 'EndPosition': 5}, \
-{'Match': '598', 'StartPosition': 6, 'EndPosition': 9}], \
-[None]), \
-([None], \
-[None])]
+    Returns a list with a tuple of the numbers and symbols spans of each line,
+    between artificial empty lines before the first line and after the last.
+    >>> [(list(numbers.values), ''.join(map(chr, symbols.values))) for numbers, symbols \
+in parse_game_data(TEST_FILE)]
+    [([], ''), ([467, 114], ''), ([], '*'), ([35, 633], ''), ([], '#'), ([617], '*'), ([58], '+'), ([592], ''), \
+([755], ''), ([], '$*'), ([664, 598], ''), ([], '')]
     """
     # local_debug = True
     local_debug = False
 
-    # lines = []
-    # lines.append(([None], [None]))  # Add empty line to create an artificial line "1"
     lines = [
-        ([None], [None])
+        (NO_SPANS, NO_SPANS)  # Add empty line to create an artificial line "0"
     ]
-    line_number = 0
-
-    with open(file, 'r') as f:
-        for line in f:
-            line_number += line_number
-            numbers, symbols = get_numbers_and_symbols(line, line_number)
 
-            if global_debug or local_debug:
-                print('Numbers: ', numbers)
-                print('Number values: ', list(numbers.values())[0])
-                print('Symbols: ', symbols)
-                print('Symbol values: ', list(symbols.values())[0])
+    for line in read_lines(file):
+        lines.append(get_numbers_and_symbols(line))
 
-            # lines.append((list(numbers.values()), list(symbols.values())))
-            # lines.append((numbers.values(), symbols.values()))
-            lines.append((list(numbers.values())[0], list(symbols.values())[0]))
-        f.close()
-
-    lines.append(([None], [None]))  # Add empty line to create an artificial line "n + 1"
+    lines.append((NO_SPANS, NO_SPANS))  # Add empty line to create an artificial line "n + 1"
 
     if global_debug or local_debug:
         print('Lines: ', lines)
     return lines
 
 
-def check_if_number_adjacent_to_symbol(number_value: {str, str | int},
-                                       symbol_values: [{str, str | int}]) -> bool:
-    """Checks to see if the number_value is between the start and end positions of any of the symbol_values.
+def get_span_arrays(file: str) -> [array]:
+    """Uses parse_game_data and flattens the spans of all lines into one array per field,
+    with the offsets in them where each line's numbers and symbols begin, the form cached by cached_arrays.
+    Returns a list of the number line offsets, starts, ends and values, packed by pack_integers,
+    then the same for the symbols.
+    >>> [list(values) for values in get_span_arrays(TEST_FILE)[:2]]
+    [[0, 2, 2, 4, 4, 5, 6, 7, 8, 8, 10], [1, 6, 3, 7, 1, 8, 3, 7, 2, 6]]
+    """
+    span_arrays = [array('q', [0]), array('i'), array('i'), [],
+                   array('q', [0]), array('i'), array('i'), array('q')]
+
+    for line_spans in parse_game_data(file)[1:-1]:
+        for spans, (offsets, starts, ends, values) in zip(line_spans, (span_arrays[:4], span_arrays[4:])):
+            starts.extend(spans.starts)
+            ends.extend(spans.ends)
+            values.extend(spans.values)
+            offsets.append(len(values))
+    span_arrays[3] = pack_integers(span_arrays[3])  # Numbers may not fit in array('q')
+
+    return span_arrays
+
+
+def load_game_data(file: str) -> [(Spans, Spans)]:
+    """Uses get_span_arrays, through the parse cache when it is turned on, so re-runs against an unchanged
+    file skip the regexes. Each line's spans are slices of the flattened arrays, which are not copied.
+    Returns the same list of numbers and symbols spans as parse_game_data.
+    >>> [list(numbers.values) for numbers, symbols in load_game_data(TEST_FILE)][:4]
+    [[], [467, 114], [], [35, 633]]
+    """
+    (number_offsets, number_starts, number_ends, number_values,
+     symbol_offsets, symbol_starts, symbol_ends, symbol_values) = cached_arrays(
+        file, 'day03-problem01-spans', PARSER_VERSION, get_span_arrays)
+
+    number_values = unpack_integers(number_values)
+
+    lines = [(NO_SPANS, NO_SPANS)]  # Artificial line "0"
+    for line in range(len(number_offsets) - 1):
+        number_start, number_end = number_offsets[line], number_offsets[line + 1]
+        symbol_start, symbol_end = symbol_offsets[line], symbol_offsets[line + 1]
+        lines.append((Spans(number_starts[number_start:number_end], number_ends[number_start:number_end],
+                            number_values[number_start:number_end]),
+                      Spans(symbol_starts[symbol_start:symbol_end], symbol_ends[symbol_start:symbol_end],
+                            symbol_values[symbol_start:symbol_end])))
+    lines.append((NO_SPANS, NO_SPANS))  # Artificial line "n + 1"
+
+    return lines
+
+
+def check_if_number_adjacent_to_symbol(number_start: int, number_end: int, symbol_starts: [int]) -> bool:
+    """Checks to see if any of the symbol_starts is between number_start - 1 and number_end,
+    i.e. on the same columns as the number or diagonally next to it.
     Returns a bool.
-    >>> check_if_number_adjacent_to_symbol({'Match': '467', 'StartPosition': 1, 'EndPosition': 4}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '114', 'StartPosition': 6, 'EndPosition': 9}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol(None, [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '35', 'StartPosition': 3, 'EndPosition': 5}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '633', 'StartPosition': 7, 'EndPosition': 10}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol(None, [{'Match': '#', 'StartPosition': 7, 'EndPosition': 8}])
+    >>> check_if_number_adjacent_to_symbol(1, 4, array('i'))
     False
-    >>> check_if_number_adjacent_to_symbol({'Match': '617', 'StartPosition': 1, 'EndPosition': 4}\
-    , [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}])
+    >>> check_if_number_adjacent_to_symbol(1, 4, array('i', [4]))
     True
-    >>> check_if_number_adjacent_to_symbol({'Match': '58', 'StartPosition': 8, 'EndPosition': 10}\
-    , [{'Match': '+', 'StartPosition': 6, 'EndPosition': 7}])
+    >>> check_if_number_adjacent_to_symbol(8, 10, array('i', [6]))
     False
-    >>> check_if_number_adjacent_to_symbol({'Match': '592', 'StartPosition': 3, 'EndPosition': 6}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '755', 'StartPosition': 7, 'EndPosition': 10}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol(None, [{'Match': '$', 'StartPosition': 4, 'EndPosition': 5}])
-    False
-    >>> check_if_number_adjacent_to_symbol(None, [{'Match': '*', 'StartPosition': 6, 'EndPosition': 7}])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '664', 'StartPosition': 2, 'EndPosition': 5}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '598', 'StartPosition': 6, 'EndPosition': 9}, [None])
+    >>> check_if_number_adjacent_to_symbol(6, 9, array('i', [4]))
     False
+    >>> check_if_number_adjacent_to_symbol(2, 5, array('i', [4, 6]))
+    True
+    >>> check_if_number_adjacent_to_symbol(6, 9, array('i', [4, 6]))
+    True
     """
-    # local_debug = True
-    local_debug = False
-
     is_adjacent = False
 
-    if local_debug:
-        print('Number value: ', number_value)
-        print('Symbol values: ', symbol_values)
-
-    if number_value is not None:
-        symbol_value: {int, [{str, str | int}]}
-        for symbol_value in symbol_values:
-            if symbol_value is not None:
-                if local_debug:
-                    print('First comparison: ', symbol_value[START_KEY] + 1, number_value[START_KEY])
-                    print('Second comparison: ', symbol_value[END_KEY] - 1, number_value[END_KEY])
+    for symbol_start in symbol_starts:
+        is_adjacent = number_start - 1 <= symbol_start <= number_end
 
-                is_adjacent = \
-                    symbol_value[START_KEY] + 1 >= number_value[START_KEY] and \
-                    symbol_value[END_KEY] - 1 <= number_value[END_KEY]
-
-                if is_adjacent:
-                    if global_debug or local_debug:
-                        print(number_value[MATCH_KEY] + ' is adjacent to ' + symbol_value[MATCH_KEY])
-                    break
+        if is_adjacent:
+            break
 
+    if instrumentation.enabled:
+        # The scan stops at the first symbol from number_start - 1 on, which the sorted starts give by bisection
+        comparisons = bisect_left(symbol_starts, number_start - 1) + 1 if is_adjacent else len(symbol_starts)
+        instrumentation.count('day03.adjacency_comparisons', comparisons)
     return is_adjacent
 
 
-def check_if_symbol_on_edge_of_number(number_value: {str, str | int},
-                                      surrounding_lines_symbols: [[{str, str | int}]]) -> bool:
-    """Checks to see if the number_value is between the start and end positions of any of the symbol_values.
+def check_if_number_adjacent_to_symbol_bisect(number_start: int, number_end: int, symbol_starts: [int]) -> bool:
+    """Checks to see if any of the symbol_starts is between number_start - 1 and number_end
+    with a binary search, relying on symbol_starts being sorted as get_match_data produces them.
+    Costs O(log k) for a line with k symbols, where check_if_number_adjacent_to_symbol costs O(k).
     Returns a bool.
-    >>> check_if_symbol_on_edge_of_number({'Match': '467', 'StartPosition': 1, 'EndPosition': 4}, \
-    [[None], [None], [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]])
-    True
-    >>> check_if_symbol_on_edge_of_number({'Match': '114', 'StartPosition': 6, 'EndPosition': 9}, \
-    [[None], [None], [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]])
+    >>> check_if_number_adjacent_to_symbol_bisect(1, 4, array('i'))
     False
-    >>> check_if_symbol_on_edge_of_number(None, \
-    [[None], [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}], [None]])
-    False
-    >>> check_if_symbol_on_edge_of_number({'Match': '35', 'StartPosition': 3, 'EndPosition': 5}, \
-    [[{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}], [None]\
-    , [{'Match': '#', 'StartPosition': 7, 'EndPosition': 8}]])
-    True
-    >>> check_if_symbol_on_edge_of_number({'Match': '633', 'StartPosition': 7, 'EndPosition': 10}, \
-    [[{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}], [None]\
-    , [{'Match': '#', 'StartPosition': 7, 'EndPosition': 8}]])
-    True
-    >>> check_if_symbol_on_edge_of_number(None, \
-    [[None], [{'Match': '#', 'StartPosition': 7, 'EndPosition': 8}]\
-    , [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]])
-    False
-    >>> check_if_symbol_on_edge_of_number({'Match': '617', 'StartPosition': 1, 'EndPosition': 4}, \
-    [[{'Match': '#', 'StartPosition': 7, 'EndPosition': 8}]\
-    , [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]\
-    , [{'Match': '+', 'StartPosition': 6, 'EndPosition': 7}]])
+    >>> check_if_number_adjacent_to_symbol_bisect(1, 4, array('i', [4]))
     True
-    >>> check_if_symbol_on_edge_of_number({'Match': '58', 'StartPosition': 8, 'EndPosition': 10}, \
-    [[{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]\
-    , [{'Match': '+', 'StartPosition': 6, 'EndPosition': 7}], [None]])
+    >>> check_if_number_adjacent_to_symbol_bisect(6, 9, array('i', [1, 2, 4, 11, 12]))
     False
-    >>> check_if_symbol_on_edge_of_number({'Match': '592', 'StartPosition': 3, 'EndPosition': 6}, \
-    [[{'Match': '+', 'StartPosition': 6, 'EndPosition': 7}], [None], [None]])
+    >>> check_if_number_adjacent_to_symbol_bisect(6, 9, array('i', [1, 2, 4, 9, 12]))
     True
-    >>> check_if_symbol_on_edge_of_number({'Match': '755', 'StartPosition': 7, 'EndPosition': 10}, \
-    [[None], [None], \
-    [{'Match': '$', 'StartPosition': 4, 'EndPosition': 5}\
-    , {'Match': '*', 'StartPosition': 6, 'EndPosition': 7}]])
+    """
+    index = bisect_left(symbol_starts, number_start - 1)
+
+    if instrumentation.enabled:
+        instrumentation.count('day03.adjacency_searches')
+    return index < len(symbol_starts) and symbol_starts[index] <= number_end
+
+
+def check_if_symbol_on_edge_of_number(number_start: int, number_end: int,
+                                      surrounding_lines_symbols: [Spans], engine: str = ENGINE_LINEAR) -> bool:
+    """Checks to see if any symbol on the surrounding lines is adjacent to the number between number_start
+    and number_end, using check_if_number_adjacent_to_symbol_bisect for the ENGINE_BISECT engine
+    and check_if_number_adjacent_to_symbol otherwise.
+    Returns a bool.
+    >>> check_if_symbol_on_edge_of_number(1, 4, [NO_SPANS, NO_SPANS, get_match_data('...*......', rex_symbol)])
     True
-    >>> check_if_symbol_on_edge_of_number(None, [[None], \
-    [{'Match': '$', 'StartPosition': 4, 'EndPosition': 5}\
-    , {'Match': '*', 'StartPosition': 6, 'EndPosition': 7}], [None]])
+    >>> check_if_symbol_on_edge_of_number(6, 9, [NO_SPANS, NO_SPANS, get_match_data('...*......', rex_symbol)])
+    False
+    >>> check_if_symbol_on_edge_of_number(8, 10, [get_match_data('617*......', rex_symbol), \
+get_match_data('.....+.58.', rex_symbol), NO_SPANS])
     False
-    >>> check_if_symbol_on_edge_of_number({'Match': '664', 'StartPosition': 2, 'EndPosition': 5}, \
-    [[{'Match': '$', 'StartPosition': 4, 'EndPosition': 5}\
-    , {'Match': '*', 'StartPosition': 6, 'EndPosition': 7}], [None], [None]])
+    >>> check_if_symbol_on_edge_of_number(3, 6, [get_match_data('.....+.58.', rex_symbol), NO_SPANS, NO_SPANS])
     True
-    >>> check_if_symbol_on_edge_of_number({'Match': '598', 'StartPosition': 6, 'EndPosition': 9}, \
-    [[{'Match': '$', 'StartPosition': 4, 'EndPosition': 5}\
-    , {'Match': '*', 'StartPosition': 6, 'EndPosition': 7}], [None], [None]])
+    >>> check_if_symbol_on_edge_of_number(7, 10, [NO_SPANS, NO_SPANS, get_match_data('...$.*....', rex_symbol)])
     True
     """
-    # local_debug = True
-    local_debug = False
-
     is_on_edge = False
-
-    if local_debug:
-        print('Number value: ', number_value)
+    if engine == ENGINE_BISECT:
+        is_adjacent = check_if_number_adjacent_to_symbol_bisect
+    else:
+        is_adjacent = check_if_number_adjacent_to_symbol
 
     for surrounding_line_symbols in surrounding_lines_symbols:
-        if local_debug:
-            print('Surrounding line symbols: ', surrounding_line_symbols)
-
-        is_on_edge = check_if_number_adjacent_to_symbol(
-            number_value, surrounding_line_symbols)
+        is_on_edge = is_adjacent(number_start, number_end, surrounding_line_symbols.starts)
 
         if is_on_edge:
-            if global_debug or local_debug:
-                print(number_value[MATCH_KEY], ' is on edge of ',
-                      ' '.join([symbol[MATCH_KEY] for symbol in surrounding_line_symbols]))
             break
 
     return is_on_edge
 
 
-def get_part_numbers(file: str) -> [int]:
-    """Uses check_if_symbol_on_edge_of_number to determine if a number value has a symbol on an edge.
+def get_row_part_numbers(prior_line: (Spans, Spans), current_line: (Spans, Spans),
+                         next_line: (Spans, Spans), engine: str = ENGINE_LINEAR) -> [int]:
+    """Uses check_if_symbol_on_edge_of_number to determine which numbers on the current line have a symbol
+    on an edge, looking only at the symbols of the prior, current and next lines.
+    Each line is a tuple of numbers and symbols spans as built by parse_game_data.
+    Returns the list of part numbers on the current line.
+    >>> get_row_part_numbers((NO_SPANS, NO_SPANS), get_numbers_and_symbols('467..114..'), \
+get_numbers_and_symbols('...*......'))
+    [467]
+    """
+    part_numbers = []
+    current_numbers = current_line[0]
+    surrounding_lines_symbols = [prior_line[1], current_line[1], next_line[1]]
+    if instrumentation.enabled:
+        comparisons = instrumentation.counters['day03.adjacency_comparisons']
+
+    for number_start, number_end, number in zip(current_numbers.starts, current_numbers.ends, current_numbers.values):
+        if check_if_symbol_on_edge_of_number(number_start, number_end, surrounding_lines_symbols, engine):
+            part_numbers.append(number)
+
+    if instrumentation.enabled:
+        instrumentation.count('day03.rows')
+        instrumentation.count('day03.part_numbers', len(part_numbers))
+        instrumentation.record('day03.adjacency_comparisons_per_row',
+                               instrumentation.counters['day03.adjacency_comparisons'] - comparisons)
+    return part_numbers
+
+
+def get_part_numbers(file: str, engine: str = ENGINE_LINEAR) -> [int]:
+    """Uses get_row_part_numbers to determine if a number value has a symbol on an edge.
     Returns the list of all number vlaues converted into an integer.
-    >>> get_part_numbers('tests/doctest-get_part_numbers.txt')
+    >>> get_part_numbers(TEST_FILE)
+    [467, 35, 633, 617, 592, 755, 664, 598]
+    >>> get_part_numbers(TEST_FILE, ENGINE_BISECT)
     [467, 35, 633, 617, 592, 755, 664, 598]
     """
     # local_debug = True
     local_debug = False
 
     part_numbers = []
-    lines = parse_game_data(file)
+    with instrumentation.stage('day03.parse'):
+        lines = load_game_data(file)
 
-    for i in range(1, len(lines) - 1):
-        current_line = lines[i]
-        current_number_values = current_line[0]
-        current_symbol_values = current_line[1]
-
-        prior_line = lines[i - 1]
-        prior_symbol_values = prior_line[1]
-
-        next_line = lines[i + 1]
-        next_symbol_values = next_line[1]
-
-        if current_number_values is not None:
-            for current_number_value in current_number_values:
-                # if local_debug:
-                #     print('Index: ', i)
-                #     print('Current number value: ', current_number_value)
-                #     print('Prior symbol values: ', prior_symbol_values)
-                #     print('Current symbol values: ', current_symbol_values)
-                #     print('Next symbol values: ', next_symbol_values)
-
-                is_part_number = check_if_symbol_on_edge_of_number(
-                    current_number_value,
-                    [prior_symbol_values, current_symbol_values, next_symbol_values])
-
-                if is_part_number:
-                    if local_debug:
-                        print('Part: ', int(current_number_value[MATCH_KEY]))
-                    part_numbers.append(int(current_number_value[MATCH_KEY]))
+    with instrumentation.stage('day03.match'):
+        for i in range(1, len(lines) - 1):
+            part_numbers.extend(get_row_part_numbers(lines[i - 1], lines[i], lines[i + 1], engine))
 
     if global_debug or local_debug:
         print(part_numbers)
     return part_numbers
 
 
-def sum_of_part_numbers(file: str) -> int:
-    """Uses get_part_numbers to extract all part numbers from the file.
+def iter_part_numbers(lines: Iterable[str | bytes], engine: str = ENGINE_LINEAR) -> Iterator[int]:
+    """Uses get_numbers_and_symbols and get_row_part_numbers over a rolling window of three parsed lines,
+    so only three lines are held at a time and the part numbers of each line are produced
+    as soon as the following line arrives.
+    Yields the part numbers, in the same order as get_part_numbers.
+    >>> list(iter_part_numbers(['467..114..', '...*......', '..35..633.']))
+    [467, 35]
+    """
+    window = deque([(NO_SPANS, NO_SPANS)], maxlen=3)  # Artificial line "0" before the first line
+
+    for line in lines:
+        window.append(get_numbers_and_symbols(line))
+
+        if len(window) == 3:
+            yield from get_row_part_numbers(*window, engine)
+
+    window.append((NO_SPANS, NO_SPANS))  # Artificial line "n + 1" after the last line
+    if len(window) == 3:
+        yield from get_row_part_numbers(*window, engine)
+
+
+def sum_of_part_numbers_streaming(file: str, engine: str = ENGINE_LINEAR) -> int:
+    """Uses iter_part_numbers to extract all part numbers from the file while it is being read.
+    Memory is proportional to the width of the schematic rather than its size.
+    Returns the sum all part numbers extracted from the file.
+    >>> sum_of_part_numbers_streaming(TEST_FILE)
+    4361
+    >>> sum_of_part_numbers_streaming(TEST_FILE, ENGINE_BISECT)
+    4361
+    """
+    return sum(iter_part_numbers(read_lines(file), engine))
+
+
+def load_grid(file: str) -> [bytes]:
+    """Loads the schematic as a 2-D byte grid.
+    Returns a list with the bytes of each row, without line terminators.
+    >>> load_grid(TEST_FILE)[:2]
+    [b'467..114..', b'...*......']
+    """
+    return [bytes(line) for line in read_lines(file)]
+
+
+def get_symbol_mask(grid: [bytes]) -> [bytearray]:
+    """Marks every cell that touches a symbol, i.e. the symbol cells dilated by one cell in all 8 directions.
+    Mask rows are shifted right by one cell, so column c of the grid is index c + 1 of its mask row
+    and the dilation never falls off the left edge.
+    Returns a list with a bytearray mask for each row, holding 1 where a cell touches a symbol.
+    >>> [list(row) for row in get_symbol_mask([b'....', b'.#..', b'....', b'...*'])]
+    [[0, 1, 1, 1, 0, 0], [0, 1, 1, 1, 0, 0], [0, 1, 1, 1, 1, 1], [0, 0, 0, 1, 1, 1]]
+    """
+    width = max((len(row) for row in grid), default=0)
+    mask = [bytearray(width + 2) for _ in grid]
+    neighbourhood = b'\x01\x01\x01'
+
+    for row_index, row in enumerate(grid):
+        for symbol in rex_symbol_bytes.finditer(row):
+            column = symbol.start()
+            for mask_row in mask[max(row_index - 1, 0):row_index + 2]:
+                mask_row[column:column + 3] = neighbourhood
+
+    return mask
+
+
+def get_part_numbers_from_grid(grid: [bytes]) -> [int]:
+    """Uses get_symbol_mask to mark the cells touching a symbol, then checks the cells of each number against it,
+    so the work is linear in the size of the grid however dense the numbers and symbols are.
+    Returns the list of all part numbers, in the same order as get_part_numbers.
+    >>> get_part_numbers_from_grid(load_grid(TEST_FILE))
+    [467, 35, 633, 617, 592, 755, 664, 598]
+    """
+    part_numbers = []
+    with instrumentation.stage('day03.mask'):
+        mask = get_symbol_mask(grid)
+
+    with instrumentation.stage('day03.match'):
+        for row, mask_row in zip(grid, mask):
+            for number in rex_number_bytes.finditer(row):
+                if mask_row.find(1, number.start() + 1, number.end() + 1) != -1:
+                    part_numbers.append(int(number.group()))
+
+    if instrumentation.enabled:
+        instrumentation.count('day03.rows', len(grid))
+        instrumentation.count('day03.part_numbers', len(part_numbers))
+    if global_debug:
+        print(part_numbers)
+    return part_numbers
+
+
+def get_grid_part_number_array(file: str) -> [array]:
+    """Uses load_grid and get_part_numbers_from_grid to extract all part numbers from a file.
+    Returns a list holding the part numbers packed by pack_integers, in the form cached by cached_arrays.
+    >>> get_grid_part_number_array(TEST_FILE)
+    [array('q', [467, 35, 633, 617, 592, 755, 664, 598])]
+    """
+    return [pack_integers(get_part_numbers_from_grid(load_grid(file)))]
+
+
+def load_grid_part_numbers(file: str) -> array | memoryview:
+    """Uses get_grid_part_number_array, through the parse cache when it is turned on, so re-runs of the
+    ENGINE_GRID engine against an unchanged file skip both the grid and the mask.
+    Returns the part numbers of the file.
+    >>> list(load_grid_part_numbers(TEST_FILE))
+    [467, 35, 633, 617, 592, 755, 664, 598]
+    """
+    return unpack_integers(cached_arrays(file, 'day03-problem01-grid-part-numbers', PARSER_VERSION,
+                                         get_grid_part_number_array)[0])
+
+
+def get_part_numbers_in_band(file: str, start: int, end: int, engine: str = ENGINE_LINEAR) -> [int]:
+    """Uses get_row_part_numbers on the rows in the byte range [start, end) of a file, a horizontal band
+    of the schematic. The band is read with one halo row on each side from get_halo_offsets, so numbers next to
+    symbols across the band boundaries are found, but only the numbers on the band's own rows are returned.
+    Every number belongs to exactly one band, so none is counted twice.
+    Returns the list of part numbers on the band's rows, in the same order as get_part_numbers.
+    >>> get_part_numbers_in_band(TEST_FILE, 22, 55)
+    [35, 633, 617]
+    """
+    halo_start, halo_end = get_halo_offsets(file, start, end)
+    lines = [get_numbers_and_symbols(line) for line in read_lines(file, halo_start, halo_end)]
+    if halo_start == start:
+        lines.insert(0, (NO_SPANS, NO_SPANS))  # Artificial line "0" before the first line of the file
+    if halo_end == end:
+        lines.append((NO_SPANS, NO_SPANS))  # Artificial line "n + 1" after the last line of the file
+
+    part_numbers = []
+    for i in range(1, len(lines) - 1):
+        part_numbers.extend(get_row_part_numbers(lines[i - 1], lines[i], lines[i + 1], engine))
+
+    return part_numbers
+
+
+def get_part_numbers_parallel(file: str, engine: str = ENGINE_LINEAR, workers: int | None = None,
+                              min_bytes: int = PARALLEL_MIN_BYTES) -> [int]:
+    """Splits the schematic into newline-aligned horizontal bands and uses get_part_numbers_in_band
+    on each in a worker process. Files smaller than min_bytes, or a single worker, are handled as one band.
+    Returns the list of all part numbers, identical to get_part_numbers.
+    >>> get_part_numbers_parallel(TEST_FILE, workers=2, min_bytes=0)
+    [467, 35, 633, 617, 592, 755, 664, 598]
+    """
+    band_part_numbers = reduce_chunks(file, partial(get_part_numbers_in_band, engine=engine), workers, min_bytes)
+
+    return [part_number for part_numbers in band_part_numbers for part_number in part_numbers]
+
+
+def sum_of_part_numbers(file: str, engine: str = ENGINE_GRID, workers: int = 1) -> int:
+    """Uses load_grid_part_numbers for the ENGINE_GRID engine, or get_part_numbers with the
+    ENGINE_LINEAR or ENGINE_BISECT adjacency checks, to extract all part numbers from the file.
+    Both go through the parse cache when it is turned on.
+    With more than one worker the file is split into bands by get_part_numbers_parallel,
+    which uses the ENGINE_BISECT checks for the ENGINE_GRID engine.
     Part numbers have a symbol on an edge.
     Returns the sum all part numbers extracted from the file.
-    >>> sum_of_part_numbers('tests/doctest-get_part_numbers.txt')
+    >>> sum_of_part_numbers(TEST_FILE)
+    4361
+    >>> [sum_of_part_numbers(TEST_FILE, engine) \
+for engine in (ENGINE_LINEAR, ENGINE_BISECT, ENGINE_GRID)]
+    [4361, 4361, 4361]
+    >>> sum_of_part_numbers(TEST_FILE, workers=2)
     4361
     """
-    part_numbers = get_part_numbers(file)
+    if workers != 1:
+        band_engine = ENGINE_BISECT if engine == ENGINE_GRID else engine
+        part_numbers = get_part_numbers_parallel(file, band_engine, workers)
+    elif engine == ENGINE_GRID:
+        part_numbers = load_grid_part_numbers(file)
+    else:
+        part_numbers = get_part_numbers(file, engine)
     return sum(part_numbers)
 
 
@@ -438,12 +548,9 @@ def sum_of_part_numbers(file: str) -> int:
 # parse_game_data('......755.', 8)
 # parse_game_data('...$.*....', 9)
 # parse_game_data('.664.598..', 10)
-# print(parse_game_data('tests/doctest-get_part_numbers.txt'))
-# current_number_value = {'Match': '467', 'StartPosition': 1, 'EndPosition': 4}
-# current_symbol_values = [None]
-# current_number_value = {'Match': '617', 'StartPosition': 1, 'EndPosition': 4}
-# current_symbol_values = [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]
-# print(check_if_number_adjacent_to_symbol(current_number_value, current_symbol_values))
-# print(get_part_numbers('tests/doctest-get_part_numbers.txt'))
-# print(sum_of_part_numbers('tests/doctest-get_part_numbers.txt'))
-print(sum_of_part_numbers('resources/input.txt'))
+# print(parse_game_data(TEST_FILE))
+# print(check_if_number_adjacent_to_symbol(1, 4, array('i', [4])))
+# print(get_part_numbers(TEST_FILE))
+# print(sum_of_part_numbers(TEST_FILE))
+if __name__ == '__main__':
+    print(run_entry(sum_of_part_numbers, INPUT_FILE))
@@ -1,439 +1,425 @@
 import re
-from typing import Dict, List, Tuple
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque, namedtuple
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from common.cache import cached_arrays, pack_integers, unpack_integers  # noqa: E402
+from common.instrumentation import instrumentation  # noqa: E402
+from common.parallel import PARALLEL_MIN_BYTES, get_halo_offsets, reduce_chunks  # noqa: E402
+from common.profiling import run_entry  # noqa: E402
+from common.reader import get_module_file, read_lines  # noqa: E402
 
 # global_debug = True
 global_debug = False
 
-MATCH_KEY = 'Match'
-START_KEY = 'StartPosition'
-END_KEY = 'EndPosition'
+INPUT_FILE = get_module_file(__file__, 'resources', 'input.txt')
+TEST_FILE = get_module_file(__file__, 'tests', 'doctest-get_gear_ratios.txt')
+
+# Parallel arrays of the 1-based start and end (exclusive) positions and the values of the matches on a line.
+# A number's value is the number itself and a symbol's value is its character code.
+Spans = namedtuple('Spans', ['starts', 'ends', 'values'])
+NO_SPANS = Spans(array('i'), array('i'), array('q'))  # Shared by artificial lines, never appended to
+PARSER_VERSION = 1  # Bump when get_span_arrays or get_grid_gear_pair_arrays change, so cached data is not reused
+
+# Engines for finding gear pairs, selectable in sum_of_gear_ratios for A/B comparisons
+ENGINE_LINEAR = 'linear'  # Check every number on the neighbouring lines for each asterisk
+ENGINE_BISECT = 'bisect'  # Binary search the sorted number spans on the neighbouring lines for each asterisk
+ENGINE_GRID = 'grid'  # Look up the labelled numbers around each asterisk in the whole grid
 
 rex_number = re.compile(r"(\d+)")
 # rex_symbol = re.compile(r"([^0-9.\r\n])")
 # rex_asterisk = re.compile(r"(\*)")
 rex_symbol = re.compile(r"(\*)")
-
-
-def get_match_data(line: str, line_number: int, rex: re.Pattern) -> dict:
-    """Extracts strings from line that match the regex along with start and end positions.
-    Returns a dictionary with a list of dictionaries containing matching strings and their positions.
-    >>> get_match_data('467..114..', 1, rex_number)
-    {1: [{'Match': '467', 'StartPosition': 1, 'EndPosition': 4}, \
-{'Match': '114', 'StartPosition': 6, 'EndPosition': 9}]}
-    >>> get_match_data('467..114..', 1, rex_symbol)
-    {1: [None]}
-    >>> get_match_data('...*......', 2, rex_number)
-    {2: [None]}
-    >>> get_match_data('...*......', 2, rex_symbol)
-    {2: [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]}
-    >>> get_match_data('..35..633.', 3, rex_number)
-    {3: [{'Match': '35', 'StartPosition': 3, 'EndPosition': 5}, \
-{'Match': '633', 'StartPosition': 7, 'EndPosition': 10}]}
-    >>> get_match_data('..35..633.', 3, rex_symbol)
-    {3: [None]}
-    >>> get_match_data('......#...', 4, rex_number)
-    {4: [None]}
-    >>> get_match_data('......#...', 4, rex_symbol)
-    {4: [None]}
-    >>> get_match_data('617*......', 5, rex_number)
-    {5: [{'Match': '617', 'StartPosition': 1, 'EndPosition': 4}]}
-    >>> get_match_data('617*......', 5, rex_symbol)
-    {5: [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]}
-    >>> get_match_data('.....+.58.', 6, rex_number)
-    {6: [{'Match': '58', 'StartPosition': 8, 'EndPosition': 10}]}
-    >>> get_match_data('.....+.58.', 6, rex_symbol)
-    {6: [None]}
-    >>> get_match_data('..592.....', 7, rex_number)
-    {7: [{'Match': '592', 'StartPosition': 3, 'EndPosition': 6}]}
-    >>> get_match_data('..592.....', 7, rex_symbol)
-    {7: [None]}
-    >>> get_match_data('......755.', 8, rex_number)
-    {8: [{'Match': '755', 'StartPosition': 7, 'EndPosition': 10}]}
-    >>> get_match_data('......755.', 8, rex_symbol)
-    {8: [None]}
-    >>> get_match_data('...$.*....', 9, rex_number)
-    {9: [None]}
-    >>> get_match_data('...$.*....', 9, rex_symbol)
-    {9: [{'Match': '*', 'StartPosition': 6, 'EndPosition': 7}]}
-    >>> get_match_data('.664.598..', 10, rex_number)
-    {10: [{'Match': '664', 'StartPosition': 2, 'EndPosition': 5}, \
-{'Match': '598', 'StartPosition': 6, 'EndPosition': 9}]}
-    >>> get_match_data('.664.598..', 10, rex_symbol)
-    {10: [None]}
+rex_number_bytes = re.compile(rb"(\d+)")
+rex_symbol_bytes = re.compile(rb"(\*)")
+
+
+def get_match_data(line: str | bytes, rex: re.Pattern) -> Spans:
+    """Extracts the matches of the regex from line along with their start and end positions.
+    A bytes or memoryview line needs a bytes regex.
+    Values are kept in an array('q') until a number does not fit in a signed 64-bit integer,
+    and in a list from then on.
+    Returns a Spans of the start positions, end positions and values of the matches.
+    >>> get_match_data('467..114..', rex_number)
+    Spans(starts=array('i', [1, 6]), ends=array('i', [4, 9]), values=array('q', [467, 114]))
+    >>> get_match_data('467..114..', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('...*......', rex_number)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('...*......', rex_symbol)
+    Spans(starts=array('i', [4]), ends=array('i', [5]), values=array('q', [42]))
+    >>> get_match_data('..35..633.', rex_number)
+    Spans(starts=array('i', [3, 7]), ends=array('i', [5, 10]), values=array('q', [35, 633]))
+    >>> get_match_data('..35..633.', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('......#...', rex_number)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('......#...', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('617*......', rex_number)
+    Spans(starts=array('i', [1]), ends=array('i', [4]), values=array('q', [617]))
+    >>> get_match_data('617*......', rex_symbol)
+    Spans(starts=array('i', [4]), ends=array('i', [5]), values=array('q', [42]))
+    >>> get_match_data('.....+.58.', rex_number)
+    Spans(starts=array('i', [8]), ends=array('i', [10]), values=array('q', [58]))
+    >>> get_match_data('.....+.58.', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('..592.....', rex_number)
+    Spans(starts=array('i', [3]), ends=array('i', [6]), values=array('q', [592]))
+    >>> get_match_data('..592.....', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('......755.', rex_number)
+    Spans(starts=array('i', [7]), ends=array('i', [10]), values=array('q', [755]))
+    >>> get_match_data('......755.', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('...$.*....', rex_number)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('...$.*....', rex_symbol)
+    Spans(starts=array('i', [6]), ends=array('i', [7]), values=array('q', [42]))
+    >>> get_match_data('.664.598..', rex_number)
+    Spans(starts=array('i', [2, 6]), ends=array('i', [5, 9]), values=array('q', [664, 598]))
+    >>> get_match_data('.664.598..', rex_symbol)
+    Spans(starts=array('i'), ends=array('i'), values=array('q'))
+    >>> get_match_data('12.1234567890123456789012*', rex_number).values
+    [12, 1234567890123456789012]
     """
-    # local_debug = True
-    local_debug = False
-
-    match_data = {
-        line_number: [None]
-    }
-
-    match_results = rex.split(line)
-    if len(match_results) != 1:
-        position = 1
-        order = 0
-        for match_result in match_results:
-            if len(match_result) > 0:
-                if rex.fullmatch(match_result) is not None:
-                    order += 1
-                    if order == 1:
-                        # match_data[line_number] = {}
-                        match_data[line_number] = []
-
-                    # match_data[line_number][order] = {}
-                    # match_data[line_number][order][MATCH_KEY] = match_result
-                    # match_data[line_number][order][START_KEY] = position
-                    # match_data[line_number][order][END_KEY] = position + len(match_result)
-
-                    # match_data[line_number].append(dict(
-                    #     MATCH_KEY=match_result,
-                    #     START_KEY=position,
-                    #     END_KEY=position + len(match_result)
-                    # ))
-
-                    data = {}
-                    data[MATCH_KEY] = match_result
-                    data[START_KEY] = position
-                    data[END_KEY] = position + len(match_result)
-                    match_data[line_number].append(data)
-
-                    position += len(match_result)
-                else:
-                    position += len(match_result)
-
-    if global_debug or local_debug:
-        print(match_data)
+    match_data = Spans(array('i'), array('i'), array('q'))
+
+    for match in rex.finditer(line):
+        match_result = match.group()
+        match_data.starts.append(match.start() + 1)
+        match_data.ends.append(match.end() + 1)
+        value = int(match_result) if match_result.isdigit() else ord(match_result)
+        try:
+            match_data.values.append(value)
+        except OverflowError:
+            match_data = match_data._replace(values=list(match_data.values) + [value])
+
+    if instrumentation.enabled:
+        instrumentation.count('day03.spans_found', len(match_data.values))
     return match_data
 
 
-def get_numbers_and_symbols(line: str, line_number: int) -> tuple:
-    """Uses get_match_data to extract matching strings with
+def get_numbers_and_symbols(line: str | bytes) -> (Spans, Spans):
+    """Uses get_match_data to extract matches with
     start and end positions from line for both numbers and symbols.
-    Returns a tuple of of the numbers and symbols dictionaries returned from sucessive get_match_data calls.
-    >>> get_numbers_and_symbols('467..114..', 1)
-    ({1: [{'Match': '467', 'StartPosition': 1, 'EndPosition': 4}, \
-{'Match': '114', 'StartPosition': 6, 'EndPosition': 9}]}, \
-{1: [None]})
-    >>> get_numbers_and_symbols('...*......', 2)
-    ({2: [None]}, \
-{2: [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]})
-    >>> get_numbers_and_symbols('..35..633.', 3)
-    ({3: [{'Match': '35', 'StartPosition': 3, 'EndPosition': 5}, \
-{'Match': '633', 'StartPosition': 7, 'EndPosition': 10}]}, \
-{3: [None]})
-    >>> get_numbers_and_symbols('......#...', 4)
-    ({4: [None]}, \
-{4: [None]})
-    >>> get_numbers_and_symbols('617*......', 5)
-    ({5: [{'Match': '617', 'StartPosition': 1, 'EndPosition': 4}]}, \
-{5: [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]})
-    >>> get_numbers_and_symbols('.....+.58.', 6)
-    ({6: [{'Match': '58', 'StartPosition': 8, 'EndPosition': 10}]}, \
-{6: [None]})
-    >>> get_numbers_and_symbols('..592.....', 7)
-    ({7: [{'Match': '592', 'StartPosition': 3, 'EndPosition': 6}]}, \
-{7: [None]})
-    >>> get_numbers_and_symbols('......755.', 8)
-    ({8: [{'Match': '755', 'StartPosition': 7, 'EndPosition': 10}]}, \
-{8: [None]})
-    >>> get_numbers_and_symbols('...$.*....', 9)
-    ({9: [None]}, \
-{9: [{'Match': '*', 'StartPosition': 6, 'EndPosition': 7}]})
-    >>> get_numbers_and_symbols('.664.598..', 10)
-    ({10: [{'Match': '664', 'StartPosition': 2, 'EndPosition': 5}, \
-{'Match': '598', 'StartPosition': 6, 'EndPosition': 9}]}, \
-{10: [None]})
+    A bytes or memoryview line is matched with the bytes regexes.
+    Returns a tuple of of the numbers and symbols spans returned from sucessive get_match_data calls.
+    >>> get_numbers_and_symbols('467..114..')
+    (Spans(starts=array('i', [1, 6]), ends=array('i', [4, 9]), values=array('q', [467, 114])), \
+Spans(starts=array('i'), ends=array('i'), values=array('q')))
+    >>> get_numbers_and_symbols('...*......')
+    (Spans(starts=array('i'), ends=array('i'), values=array('q')), Spans(starts=array('i', [4]), ends=array('i', \
+[5]), values=array('q', [42])))
+    >>> get_numbers_and_symbols('..35..633.')
+    (Spans(starts=array('i', [3, 7]), ends=array('i', [5, 10]), values=array('q', [35, 633])), \
+Spans(starts=array('i'), ends=array('i'), values=array('q')))
+    >>> get_numbers_and_symbols('......#...')
+    (Spans(starts=array('i'), ends=array('i'), values=array('q')), Spans(starts=array('i'), ends=array('i'), \
+values=array('q')))
+    >>> get_numbers_and_symbols('617*......')
+    (Spans(starts=array('i', [1]), ends=array('i', [4]), values=array('q', [617])), Spans(starts=array('i', [4]), \
+ends=array('i', [5]), values=array('q', [42])))
+    >>> get_numbers_and_symbols(memoryview(b'617*......'))
+    (Spans(starts=array('i', [1]), ends=array('i', [4]), values=array('q', [617])), Spans(starts=array('i', [4]), \
+ends=array('i', [5]), values=array('q', [42])))
+    >>> get_numbers_and_symbols('.....+.58.')
+    (Spans(starts=array('i', [8]), ends=array('i', [10]), values=array('q', [58])), Spans(starts=array('i'), \
+ends=array('i'), values=array('q')))
+    >>> get_numbers_and_symbols('..592.....')
+    (Spans(starts=array('i', [3]), ends=array('i', [6]), values=array('q', [592])), Spans(starts=array('i'), \
+ends=array('i'), values=array('q')))
+    >>> get_numbers_and_symbols('......755.')
+    (Spans(starts=array('i', [7]), ends=array('i', [10]), values=array('q', [755])), Spans(starts=array('i'), \
+ends=array('i'), values=array('q')))
+    >>> get_numbers_and_symbols('...$.*....')
+    (Spans(starts=array('i'), ends=array('i'), values=array('q')), Spans(starts=array('i', [6]), ends=array('i', \
+[7]), values=array('q', [42])))
+    >>> get_numbers_and_symbols('.664.598..')
+    (Spans(starts=array('i', [2, 6]), ends=array('i', [5, 9]), values=array('q', [664, 598])), \
+Spans(starts=array('i'), ends=array('i'), values=array('q')))
     """
-    # local_debug = True
-    local_debug = False
-
-    # rex_number = re.compile(r"(\d+)")
-    # rex_symbol = re.compile(r"([^0-9.\r\n])")
-
-    numbers = get_match_data(line, line_number, rex_number)
-    symbols = get_match_data(line, line_number, rex_symbol)
-
-    if global_debug or local_debug:
-        # print(numbers)
-        # print(symbols)
-        print(numbers, symbols)
+    if isinstance(line, str):
+        numbers = get_match_data(line, rex_number)
+        symbols = get_match_data(line, rex_symbol)
+    else:
+        numbers = get_match_data(line, rex_number_bytes)
+        symbols = get_match_data(line, rex_symbol_bytes)
+
+    if instrumentation.enabled:
+        instrumentation.count('day03.lines_parsed')
     return numbers, symbols
 
 
-def parse_game_data(file: str) -> []:
+def parse_game_data(file: str) -> [(Spans, Spans)]:
     """Uses get_numbers_and_symbols to extract all the numbers and symbols
     along with thier start and end positions from all lines in a file.
-    Returns a list indexed by the game number containing the maximum number of cubes for each color.
-    >>> parse_game_data('tests/doctest-get_gear_ratios.txt')
-    [([None], [None]), \
-([{'Match': '467', 'StartPosition': 1, 'EndPosition': 4}, \
-{'Match': '114', 'StartPosition': 6, 'EndPosition': 9}], \
-[None]), \
-([None], \
-[{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]), \
-([{'Match': '35', 'StartPosition': 3, 'EndPosition': 5}, \
-{'Match': '633', 'StartPosition': 7, 'EndPosition': 10}], \
-[None]), \
-([None], \
-[None]), \
-([{'Match': '617', 'StartPosition': 1, 'EndPosition': 4}], \
-[{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]), \
-([{'Match': '58', 'StartPosition': 8, 'EndPosition': 10}], \
-[None]), \
-([{'Match': '592', 'StartPosition': 3, 'EndPosition': 6}], \
-[None]), \
-([{'Match': '755', 'StartPosition': 7, 'EndPosition': 10}], \
-[None]), \
-([None], \
-[{'Match': '*', 'StartPosition': 6, 'EndPosition': 7}]), \
-([{'Match': '664', 'StartPosition': 2, 'EndPosition': 5}, \
-{'Match': '598', 'StartPosition': 6, 'EndPosition': 9}], \
-[None]), \
-([None], \
-[None])]
+    Returns a list with a tuple of the numbers and symbols spans of each line,
+    between artificial empty lines before the first line and after the last.
+    >>> [(list(numbers.values), ''.join(map(chr, symbols.values))) for numbers, symbols \
+in parse_game_data(TEST_FILE)]
+    [([], ''), ([467, 114], ''), ([], '*'), ([35, 633], ''), ([], ''), ([617], '*'), ([58], ''), ([592], ''), \
+([755], ''), ([], '*'), ([664, 598], ''), ([], '')]
     """
     # local_debug = True
     local_debug = False
 
-    # lines = []
-    # lines.append(([None], [None]))  # Add empty line to create an artificial line "1"
     lines = [
-        ([None], [None])
+        (NO_SPANS, NO_SPANS)  # Add empty line to create an artificial line "0"
     ]
-    line_number = 0
-
-    with open(file, 'r') as f:
-        for line in f:
-            line_number += line_number
-            numbers, symbols = get_numbers_and_symbols(line, line_number)
 
-            if global_debug or local_debug:
-                print('Numbers: ', numbers)
-                print('Number values: ', list(numbers.values())[0])
-                print('Symbols: ', symbols)
-                print('Symbol values: ', list(symbols.values())[0])
+    for line in read_lines(file):
+        lines.append(get_numbers_and_symbols(line))
 
-            # lines.append((list(numbers.values()), list(symbols.values())))
-            # lines.append((numbers.values(), symbols.values()))
-            lines.append((list(numbers.values())[0], list(symbols.values())[0]))
-        f.close()
-
-    lines.append(([None], [None]))  # Add empty line to create an artificial line "n + 1"
+    lines.append((NO_SPANS, NO_SPANS))  # Add empty line to create an artificial line "n + 1"
 
     if global_debug or local_debug:
         print('Lines: ', lines)
     return lines
 
 
-def check_if_number_adjacent_to_symbol(number_value: {str, str | int},
-                                       symbol_values: [{str, str | int}]) -> bool:
-    """Checks to see if the number_value is between the start and end positions of any of the symbol_values.
+def get_span_arrays(file: str) -> [array]:
+    """Uses parse_game_data and flattens the spans of all lines into one array per field,
+    with the offsets in them where each line's numbers and symbols begin, the form cached by cached_arrays.
+    Returns a list of the number line offsets, starts, ends and values, packed by pack_integers,
+    then the same for the symbols.
+    >>> [list(values) for values in get_span_arrays(TEST_FILE)[:2]]
+    [[0, 2, 2, 4, 4, 5, 6, 7, 8, 8, 10], [1, 6, 3, 7, 1, 8, 3, 7, 2, 6]]
+    """
+    span_arrays = [array('q', [0]), array('i'), array('i'), [],
+                   array('q', [0]), array('i'), array('i'), array('q')]
+
+    for line_spans in parse_game_data(file)[1:-1]:
+        for spans, (offsets, starts, ends, values) in zip(line_spans, (span_arrays[:4], span_arrays[4:])):
+            starts.extend(spans.starts)
+            ends.extend(spans.ends)
+            values.extend(spans.values)
+            offsets.append(len(values))
+    span_arrays[3] = pack_integers(span_arrays[3])  # Numbers may not fit in array('q')
+
+    return span_arrays
+
+
+def load_game_data(file: str) -> [(Spans, Spans)]:
+    """Uses get_span_arrays, through the parse cache when it is turned on, so re-runs against an unchanged
+    file skip the regexes. Each line's spans are slices of the flattened arrays, which are not copied.
+    Returns the same list of numbers and symbols spans as parse_game_data.
+    >>> [list(numbers.values) for numbers, symbols in load_game_data(TEST_FILE)][:4]
+    [[], [467, 114], [], [35, 633]]
+    """
+    (number_offsets, number_starts, number_ends, number_values,
+     symbol_offsets, symbol_starts, symbol_ends, symbol_values) = cached_arrays(
+        file, 'day03-problem02-spans', PARSER_VERSION, get_span_arrays)
+
+    number_values = unpack_integers(number_values)
+
+    lines = [(NO_SPANS, NO_SPANS)]  # Artificial line "0"
+    for line in range(len(number_offsets) - 1):
+        number_start, number_end = number_offsets[line], number_offsets[line + 1]
+        symbol_start, symbol_end = symbol_offsets[line], symbol_offsets[line + 1]
+        lines.append((Spans(number_starts[number_start:number_end], number_ends[number_start:number_end],
+                            number_values[number_start:number_end]),
+                      Spans(symbol_starts[symbol_start:symbol_end], symbol_ends[symbol_start:symbol_end],
+                            symbol_values[symbol_start:symbol_end])))
+    lines.append((NO_SPANS, NO_SPANS))  # Artificial line "n + 1"
+
+    return lines
+
+
+def check_if_number_adjacent_to_symbol(number_start: int, number_end: int, symbol_starts: [int]) -> bool:
+    """Checks to see if any of the symbol_starts is between number_start - 1 and number_end,
+    i.e. on the same columns as the number or diagonally next to it.
     Returns a bool.
-    >>> check_if_number_adjacent_to_symbol({'Match': '467', 'StartPosition': 1, 'EndPosition': 4}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '114', 'StartPosition': 6, 'EndPosition': 9}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol(None, [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '35', 'StartPosition': 3, 'EndPosition': 5}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '633', 'StartPosition': 7, 'EndPosition': 10}, [None])
+    >>> check_if_number_adjacent_to_symbol(1, 4, array('i'))
     False
-    >>> check_if_number_adjacent_to_symbol(None, [{'Match': '#', 'StartPosition': 7, 'EndPosition': 8}])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '617', 'StartPosition': 1, 'EndPosition': 4}\
-    , [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}])
+    >>> check_if_number_adjacent_to_symbol(1, 4, array('i', [4]))
     True
-    >>> check_if_number_adjacent_to_symbol({'Match': '58', 'StartPosition': 8, 'EndPosition': 10}\
-    , [{'Match': '+', 'StartPosition': 6, 'EndPosition': 7}])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '592', 'StartPosition': 3, 'EndPosition': 6}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '755', 'StartPosition': 7, 'EndPosition': 10}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol(None, [{'Match': '$', 'StartPosition': 4, 'EndPosition': 5}])
-    False
-    >>> check_if_number_adjacent_to_symbol(None, [{'Match': '*', 'StartPosition': 6, 'EndPosition': 7}])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '664', 'StartPosition': 2, 'EndPosition': 5}, [None])
-    False
-    >>> check_if_number_adjacent_to_symbol({'Match': '598', 'StartPosition': 6, 'EndPosition': 9}, [None])
+    >>> check_if_number_adjacent_to_symbol(6, 9, array('i', [4]))
     False
+    >>> check_if_number_adjacent_to_symbol(6, 9, array('i', [6]))
+    True
     """
-    # local_debug = True
-    local_debug = False
-
     is_adjacent = False
 
-    if local_debug:
-        print('Number value: ', number_value)
-        print('Symbol values: ', symbol_values)
-
-    if number_value is not None:
-        symbol_value: {int, [{str, str | int}]}
-        for symbol_value in symbol_values:
-            if symbol_value is not None:
-                if local_debug:
-                    print('First comparison: ', symbol_value[START_KEY] + 1, number_value[START_KEY])
-                    print('Second comparison: ', symbol_value[END_KEY] - 1, number_value[END_KEY])
-
-                is_adjacent = \
-                    symbol_value[START_KEY] + 1 >= number_value[START_KEY] and \
-                    symbol_value[END_KEY] - 1 <= number_value[END_KEY]
+    for symbol_start in symbol_starts:
+        is_adjacent = number_start - 1 <= symbol_start <= number_end
 
-                if is_adjacent:
-                    if global_debug or local_debug:
-                        print(number_value[MATCH_KEY] + ' is adjacent to ' + symbol_value[MATCH_KEY])
-                    break
+        if is_adjacent:
+            break
 
+    if instrumentation.enabled:
+        # The scan stops at the first symbol from number_start - 1 on, which the sorted starts give by bisection
+        comparisons = bisect_left(symbol_starts, number_start - 1) + 1 if is_adjacent else len(symbol_starts)
+        instrumentation.count('day03.adjacency_comparisons', comparisons)
     return is_adjacent
 
 
-def check_if_symbol_on_edge_of_number(symbol_value: {str, str | int},
-                                      surrounding_lines_numbers: [[{str, str | int}]]) -> bool:
-    """Checks to see if the symbol_value is between the start and end positions of any of the symbol_values.
-    Returns a bool.
-    >>> check_if_symbol_on_edge_of_number(None, \
-[[None], [{'Match': '467', 'StartPosition': 1, 'EndPosition': 4}], [None]])
-    (None, None)
-    >>> check_if_symbol_on_edge_of_number({'Match': '*', 'StartPosition': 4, 'EndPosition': 5}, \
-[[{'Match': '467', 'StartPosition': 1, 'EndPosition': 4}\
-, {'Match': '114', 'StartPosition': 6, 'EndPosition': 9}], [None], \
-[{'Match': '35', 'StartPosition': 3, 'EndPosition': 5}\
-, {'Match': '633', 'StartPosition': 7, 'EndPosition': 10}]])
-    ({'Match': '467', 'StartPosition': 1, 'EndPosition': 4}\
-, {'Match': '35', 'StartPosition': 3, 'EndPosition': 5})
-    >>> check_if_symbol_on_edge_of_number(None, \
-[[None], [{'Match': '35', 'StartPosition': 3, 'EndPosition': 5}\
-, {'Match': '633', 'StartPosition': 7, 'EndPosition': 10}], [None]])
-    (None, None)
-    >>> check_if_symbol_on_edge_of_number(None, \
-[[{'Match': '35', 'StartPosition': 3, 'EndPosition': 5}\
-, {'Match': '633', 'StartPosition': 7, 'EndPosition': 10}]\
-, [None]\
-, [{'Match': '617', 'StartPosition': 1, 'EndPosition': 4}]])
-    (None, None)
-    >>> check_if_symbol_on_edge_of_number({'Match': '*', 'StartPosition': 4, 'EndPosition': 5}, \
-[[None]\
-, [{'Match': '617', 'StartPosition': 1, 'EndPosition': 4}]\
-, [{'Match': '58', 'StartPosition': 8, 'EndPosition': 10}]])
-    ({'Match': '617', 'StartPosition': 1, 'EndPosition': 4}, None)
-    >>> check_if_symbol_on_edge_of_number(None, \
-[[None], [{'Match': '#', 'StartPosition': 7, 'EndPosition': 8}]\
-, [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]])
-    (None, None)
-    >>> check_if_symbol_on_edge_of_number(None, \
-[[{'Match': '617', 'StartPosition': 1, 'EndPosition': 4}]\
-, [{'Match': '58', 'StartPosition': 8, 'EndPosition': 10}]\
-, [{'Match': '592', 'StartPosition': 3, 'EndPosition': 6}]])
-    (None, None)
-    >>> check_if_symbol_on_edge_of_number(None, \
-[[{'Match': '58', 'StartPosition': 8, 'EndPosition': 10}]\
-, [{'Match': '592', 'StartPosition': 3, 'EndPosition': 6}]\
-, [{'Match': '755', 'StartPosition': 7, 'EndPosition': 10}]])
-    (None, None)
-    >>> check_if_symbol_on_edge_of_number(None, \
-[[{'Match': '592', 'StartPosition': 3, 'EndPosition': 6}]\
-, [{'Match': '755', 'StartPosition': 7, 'EndPosition': 10}]\
-, [None]])
-    (None, None)
-    >>> check_if_symbol_on_edge_of_number({'Match': '*', 'StartPosition': 6, 'EndPosition': 7}, \
-[[{'Match': '755', 'StartPosition': 7, 'EndPosition': 10}]\
-, [None]\
-, [{'Match': '664', 'StartPosition': 2, 'EndPosition': 5}\
-, {'Match': '598', 'StartPosition': 6, 'EndPosition': 9}]])
-    ({'Match': '755', 'StartPosition': 7, 'EndPosition': 10}\
-, {'Match': '598', 'StartPosition': 6, 'EndPosition': 9})
-    >>> check_if_symbol_on_edge_of_number(None, \
-[[None]\
-, [{'Match': '664', 'StartPosition': 2, 'EndPosition': 5}\
-, {'Match': '598', 'StartPosition': 6, 'EndPosition': 9}]\
-, [None]])
+def get_numbers_adjacent_to_symbol_bisect(symbol_start: int, line_numbers: Spans) -> Iterator[int]:
+    """Finds the numbers on a line that are adjacent to the symbol at symbol_start with a binary search
+    over the number ends, relying on the spans being sorted and not overlapping as get_match_data produces them.
+    Only the numbers from the first one ending at or after the symbol are checked,
+    instead of every number on the line as check_if_number_adjacent_to_symbol needs.
+    Yields the adjacent numbers from left to right.
+    >>> list(get_numbers_adjacent_to_symbol_bisect(4, get_match_data('467..114..', rex_number)))
+    [467]
+    >>> list(get_numbers_adjacent_to_symbol_bisect(6, get_match_data('.664.598..', rex_number)))
+    [598]
+    >>> list(get_numbers_adjacent_to_symbol_bisect(5, get_match_data('.664.598..', rex_number)))
+    [664, 598]
+    """
+    starts = line_numbers.starts
+    index = bisect_left(line_numbers.ends, symbol_start)
+    if instrumentation.enabled:
+        instrumentation.count('day03.adjacency_searches')
+
+    while index < len(starts) and starts[index] - 1 <= symbol_start:
+        yield line_numbers.values[index]
+        index += 1
+
+
+def check_if_symbol_on_edge_of_number(symbol_start: int, surrounding_lines_numbers: [Spans],
+                                      engine: str = ENGINE_LINEAR) -> (int, int):
+    """Checks to see which numbers on the surrounding lines are adjacent to the symbol at symbol_start,
+    using get_numbers_adjacent_to_symbol_bisect for the ENGINE_BISECT engine
+    and check_if_number_adjacent_to_symbol otherwise.
+    Returns a tuple of the first two adjacent numbers, with None in place of any not found.
+    >>> check_if_symbol_on_edge_of_number(4, [get_match_data('467..114..', rex_number), NO_SPANS, \
+get_match_data('..35..633.', rex_number)])
+    (467, 35)
+    >>> check_if_symbol_on_edge_of_number(4, [NO_SPANS, get_match_data('617*......', rex_number), \
+get_match_data('.....+.58.', rex_number)])
+    (617, None)
+    >>> check_if_symbol_on_edge_of_number(6, [get_match_data('......755.', rex_number), NO_SPANS, \
+get_match_data('.664.598..', rex_number)])
+    (755, 598)
+    >>> check_if_symbol_on_edge_of_number(6, [get_match_data('......755.', rex_number), NO_SPANS, \
+get_match_data('.664.598..', rex_number)], ENGINE_BISECT)
+    (755, 598)
+    >>> check_if_symbol_on_edge_of_number(1, [NO_SPANS, NO_SPANS, NO_SPANS])
     (None, None)
     """
-    # local_debug = True
-    local_debug = False
-
-    is_on_edge = False
-
-    if local_debug:
-        print('Symbol value: ', symbol_value)
-
     first_gear = None
     second_gear = None
     count_of_numbers_edge_of_symbol = 0
+    symbol_starts = (symbol_start,)
 
     for surrounding_line_numbers in surrounding_lines_numbers:
-        if local_debug:
-            print('Surrounding line numbers: ', surrounding_line_numbers)
+        if engine == ENGINE_BISECT:
+            adjacent_numbers = get_numbers_adjacent_to_symbol_bisect(symbol_start, surrounding_line_numbers)
+        else:
+            adjacent_numbers = (number for number_start, number_end, number
+                                in zip(surrounding_line_numbers.starts, surrounding_line_numbers.ends,
+                                       surrounding_line_numbers.values)
+                                if check_if_number_adjacent_to_symbol(number_start, number_end, symbol_starts))
+
+        for number in adjacent_numbers:
+            count_of_numbers_edge_of_symbol += 1
+            if count_of_numbers_edge_of_symbol == 1:
+                first_gear = number
+            elif count_of_numbers_edge_of_symbol == 2:
+                second_gear = number
 
-        for surrounding_line_number in surrounding_line_numbers:
-            if local_debug:
-                print('Surrounding line number: ', surrounding_line_number)
+    return first_gear, second_gear
 
-            is_on_edge = check_if_number_adjacent_to_symbol(
-                surrounding_line_number, [symbol_value])
 
-            if is_on_edge:
-                count_of_numbers_edge_of_symbol += 1
-                if count_of_numbers_edge_of_symbol == 1:
-                    first_gear = surrounding_line_number
-                elif count_of_numbers_edge_of_symbol == 2:
-                    second_gear = surrounding_line_number
+def get_row_gear_pairs(prior_line: (Spans, Spans), current_line: (Spans, Spans),
+                       next_line: (Spans, Spans), engine: str = ENGINE_LINEAR) -> [(int, int)]:
+    """Uses check_if_symbol_on_edge_of_number to find the numbers on the edge of each asterisk on the current line,
+    looking only at the numbers of the prior, current and next lines.
+    Each line is a tuple of numbers and symbols spans as built by parse_game_data.
+    Returns the list of gear pairs on the current line.
+    >>> get_row_gear_pairs(get_numbers_and_symbols('467..114..'), get_numbers_and_symbols('...*......'), \
+get_numbers_and_symbols('..35..633.'))
+    [(467, 35)]
+    """
+    gear_pairs = []
+    surrounding_lines_numbers = [prior_line[0], current_line[0], next_line[0]]
+    if instrumentation.enabled:
+        comparisons = instrumentation.counters['day03.adjacency_comparisons']
 
-    return first_gear, second_gear
+    for symbol_start in current_line[1].starts:
+        first_gear, second_gear = check_if_symbol_on_edge_of_number(symbol_start, surrounding_lines_numbers, engine)
+
+        if first_gear is not None and second_gear is not None:
+            gear_pairs.append((first_gear, second_gear))
+
+    if instrumentation.enabled:
+        instrumentation.count('day03.rows')
+        instrumentation.count('day03.gear_pairs', len(gear_pairs))
+        instrumentation.record('day03.adjacency_comparisons_per_row',
+                               instrumentation.counters['day03.adjacency_comparisons'] - comparisons)
+    return gear_pairs
 
 
-def get_gear_pairs(file: str) -> [(int, int)]:
-    """Uses check_if_symbol_on_edge_of_number to determine if a number value has a symbol on an edge.
+def get_gear_pairs(file: str, engine: str = ENGINE_LINEAR) -> [(int, int)]:
+    """Uses get_row_gear_pairs to find the pairs of numbers on the edge of each asterisk.
     Returns the list of all number vlaues converted into an integer.
-    >>> get_gear_pairs('tests/doctest-get_gear_ratios.txt')
+    >>> get_gear_pairs(TEST_FILE)
+    [(467, 35), (755, 598)]
+    >>> get_gear_pairs(TEST_FILE, ENGINE_BISECT)
     [(467, 35), (755, 598)]
     """
     # local_debug = True
     local_debug = False
 
     gear_pairs = []
-    lines = parse_game_data(file)
+    with instrumentation.stage('day03.parse'):
+        lines = load_game_data(file)
 
-    for i in range(1, len(lines) - 1):
-        current_line = lines[i]
-        current_number_values = current_line[0]
-        current_symbol_values = current_line[1]
-
-        prior_line = lines[i - 1]
-        prior_number_values = prior_line[0]
-
-        next_line = lines[i + 1]
-        next_number_values = next_line[0]
-
-        if current_symbol_values is not None:
-            for current_symbol_value in current_symbol_values:
-                # if local_debug:
-                #     print('Index: ', i)
-                #     print('Current symbol value: ', current_symbol_value)
-                #     print('Prior number values: ', prior_number_values)
-                #     print('Current number values: ', current_number_values)
-                #     print('Next number values: ', next_number_values)
-
-                first_gear, second_gear = check_if_symbol_on_edge_of_number(
-                    current_symbol_value,
-                    [prior_number_values, current_number_values, next_number_values])
-
-                if first_gear is not None and second_gear is not None:
-                    if local_debug:
-                        print('Part: ', int(first_gear[MATCH_KEY]), int(second_gear[MATCH_KEY]))
-                    gear_pairs.append((int(first_gear[MATCH_KEY]), int(second_gear[MATCH_KEY])))
+    with instrumentation.stage('day03.match'):
+        for i in range(1, len(lines) - 1):
+            gear_pairs.extend(get_row_gear_pairs(lines[i - 1], lines[i], lines[i + 1], engine))
 
     if global_debug or local_debug:
         print(gear_pairs)
     return gear_pairs
 
 
+def iter_gear_ratios(lines: Iterable[str | bytes], engine: str = ENGINE_LINEAR) -> Iterator[int]:
+    """Uses get_numbers_and_symbols and get_row_gear_pairs over a rolling window of three parsed lines,
+    so only three lines are held at a time and the gear ratios of each line are produced
+    as soon as the following line arrives.
+    Yields the gear ratios, in the same order as get_gear_ratios.
+    >>> list(iter_gear_ratios(['467..114..', '...*......', '..35..633.']))
+    [16345]
+    """
+    window = deque([(NO_SPANS, NO_SPANS)], maxlen=3)  # Artificial line "0" before the first line
+
+    for line in lines:
+        window.append(get_numbers_and_symbols(line))
+
+        if len(window) == 3:
+            for gear_pair in get_row_gear_pairs(*window, engine):
+                yield gear_pair[0] * gear_pair[1]
+
+    window.append((NO_SPANS, NO_SPANS))  # Artificial line "n + 1" after the last line
+    if len(window) == 3:
+        for gear_pair in get_row_gear_pairs(*window, engine):
+            yield gear_pair[0] * gear_pair[1]
+
+
+def sum_of_gear_ratios_streaming(file: str, engine: str = ENGINE_LINEAR) -> int:
+    """Uses iter_gear_ratios to extract all gear ratios from the file while it is being read.
+    Memory is proportional to the width of the schematic rather than its size.
+    Returns the sum all gear ratios extracted from the file.
+    >>> sum_of_gear_ratios_streaming(TEST_FILE)
+    467835
+    >>> sum_of_gear_ratios_streaming(TEST_FILE, ENGINE_BISECT)
+    467835
+    """
+    return sum(iter_gear_ratios(read_lines(file), engine))
+
+
 def get_gear_ratios(file: str) -> [int]:
     """Uses get_gear_pairs to extract all pairs of gears before multiplying each pair.
     Returns the list of all multiplied pairs.
-    >>> get_gear_ratios('tests/doctest-get_gear_ratios.txt')
+    >>> get_gear_ratios(TEST_FILE)
     [16345, 451490]
     """
     # local_debug = True
@@ -450,22 +436,176 @@ def get_gear_ratios(file: str) -> [int]:
     return gear_ratios
 
 
-def sum_of_gear_ratios(file: str) -> int:
-    """Uses get_gear_ratios to extract all gear ratios from the file.
+def load_grid(file: str) -> [bytes]:
+    """Loads the schematic as a 2-D byte grid.
+    Returns a list with the bytes of each row, without line terminators.
+    >>> load_grid(TEST_FILE)[:2]
+    [b'467..114..', b'...*......']
+    """
+    return [bytes(line) for line in read_lines(file)]
+
+
+def get_number_labels(grid: [bytes]) -> ([array], [int]):
+    """Labels every cell of each number in the grid with the number's id, its index in the list of numbers.
+    Label rows are shifted right by one cell, so column c of the grid is index c + 1 of its label row
+    and neighbour lookups never fall off the left edge.
+    Returns a tuple of the label rows, holding -1 where there is no number, and the list of numbers by id.
+    >>> labels, numbers = get_number_labels([b'467..1', b'..35..'])
+    >>> [list(row) for row in labels]
+    [[-1, 0, 0, 0, -1, -1, 1, -1], [-1, -1, -1, 2, 2, -1, -1, -1]]
+    >>> numbers
+    [467, 1, 35]
+    """
+    width = max((len(row) for row in grid), default=0)
+    empty_row = array('i', [-1]) * (width + 2)
+    labels = []
+    numbers = []
+
+    for row in grid:
+        label_row = array('i', empty_row)
+        for number in rex_number_bytes.finditer(row):
+            label_row[number.start() + 1:number.end() + 1] = array('i', [len(numbers)]) * len(number.group())
+            numbers.append(int(number.group()))
+        labels.append(label_row)
+
+    return labels, numbers
+
+
+def get_star_numbers(grid: [bytes]) -> {(int, int): [int]}:
+    """Uses get_number_labels to label the numbers, then collects the distinct labels among the 8 neighbours
+    of each asterisk, so every star is resolved with a constant number of cell lookups.
+    Neighbours are collected row by row from the row above, left to right, as check_if_symbol_on_edge_of_number does.
+    Returns a dictionary indexed by the (row, column) of each asterisk, both zero-based,
+    containing the list of adjacent numbers.
+    >>> get_star_numbers(load_grid(TEST_FILE))
+    {(1, 3): [467, 35], (4, 3): [617], (8, 5): [755, 598]}
+    """
+    labels, numbers = get_number_labels(grid)
+    star_numbers = {}
+
+    for row_index, row in enumerate(grid):
+        for star in rex_symbol_bytes.finditer(row):
+            column = star.start()
+            adjacent_ids = []
+            for label_row in labels[max(row_index - 1, 0):row_index + 2]:
+                for label in label_row[column:column + 3]:
+                    if label >= 0 and label not in adjacent_ids:
+                        adjacent_ids.append(label)
+            star_numbers[(row_index, column)] = [numbers[adjacent_id] for adjacent_id in adjacent_ids]
+
+    if global_debug:
+        print(star_numbers)
+    return star_numbers
+
+
+def get_gear_pairs_from_grid(grid: [bytes]) -> [(int, int)]:
+    """Uses get_star_numbers to find the numbers adjacent to each asterisk.
+    Like get_gear_pairs, any asterisk with at least two adjacent numbers pairs the first two.
+    Returns the list of gear pairs, in the same order as get_gear_pairs.
+    >>> get_gear_pairs_from_grid(load_grid(TEST_FILE))
+    [(467, 35), (755, 598)]
+    """
+    with instrumentation.stage('day03.match'):
+        gear_pairs = [(adjacent_numbers[0], adjacent_numbers[1])
+                      for adjacent_numbers in get_star_numbers(grid).values()
+                      if len(adjacent_numbers) >= 2]
+
+    if instrumentation.enabled:
+        instrumentation.count('day03.rows', len(grid))
+        instrumentation.count('day03.gear_pairs', len(gear_pairs))
+    return gear_pairs
+
+
+def get_grid_gear_pair_arrays(file: str) -> [array]:
+    """Uses load_grid and get_gear_pairs_from_grid to extract all gear pairs from a file.
+    Returns a list holding the first numbers and the second numbers of the pairs, each packed by pack_integers,
+    in the form cached by cached_arrays.
+    >>> get_grid_gear_pair_arrays(TEST_FILE)
+    [array('q', [467, 755]), array('q', [35, 598])]
+    """
+    gear_pairs = get_gear_pairs_from_grid(load_grid(file))
+
+    return [pack_integers([gear_pair[0] for gear_pair in gear_pairs]),
+            pack_integers([gear_pair[1] for gear_pair in gear_pairs])]
+
+
+def load_grid_gear_pairs(file: str) -> [(int, int)]:
+    """Uses get_grid_gear_pair_arrays, through the parse cache when it is turned on, so re-runs of the
+    ENGINE_GRID engine against an unchanged file skip the labelling of the grid.
+    Returns the list of gear pairs, in the same order as get_gear_pairs.
+    >>> load_grid_gear_pairs(TEST_FILE)
+    [(467, 35), (755, 598)]
+    """
+    firsts, seconds = cached_arrays(file, 'day03-problem02-grid-gear-pairs', PARSER_VERSION,
+                                    get_grid_gear_pair_arrays)
+
+    return list(zip(unpack_integers(firsts), unpack_integers(seconds)))
+
+
+def get_gear_pairs_in_band(file: str, start: int, end: int, engine: str = ENGINE_LINEAR) -> [(int, int)]:
+    """Uses get_row_gear_pairs on the rows in the byte range [start, end) of a file, a horizontal band
+    of the schematic. The band is read with one halo row on each side from get_halo_offsets, so numbers
+    across the band boundaries are found, but only the asterisks on the band's own rows are checked.
+    Every asterisk belongs to exactly one band, so no gear is counted twice.
+    Returns the list of gear pairs on the band's rows, in the same order as get_gear_pairs.
+    >>> get_gear_pairs_in_band(TEST_FILE, 66, 99)
+    [(755, 598)]
+    """
+    halo_start, halo_end = get_halo_offsets(file, start, end)
+    lines = [get_numbers_and_symbols(line) for line in read_lines(file, halo_start, halo_end)]
+    if halo_start == start:
+        lines.insert(0, (NO_SPANS, NO_SPANS))  # Artificial line "0" before the first line of the file
+    if halo_end == end:
+        lines.append((NO_SPANS, NO_SPANS))  # Artificial line "n + 1" after the last line of the file
+
+    gear_pairs = []
+    for i in range(1, len(lines) - 1):
+        gear_pairs.extend(get_row_gear_pairs(lines[i - 1], lines[i], lines[i + 1], engine))
+
+    return gear_pairs
+
+
+def get_gear_pairs_parallel(file: str, engine: str = ENGINE_LINEAR, workers: int | None = None,
+                            min_bytes: int = PARALLEL_MIN_BYTES) -> [(int, int)]:
+    """Splits the schematic into newline-aligned horizontal bands and uses get_gear_pairs_in_band
+    on each in a worker process. Files smaller than min_bytes, or a single worker, are handled as one band.
+    Returns the list of all gear pairs, identical to get_gear_pairs.
+    >>> get_gear_pairs_parallel(TEST_FILE, workers=2, min_bytes=0)
+    [(467, 35), (755, 598)]
+    """
+    band_gear_pairs = reduce_chunks(file, partial(get_gear_pairs_in_band, engine=engine), workers, min_bytes)
+
+    return [gear_pair for gear_pairs in band_gear_pairs for gear_pair in gear_pairs]
+
+
+def sum_of_gear_ratios(file: str, engine: str = ENGINE_GRID, workers: int = 1) -> int:
+    """Uses load_grid_gear_pairs for the ENGINE_GRID engine, or get_gear_pairs with the
+    ENGINE_LINEAR or ENGINE_BISECT adjacency checks, to extract all gear pairs from the file.
+    Both go through the parse cache when it is turned on.
+    With more than one worker the file is split into bands by get_gear_pairs_parallel,
+    which uses the ENGINE_BISECT checks for the ENGINE_GRID engine.
     A gear ratio is the product of two numbers both of which are adjacent to the same asterisk.
     Returns the sum all gear ratios extracted from the file.
-    >>> sum_of_gear_ratios('tests/doctest-get_gear_ratios.txt')
+    >>> sum_of_gear_ratios(TEST_FILE)
+    467835
+    >>> [sum_of_gear_ratios(TEST_FILE, engine) \
+for engine in (ENGINE_LINEAR, ENGINE_BISECT, ENGINE_GRID)]
+    [467835, 467835, 467835]
+    >>> sum_of_gear_ratios(TEST_FILE, workers=2)
     467835
     """
-    gear_ratios = get_gear_ratios(file)
-    return sum(gear_ratios)
-
-
-# current_number_value = {'Match': '467', 'StartPosition': 1, 'EndPosition': 4}
-# current_symbol_values = [None]
-# current_number_value = {'Match': '617', 'StartPosition': 1, 'EndPosition': 4}
-# current_symbol_values = [{'Match': '*', 'StartPosition': 4, 'EndPosition': 5}]
-# print(check_if_number_adjacent_to_symbol(current_number_value, current_symbol_values))
-# print(get_gear_ratios('tests/doctest-get_gear_ratios.txt'))
-# print(sum_of_gear_ratios('tests/doctest-get_gear_ratios.txt'))
-print(sum_of_gear_ratios('resources/input.txt'))
+    if workers != 1:
+        band_engine = ENGINE_BISECT if engine == ENGINE_GRID else engine
+        gear_pairs = get_gear_pairs_parallel(file, band_engine, workers)
+    elif engine == ENGINE_GRID:
+        gear_pairs = load_grid_gear_pairs(file)
+    else:
+        gear_pairs = get_gear_pairs(file, engine)
+    return sum(gear_pair[0] * gear_pair[1] for gear_pair in gear_pairs)
+
+
+# print(check_if_number_adjacent_to_symbol(1, 4, array('i', [4])))
+# print(get_gear_ratios(TEST_FILE))
+# print(sum_of_gear_ratios(TEST_FILE))
+if __name__ == '__main__':
+    print(run_entry(sum_of_gear_ratios, INPUT_FILE))
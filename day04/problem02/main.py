@@ -0,0 +1,309 @@
+import re
+import sys
+from array import array
+from collections import deque, namedtuple
+from pathlib import Path
+from typing import Iterable, Iterator
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from common.cache import cached_arrays, get_cache_dir  # noqa: E402
+from common.instrumentation import instrumentation  # noqa: E402
+from common.profiling import run_entry  # noqa: E402
+from common.reader import get_module_file, read_lines  # noqa: E402
+
+# global_debug = True
+global_debug = False
+
+INPUT_FILE = get_module_file(__file__, 'resources', 'input.txt')
+TEST_FILE = get_module_file(__file__, 'tests', 'doctest-main.txt')
+
+CARD_ID_KEY = 'Card_ID'
+WINNERS_KEY = 'Winners'
+ELVES_KEY = 'Elves'
+
+# Compact record of a card, with the winners and elves numbers as tuples
+Card = namedtuple('Card', ['card_id', 'winners', 'elves'])
+# Fixed-width layout of a card line, learnt from the first line by get_card_layout
+CardLayout = namedtuple('CardLayout', ['length', 'colon', 'bar', 'winner_offsets', 'elves_offsets'])
+NUMBER_WIDTH = 3  # Every number is right-aligned in a space and two columns
+COLUMN_VALUES = {b' %2d' % number: number for number in range(100)}  # Looked up instead of int() on every column
+PARSER_VERSION = 3  # Bump when get_match_count_array changes, so cached match counts are not reused
+
+rex = re.compile(r"Card +(?P<Card_ID>\d+): (?P<Winners>.+)\|(?P<Elves>.+)")
+rex_numbers = re.compile(r" +")
+rex_bytes = re.compile(rb"Card +(?P<Card_ID>\d+): (?P<Winners>.+)\|(?P<Elves>.+)")
+rex_numbers_bytes = re.compile(rb" +")
+
+
+def parse_data_line(line: str | bytes) -> dict:
+    """Extracts the card and numbers from line using the regex.
+    A bytes or memoryview line is matched with the bytes regexes.
+    Returns a dictionary with the card number and list containing the numbers.
+    >>> parse_data_line('Card 1: 41 48 83 86 17 | 83 86  6 31 17  9 48 53')
+    {'Card_ID': 1, 'Winners': [41, 48, 83, 86, 17], 'Elves': [83, 86, 6, 31, 17, 9, 48, 53]}
+    >>> parse_data_line('Card 2: 13 32 20 16 61 | 61 30 68 82 17 32 24 19')
+    {'Card_ID': 2, 'Winners': [13, 32, 20, 16, 61], 'Elves': [61, 30, 68, 82, 17, 32, 24, 19]}
+    >>> parse_data_line('Card 3:  1 21 53 59 44 | 69 82 63 72 16 21 14  1')
+    {'Card_ID': 3, 'Winners': [1, 21, 53, 59, 44], 'Elves': [69, 82, 63, 72, 16, 21, 14, 1]}
+    >>> parse_data_line('Card 4: 41 92 73 84 69 | 59 84 76 51 58  5 54 83')
+    {'Card_ID': 4, 'Winners': [41, 92, 73, 84, 69], 'Elves': [59, 84, 76, 51, 58, 5, 54, 83]}
+    >>> parse_data_line('Card 5: 87 83 26 28 32 | 88 30 70 12 93 22 82 36')
+    {'Card_ID': 5, 'Winners': [87, 83, 26, 28, 32], 'Elves': [88, 30, 70, 12, 93, 22, 82, 36]}
+    >>> parse_data_line('Card 6: 31 18 13 56 72 | 74 77 10 23 35 67 36 11')
+    {'Card_ID': 6, 'Winners': [31, 18, 13, 56, 72], 'Elves': [74, 77, 10, 23, 35, 67, 36, 11]}
+    >>> parse_data_line(memoryview(b'Card 3:  1 21 53 59 44 | 69 82 63 72 16 21 14  1'))
+    {'Card_ID': 3, 'Winners': [1, 21, 53, 59, 44], 'Elves': [69, 82, 63, 72, 16, 21, 14, 1]}
+    """
+    data = {}
+
+    if isinstance(line, str):
+        line_rex, numbers_rex, space = rex, rex_numbers, ' '
+    else:
+        line_rex, numbers_rex, space = rex_bytes, rex_numbers_bytes, b' '
+
+    match_results = line_rex.match(line)
+    if match_results is not None:
+        # if global_debug or local_debug:
+        #     # print(match_results)
+        #     print(match_results.group(CARD_ID_KEY))
+        #     print(match_results.group(WINNERS_KEY))
+        #     print(match_results.group(ELVES_KEY))
+
+        data[CARD_ID_KEY] = int(match_results.group(CARD_ID_KEY).strip(space))
+        data[WINNERS_KEY] = [int(i.strip(space)) for i
+                             in numbers_rex.split(match_results.group(WINNERS_KEY).strip(space))]
+        data[ELVES_KEY] = [int(i.strip(space)) for i
+                           in numbers_rex.split(match_results.group(ELVES_KEY).strip(space))]
+
+    if instrumentation.enabled:
+        instrumentation.count('day04.regex_lines_parsed')
+    return data
+
+
+def get_card(line: str | bytes) -> Card:
+    """Uses parse_data_line to extract the card and numbers from line with the regex.
+    Returns a Card record, or None if the line is not a card.
+    >>> get_card('Card 3:  1 21 53 59 44 | 69 82 63 72 16 21 14  1')
+    Card(card_id=3, winners=(1, 21, 53, 59, 44), elves=(69, 82, 63, 72, 16, 21, 14, 1))
+    """
+    data = parse_data_line(line)
+    if not data:
+        return None
+
+    return Card(data[CARD_ID_KEY], tuple(data[WINNERS_KEY]), tuple(data[ELVES_KEY]))
+
+
+def get_card_layout(line: str | bytes) -> CardLayout:
+    """Learns the fixed-width layout of the card lines from one line: the positions of the colon and the bar,
+    and the offsets of the number columns between them, which must all be NUMBER_WIDTH wide.
+    Returns a CardLayout, or None if the line does not have a fixed-width layout.
+    >>> get_card_layout(b'Card   1: 41 48  3 | 83 86  6 31')
+    CardLayout(length=32, colon=8, bar=19, winner_offsets=(9, 12, 15), elves_offsets=(20, 23, 26, 29))
+    >>> get_card_layout(b'Card 1: 41 48 3 | 83 86 6 31')
+    """
+    line = bytes(line) if not isinstance(line, str) else line.encode()
+    colon = line.find(b':')
+    bar = line.find(b'|')
+    if colon == -1 or bar < colon:
+        return None
+
+    winner_width = bar - 1 - (colon + 1)
+    elves_width = len(line) - (bar + 1)
+    if winner_width % NUMBER_WIDTH != 0 or elves_width % NUMBER_WIDTH != 0:
+        return None
+
+    layout = CardLayout(len(line), colon, bar, tuple(range(colon + 1, bar - 1, NUMBER_WIDTH)),
+                        tuple(range(bar + 1, len(line), NUMBER_WIDTH)))
+    if parse_card_fixed(line, layout) is None:
+        return None
+
+    return layout
+
+
+def parse_card_fixed(line: bytes, layout: CardLayout) -> Card:
+    """Extracts the card and numbers from a bytes line by slicing the number columns at the fixed offsets
+    of layout and looking them up in COLUMN_VALUES, without any regex, splitting, stripping or int() on them.
+    Like the regex, the line must start with 'Card', spaces and the digits of the card number.
+    Returns a Card record, or None if the line does not fit the layout.
+    >>> layout = get_card_layout(b'Card 1: 41 48 83 86 17 | 83 86  6 31 17  9 48 53')
+    >>> parse_card_fixed(b'Card 3:  1 21 53 59 44 | 69 82 63 72 16 21 14  1', layout)
+    Card(card_id=3, winners=(1, 21, 53, 59, 44), elves=(69, 82, 63, 72, 16, 21, 14, 1))
+    >>> parse_card_fixed(b'Card 3:  1 21 53 59 44 | 69 82 63 72 16 21 14', layout)
+    >>> parse_card_fixed(b'Game 3:  1 21 53 59 44 | 69 82 63 72 16 21 14  1', layout)
+    >>> parse_card_fixed(b'Card+3:  1 21 53 59 44 | 69 82 63 72 16 21 14  1', layout)
+    """
+    if len(line) != layout.length or line[layout.colon] != ord(':') or line[layout.bar] != ord('|'):
+        return None
+
+    card_id = line[4:layout.colon]
+    if not line.startswith(b'Card ') or not card_id.lstrip(b' ').isdigit():
+        return None
+
+    try:
+        return Card(int(card_id),
+                    tuple([COLUMN_VALUES[line[offset:offset + NUMBER_WIDTH]] for offset in layout.winner_offsets]),
+                    tuple([COLUMN_VALUES[line[offset:offset + NUMBER_WIDTH]] for offset in layout.elves_offsets]))
+    except KeyError:  # A column that is not a number
+        return None
+
+
+def iter_cards(file: str, start: int = 0, end: int | None = None) -> Iterator[Card]:
+    """Extracts the cards from the lines in the byte range [start, end) of a file while it is being read.
+    The layout is learnt from the first line with get_card_layout and every line is sliced with parse_card_fixed,
+    falling back to the regex in get_card for lines, or whole files, that do not fit the layout.
+    Yields the Card records in file order.
+    >>> next(iter_cards(TEST_FILE))
+    Card(card_id=1, winners=(41, 48, 83, 86, 17), elves=(83, 86, 6, 31, 17, 9, 48, 53))
+    """
+    layout = None
+    is_first_line = True
+
+    for line in read_lines(file, start, end):
+        line = bytes(line)
+        if is_first_line:
+            layout = get_card_layout(line)
+            is_first_line = False
+
+        card = parse_card_fixed(line, layout) if layout is not None else None
+        if card is None:
+            card = get_card(line)
+        if card is not None:
+            yield card
+
+
+def parse_cards(file: str, start: int = 0, end: int | None = None) -> [Card]:
+    """Uses iter_cards to extract the cards from the lines in the byte range [start, end) of a file.
+    Returns the list of Card records.
+    >>> parse_cards(TEST_FILE)[:2]
+    [Card(card_id=1, winners=(41, 48, 83, 86, 17), elves=(83, 86, 6, 31, 17, 9, 48, 53)), \
+Card(card_id=2, winners=(13, 32, 20, 16, 61), elves=(61, 30, 68, 82, 17, 32, 24, 19))]
+    """
+    cards = list(iter_cards(file, start, end))
+
+    if global_debug:
+        print(cards)
+    return cards
+
+
+def get_number_mask(numbers: [int]) -> int:
+    """Encodes the numbers as the set bits of an integer, so a card's numbers 0-99 fit in a 128-bit bitmask.
+    Returns the bitmask.
+    >>> bin(get_number_mask([1, 3, 4]))
+    '0b11010'
+    >>> get_number_mask([])
+    0
+    """
+    mask = 0
+    for number in numbers:
+        mask |= 1 << number
+
+    return mask
+
+
+def get_match_count(winners: [int], elves: [int]) -> int:
+    """Counts the elves numbers that are also winners by intersecting their bitmasks from get_number_mask,
+    instead of searching the winners list for every elves number.
+    Numbers are not repeated within a card, so every matching elves number is counted once.
+    Returns the number of matching numbers.
+    >>> get_match_count([41, 48, 83, 86, 17], [83, 86, 6, 31, 17, 9, 48, 53])
+    4
+    >>> get_match_count([31, 18, 13, 56, 72], [74, 77, 10, 23, 35, 67, 36, 11])
+    0
+    """
+    match_count = (get_number_mask(winners) & get_number_mask(elves)).bit_count()
+
+    if instrumentation.enabled:
+        instrumentation.count('day04.matches', match_count)
+    return match_count
+
+
+def get_match_counts(cards: [Card]) -> [int]:
+    """Uses get_match_count on every Card record.
+    Returns the list of the number of matching numbers of each card.
+    >>> get_match_counts(parse_cards(TEST_FILE))
+    [4, 2, 2, 1, 0, 0]
+    """
+    return [get_match_count(card.winners, card.elves) for card in cards]
+
+
+def get_match_count_array(file: str) -> [array]:
+    """Uses parse_cards and get_match_counts to count the matching numbers of every card in a file.
+    Returns a list holding the array of the match counts, in the form cached by cached_arrays.
+    >>> get_match_count_array(TEST_FILE)
+    [array('I', [4, 2, 2, 1, 0, 0])]
+    >>> import tempfile
+    >>> numbers = ' '.join(str(number) for number in range(300))
+    >>> with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+    ...     _ = f.write(f'Card 1: {numbers} | {numbers}\\n')
+    >>> get_match_count_array(f.name)
+    [array('I', [300])]
+    >>> Path(f.name).unlink()
+    """
+    with instrumentation.stage('day04.parse'):
+        cards = parse_cards(file)
+    with instrumentation.stage('day04.match'):
+        return [array('I', get_match_counts(cards))]
+
+
+def load_match_counts(file: str) -> array | memoryview:
+    """Uses get_match_count_array, through the parse cache when it is turned on, so re-runs against
+    an unchanged file skip the parsing and matching.
+    Returns the match count of each card.
+    >>> list(load_match_counts(TEST_FILE))
+    [4, 2, 2, 1, 0, 0]
+    """
+    return cached_arrays(file, 'day04-problem02-match-counts', PARSER_VERSION, get_match_count_array)[0]
+
+
+def iter_card_instances(match_counts: Iterable[int]) -> Iterator[int]:
+    """Counts the instances of each card in the copy cascade, where every instance of a card with k matches
+    wins one copy of each of the next k cards. Instead of following the copies, the instances won are added
+    to a running count through a difference array: +instances where the won range starts and -instances
+    just after it ends, so every card costs O(k) and the whole deck O(n).
+    Only the differences for the next cards are kept, so the match counts can be streamed.
+    Yields the number of instances, originals and copies, of each card.
+    >>> list(iter_card_instances([4, 2, 2, 1, 0, 0]))
+    [1, 2, 4, 8, 14, 1]
+    >>> list(iter_card_instances([3, 0]))
+    [1, 2]
+    """
+    differences = deque()  # differences[i] is the change in copies won from card i + 1 on
+    copies = 0
+
+    for match_count in match_counts:
+        if differences:
+            copies += differences.popleft()
+        instances = 1 + copies
+        yield instances
+
+        if match_count > 0:
+            if len(differences) <= match_count:
+                differences.extend([0] * (match_count + 1 - len(differences)))
+            differences[0] += instances
+            differences[match_count] -= instances
+
+
+def get_total_instances(file: str) -> int:
+    """Uses iter_cards, get_match_count and iter_card_instances to count the instances of all cards in the file
+    while it is being read, so memory does not grow with the number of cards.
+    When the parse cache is turned on the match counts come from load_match_counts instead.
+    Returns the total number of card instances, originals and copies.
+    >>> get_total_instances(TEST_FILE)
+    30
+    """
+    if get_cache_dir() is not None:
+        match_counts = load_match_counts(file)
+    else:
+        match_counts = (get_match_count(card.winners, card.elves) for card in iter_cards(file))
+    with instrumentation.stage('day04.instances'):
+        total = sum(iter_card_instances(match_counts))
+
+    if global_debug:
+        print(total)
+    return total
+
+
+# print(get_total_instances(TEST_FILE))
+if __name__ == '__main__':
+    print(run_entry(get_total_instances, INPUT_FILE))
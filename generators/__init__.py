@@ -0,0 +1 @@
+"""Seeded synthetic puzzle inputs of any size, see python -m generators --help."""
@@ -0,0 +1,47 @@
+import argparse
+import inspect
+import sys
+
+from generators.inputs import GENERATORS, write_input
+
+
+def parse_knobs(generator, knobs: list) -> dict:
+    """Converts NAME=VALUE knobs to keyword arguments of generator, typed like the generator's defaults."""
+    parameters = inspect.signature(generator).parameters
+    arguments = {}
+
+    for knob in knobs:
+        name, _, value = knob.partition('=')
+        if name not in parameters or name in ('size', 'seed'):
+            raise ValueError(f'Unknown knob {name!r}, expected one of '
+                             + ', '.join(name for name in parameters if name not in ('size', 'seed')))
+        arguments[name] = type(parameters[name].default)(value)
+
+    return arguments
+
+
+def main(argv: list | None = None) -> int:
+    """Writes a synthetic input for one day."""
+    parser = argparse.ArgumentParser(prog='python -m generators', description='Writes a seeded synthetic input.')
+    parser.add_argument('day', type=int, choices=sorted(GENERATORS), help='day whose input format to generate')
+    parser.add_argument('output', help='file to write')
+    parser.add_argument('-n', '--size', type=int, default=1000,
+                        help='lines, games, rows or cards (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: %(default)s)')
+    parser.add_argument('-k', '--knob', action='append', default=[], metavar='NAME=VALUE',
+                        help='generator keyword argument, e.g. width=5000 for day 3; may be repeated')
+    arguments = parser.parse_args(argv)
+
+    generator = GENERATORS[arguments.day]
+    try:
+        knobs = parse_knobs(generator, arguments.knob)
+        count = write_input(arguments.output, generator(arguments.size, arguments.seed, **knobs))
+    except ValueError as error:
+        parser.error(str(error))
+
+    print(f'Wrote {count} lines to {arguments.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import random
+import string
+from typing import Callable, Dict, Iterable, Iterator
+
+DIGIT_WORDS = ('one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine')
+# Spelled digits sharing letters with their neighbours, which a left-to-right word scan can get wrong
+OVERLAPPING_WORDS = ('eightwoneight', 'twone', 'oneight', 'threeight', 'fiveight', 'nineight', 'sevenine', 'eighthree')
+COLORS = ('red', 'green', 'blue')
+SYMBOLS = '#$%&*+-/=@'
+
+
+def generate_day01(size: int, seed: int = 0, line_length: int = 40, word_rate: float = 0.2,
+                   overlap_rate: float = 0.0) -> Iterator[str]:
+    """Generates size calibration lines of random lowercase letters, digits and spelled digits.
+    word_rate is the chance of a spelled digit at each position and overlap_rate the chance of
+    an overlapping chain such as 'eightwoneight'. Every line has at least one digit, so it is valid for both parts.
+    Yields the lines without line terminators.
+    >>> list(generate_day01(3, seed=1, line_length=12, overlap_rate=0.2))
+    ['4eightpz', '9ywxskeightwoneight', 'mnq4rfour']
+    """
+    generator = random.Random(seed)
+
+    for _ in range(size):
+        parts = []
+        length = 0
+        while length < line_length:
+            draw = generator.random()
+            if draw < overlap_rate:
+                part = generator.choice(OVERLAPPING_WORDS)
+            elif draw < overlap_rate + word_rate:
+                part = generator.choice(DIGIT_WORDS)
+            else:
+                part = generator.choice(string.ascii_lowercase)
+            parts.append(part)
+            length += len(part)
+
+        if not any(part.isdigit() for part in parts):
+            parts[generator.randrange(len(parts))] = str(generator.randint(1, 9))
+        yield ''.join(parts)
+
+
+def generate_day02(size: int, seed: int = 0, draws: int = 3, max_cubes: int = 20) -> Iterator[str]:
+    """Generates size game records numbered from 1, each with draws draws of one to three colors.
+    A large draws gives very long game lines.
+    Yields the lines without line terminators.
+    >>> list(generate_day02(2, seed=1, draws=2))
+    ['Game 1: 3 blue; 15 red, 16 green', 'Game 2: 16 green, 1 red, 13 blue; 15 blue, 9 red']
+    """
+    generator = random.Random(seed)
+
+    for game_number in range(1, size + 1):
+        game_draws = []
+        for _ in range(draws):
+            colors = generator.sample(COLORS, generator.randint(1, len(COLORS)))
+            game_draws.append(', '.join(f'{generator.randint(1, max_cubes)} {color}' for color in colors))
+        yield f'Game {game_number}: ' + '; '.join(game_draws)
+
+
+def generate_day03(size: int, seed: int = 0, width: int = 140, number_rate: float = 0.1,
+                   symbol_rate: float = 0.05, star_rate: float = 0.3, max_digits: int = 3) -> Iterator[str]:
+    """Generates a schematic of size rows of width cells. At each empty cell a number of 1 to max_digits digits
+    starts with chance number_rate, or a symbol with chance symbol_rate, which is an asterisk with chance star_rate.
+    Numbers are always followed by a non-digit, so they never run into each other.
+    Dense symbols, long numbers and very wide rows are all a matter of raising the knobs.
+    Yields the rows without line terminators.
+    >>> list(generate_day03(3, seed=2, width=12, number_rate=0.3, symbol_rate=0.2))
+    ['..6....@366.', '...=1.-%.3.*', '...78..../88']
+    >>> next(generate_day03(1, max_digits=0))
+    Traceback (most recent call last):
+    ...
+    ValueError: max_digits must be at least 1, not 0
+    """
+    if max_digits < 1:
+        raise ValueError(f'max_digits must be at least 1, not {max_digits}')
+
+    generator = random.Random(seed)
+
+    for _ in range(size):
+        row = []
+        while len(row) < width:
+            draw = generator.random()
+            if draw < number_rate:
+                digits = min(generator.randint(1, max_digits), width - len(row))
+                row.append(str(generator.randint(1, 9)))
+                row.extend(str(generator.randint(0, 9)) for _ in range(digits - 1))
+                if len(row) < width:
+                    row.append('.')
+            elif draw < number_rate + symbol_rate:
+                row.append('*' if generator.random() < star_rate else generator.choice(SYMBOLS))
+            else:
+                row.append('.')
+        yield ''.join(row)
+
+
+def generate_day04(size: int, seed: int = 0, winners: int = 10, elves: int = 25, max_number: int = 99,
+                   match_rate: float = 0.15) -> Iterator[str]:
+    """Generates size scratchcards numbered from 1, each with distinct winners numbers and distinct elves numbers
+    from 1 to max_number. Each elves number matches a winner with chance match_rate, but a card never
+    matches more cards than follow it, so the copy cascade stays within the deck.
+    The numbers are right-aligned in columns as wide as max_number plus a space, as in the real input.
+    Yields the lines without line terminators.
+    >>> list(generate_day04(3, seed=4, winners=3, elves=5, match_rate=0.5))
+    ['Card 1: 31 39 14 | 51 31 14 93 62', 'Card 2: 14 34 28 | 25  4 35 83 34', 'Card 3: 65 32 23 | 61 39 71 36 12']
+    """
+    if winners + elves > max_number:
+        raise ValueError(f'{winners} winners and {elves} elves numbers do not fit in 1 to {max_number}')
+
+    generator = random.Random(seed)
+    number_width = len(str(max_number))
+    card_width = len(str(size))
+
+    for card_id in range(1, size + 1):
+        card_numbers = generator.sample(range(1, max_number + 1), winners + elves)
+        card_winners, others = card_numbers[:winners], card_numbers[winners:]
+        match_count = sum(generator.random() < match_rate for _ in range(min(winners, elves)))
+        match_count = min(match_count, size - card_id)
+        card_elves = generator.sample(card_winners, match_count) + others[:elves - match_count]
+        generator.shuffle(card_elves)
+
+        yield (f'Card {card_id:>{card_width}}: ' + ' '.join(f'{number:>{number_width}}' for number in card_winners)
+               + ' | ' + ' '.join(f'{number:>{number_width}}' for number in card_elves))
+
+
+GENERATORS: Dict[int, Callable[..., Iterator[str]]] = {
+    1: generate_day01,
+    2: generate_day02,
+    3: generate_day03,
+    4: generate_day04,
+}
+
+
+def write_input(file: str, lines: Iterable[str]) -> int:
+    """Writes the lines to file, each ended by a newline, without holding them all in memory.
+    Returns the number of lines written.
+    """
+    count = 0
+    with open(file, 'w', newline='\n') as f:
+        for line in lines:
+            f.write(line)
+            f.write('\n')
+            count += 1
+
+    return count
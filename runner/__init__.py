@@ -0,0 +1 @@
+"""Runs the solvers under day*/problem*/main.py from one place, see python -m runner --help."""
@@ -0,0 +1,49 @@
+import argparse
+import sys
+import time
+
+from runner.registry import parse_puzzle_keys
+from runner.run import format_results, get_profile_output, run_puzzles, save_instrumentation
+
+
+def main(argv: list | None = None) -> int:
+    """Runs the selected puzzles concurrently and prints their answers and timings."""
+    parser = argparse.ArgumentParser(prog='python -m runner', description='Runs the day*/problem*/main.py solvers.')
+    parser.add_argument('puzzles', nargs='*',
+                        help="puzzles to run, '3' for both parts of day 3 or '3.2' for part 2 only; default all")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='worker processes, default one per CPU up to the number of puzzles')
+    parser.add_argument('-i', '--instrument', metavar='PATH', default=None,
+                        help='collect the solvers\' counters and stage timers and write them to PATH as JSON')
+    parser.add_argument('-p', '--profile', metavar='DIRECTORY', default=None,
+                        help='profile each solve with cProfile, writing .pstats, .collapsed flamegraph stacks '
+                             'and the top functions by cumulative time to DIRECTORY')
+    parser.add_argument('-m', '--memory-top', type=int, default=0, metavar='N',
+                        help='with --profile, also trace allocations and report the top N allocation sites')
+    parser.add_argument('--isolate', action='store_true',
+                        help='run every puzzle in a fresh process, so each peak RSS is its own, at the cost of '
+                             'starting an interpreter per puzzle; by default the workers are reused')
+    arguments = parser.parse_args(argv)
+
+    try:
+        keys = parse_puzzle_keys(arguments.puzzles)
+    except ValueError as error:
+        parser.error(str(error))
+
+    wall = time.perf_counter()
+    results = run_puzzles(keys, arguments.workers, arguments.instrument is not None, arguments.profile,
+                          arguments.memory_top, arguments.isolate)
+    if arguments.profile is not None:
+        for day, part in keys:
+            with open(f'{get_profile_output(arguments.profile, day, part)}.txt') as f:
+                print(f'Profile of {day}.{part}:', f.read(), sep='\n')
+    print(format_results(results))
+    if arguments.instrument is not None:
+        save_instrumentation(results, arguments.instrument)
+    print(f'{len(results)} puzzles in {time.perf_counter() - wall:.3f} s')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
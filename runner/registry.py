@@ -0,0 +1,96 @@
+import importlib.util
+import sys
+from collections import namedtuple
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# A puzzle's solver module, entry function and the arguments it takes after the input file
+Puzzle = namedtuple('Puzzle', ['day', 'part', 'path', 'function', 'arguments'])
+
+PUZZLES = {
+    (1, 1): Puzzle(1, 1, ROOT / 'day01' / 'problem01' / 'main.py', 'get_sum_digit_values', ()),
+    (1, 2): Puzzle(1, 2, ROOT / 'day01' / 'problem02' / 'main.py', 'get_sum_any_numeric_values', ()),
+    (2, 1): Puzzle(2, 1, ROOT / 'day02' / 'problem01' / 'main.py', 'get_sum_of_possible_game_numbers', (12, 13, 14)),
+    (2, 2): Puzzle(2, 2, ROOT / 'day02' / 'problem02' / 'main.py',
+                   'get_sum_of_power_of_minimum_required_cubes_for_each_color', ()),
+    (3, 1): Puzzle(3, 1, ROOT / 'day03' / 'problem01' / 'main.py', 'sum_of_part_numbers', ()),
+    (3, 2): Puzzle(3, 2, ROOT / 'day03' / 'problem02' / 'main.py', 'sum_of_gear_ratios', ()),
+    (4, 1): Puzzle(4, 1, ROOT / 'day04' / 'problem01' / 'main.py', 'get_results', ()),
+    (4, 2): Puzzle(4, 2, ROOT / 'day04' / 'problem02' / 'main.py', 'get_total_instances', ()),
+}
+
+
+def get_module_name(day: int, part: int) -> str:
+    """Names the module of a puzzle's solver, since every solver file is called main.py.
+    Returns the module name.
+    >>> get_module_name(3, 1)
+    'day03_problem01_main'
+    """
+    return f'day{day:02d}_problem{part:02d}_main'
+
+
+def load_module(day: int, part: int) -> ModuleType:
+    """Imports the solver module of a puzzle from its path, once per process.
+    The module is registered in sys.modules under get_module_name, so its functions can be
+    pickled by name for worker processes.
+    Returns the module.
+    >>> load_module(3, 1) is load_module(3, 1)
+    True
+    """
+    name = get_module_name(day, part)
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.spec_from_file_location(name, PUZZLES[(day, part)].path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+
+    return module
+
+
+def get_entry(day: int, part: int) -> Callable:
+    """Uses load_module to find the entry function of a puzzle.
+    Returns the entry function, called with the input file followed by the puzzle's arguments.
+    >>> get_entry(3, 1).__name__
+    'sum_of_part_numbers'
+    """
+    return getattr(load_module(day, part), PUZZLES[(day, part)].function)
+
+
+def get_input_file(day: int, part: int) -> str:
+    """Returns the real puzzle input of a puzzle, next to its solver module."""
+    return str(PUZZLES[(day, part)].path.parent / 'resources' / 'input.txt')
+
+
+def parse_puzzle_keys(specs: List[str]) -> List[Tuple[int, int]]:
+    """Turns puzzle specs like '3' (both parts of day 3) or '3.2' (part 2 of day 3) into registry keys.
+    No specs select every puzzle.
+    Returns the list of (day, part) keys in registry order.
+    >>> parse_puzzle_keys(['3', '1.2'])
+    [(1, 2), (3, 1), (3, 2)]
+    >>> parse_puzzle_keys(['5'])
+    Traceback (most recent call last):
+    ...
+    ValueError: No puzzle matches '5'
+    """
+    if not specs:
+        return list(PUZZLES)
+
+    keys = set()
+    for spec in specs:
+        day, _, part = spec.partition('.')
+        matches = [key for key in PUZZLES if key[0] == int(day) and (not part or key[1] == int(part))]
+        if not matches:
+            raise ValueError(f'No puzzle matches {spec!r}')
+        keys.update(matches)
+
+    return [key for key in PUZZLES if key in keys]
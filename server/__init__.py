@@ -0,0 +1 @@
+"""Answers puzzle requests from warm solver processes over a local socket, see python -m server --help."""
@@ -0,0 +1,33 @@
+import argparse
+import asyncio
+import sys
+
+from server.service import ANSWER_CACHE_SIZE, serve
+
+
+def main(argv: list | None = None) -> int:
+    """Serves solve requests until interrupted."""
+    parser = argparse.ArgumentParser(
+        prog='python -m server',
+        description='Answers puzzle requests from warm solver processes. Send one JSON object per line, like '
+                    '{"id": 1, "day": 2, "part": 1, "file": "input.txt", "arguments": [12, 13, 14]}; '
+                    'file and arguments default to the real input and the registry arguments.')
+    parser.add_argument('--host', default='127.0.0.1', help='TCP host to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8023, help='TCP port to listen on (default: %(default)s)')
+    parser.add_argument('--unix', metavar='PATH', default=None, help='listen on a Unix socket at PATH instead')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='worker processes for the solves, default one per CPU')
+    parser.add_argument('--cache-size', type=int, default=ANSWER_CACHE_SIZE,
+                        help='answers kept for repeated requests (default: %(default)s)')
+    arguments = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(arguments.host, arguments.port, arguments.unix, arguments.workers, arguments.cache_size))
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
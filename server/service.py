@@ -0,0 +1,286 @@
+import asyncio
+import json
+import os
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Tuple
+
+from common.cache import unpack_integers
+from runner.registry import get_entry, get_input_file, load_module, PUZZLES
+
+ANSWER_CACHE_SIZE = 4096
+PARSED_INPUTS_SIZE = 64  # Parsed inputs each worker keeps, see solve
+STREAM_LIMIT = 1 << 20  # Longest request line accepted
+
+# A puzzle to solve: the (day, part) registry key, the input file and the arguments after the file
+Request = namedtuple('Request', ['day', 'part', 'file', 'arguments'])
+# How a worker answers a puzzle from a parsed input it keeps: prepare(module, file) parses the input
+# once, then answer(module, parsed, *arguments) gives the answer for the request's arguments
+WarmPuzzle = namedtuple('WarmPuzzle', ['prepare', 'answer'])
+
+WARM_PUZZLES = {
+    (1, 1): WarmPuzzle(lambda module, file: module.get_line_values(file)[0],
+                       lambda module, values: sum(values)),
+    (1, 2): WarmPuzzle(lambda module, file: module.get_line_values(file)[0],
+                       lambda module, values: sum(values)),
+    # Every limit triple is a GameIndex query, so what-if limits never reparse the game log
+    (2, 1): WarmPuzzle(lambda module, file: module.GameIndex(module.parse_game_columns(file)),
+                       lambda module, index, max_red, max_green, max_blue: index.query(max_red, max_green, max_blue)),
+    (2, 2): WarmPuzzle(lambda module, file: module.parse_game_columns(file),
+                       lambda module, columns: module.get_sum_of_power_from_columns(columns)),
+    # The arrays are packed by pack_integers, so part numbers over 64 bits come back as their text
+    (3, 1): WarmPuzzle(lambda module, file: unpack_integers(module.get_grid_part_number_array(file)[0]),
+                       lambda module, part_numbers: sum(part_numbers)),
+    (3, 2): WarmPuzzle(lambda module, file: [unpack_integers(numbers)
+                                             for numbers in module.get_grid_gear_pair_arrays(file)],
+                       lambda module, gear_pairs: sum(first * second for first, second in zip(*gear_pairs))),
+    (4, 1): WarmPuzzle(lambda module, file: module.get_match_count_array(file)[0],
+                       lambda module, match_counts: sum(module.scorer(match_count) for match_count in match_counts)),
+    (4, 2): WarmPuzzle(lambda module, file: module.get_match_count_array(file)[0],
+                       lambda module, match_counts: sum(module.iter_card_instances(match_counts))),
+}
+
+# Parsed inputs of this worker process by get_input_key, least recently used first
+parsed_inputs = OrderedDict()
+
+
+def parse_request(message: Any) -> Request:
+    """Reads a decoded request, a JSON object with a day and a part and optionally a file and arguments,
+    which default to the puzzle's real input and registry arguments.
+    Returns the Request; raises ValueError for a malformed request or an unknown puzzle.
+    >>> parse_request({'day': 2, 'part': 1, 'file': 'games.txt', 'arguments': [12, 13, 14]})
+    Request(day=2, part=1, file='games.txt', arguments=(12, 13, 14))
+    >>> parse_request({'day': 2, 'part': 1}).arguments
+    (12, 13, 14)
+    >>> parse_request({'day': 9, 'part': 1})
+    Traceback (most recent call last):
+    ...
+    ValueError: No puzzle 9.1
+    """
+    if not isinstance(message, dict) or not isinstance(message.get('day'), int) \
+            or not isinstance(message.get('part'), int):
+        raise ValueError('A request needs an integer day and part')
+
+    day, part = message['day'], message['part']
+    if (day, part) not in PUZZLES:
+        raise ValueError(f'No puzzle {day}.{part}')
+
+    file = message.get('file') or get_input_file(day, part)
+    arguments = message.get('arguments')
+    arguments = PUZZLES[(day, part)].arguments if arguments is None else tuple(arguments)
+
+    return Request(day, part, file, arguments)
+
+
+def get_request_key(request: Request) -> tuple:
+    """Identifies the answer of a request, with the size and modification time of its input file
+    so an answer is not reused once the file changes.
+    Returns the key; raises ValueError if the file does not exist.
+    """
+    path = os.path.abspath(request.file)
+    try:
+        status = os.stat(path)
+    except OSError as error:
+        raise ValueError(f'Cannot read {request.file}: {error.strerror}') from None
+
+    return request.day, request.part, path, status.st_size, status.st_mtime_ns, request.arguments
+
+
+def get_input_key(request_key: tuple) -> tuple:
+    """Drops the arguments from a get_request_key key, since requests that differ only in their arguments
+    share the parsed input.
+    Returns the key of the parsed input.
+    """
+    return request_key[:5]
+
+
+def warm_worker() -> None:
+    """Imports every solver module in a worker process as it starts, so their module-level regexes are
+    compiled once per worker rather than once per request."""
+    for day, part in PUZZLES:
+        load_module(day, part)
+
+
+def solve(request: Request, input_key: tuple) -> Tuple[Any, bool]:
+    """Answers the request's puzzle in a warm worker process from the parsed input kept under input_key,
+    parsing it with the puzzle's WARM_PUZZLES entry first if the worker does not have it yet.
+    The PARSED_INPUTS_SIZE most recently used parsed inputs are kept. Puzzles without an entry
+    call their entry function.
+    Returns the answer, and whether the parsed input was already kept.
+    >>> request = Request(2, 1, get_input_file(2, 1), (12, 13, 14))
+    >>> input_key = get_input_key(get_request_key(request))
+    >>> solve(request, input_key), solve(request._replace(arguments=(20, 20, 20)), input_key)
+    ((2156, False), (5050, True))
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile('wb', suffix='.txt', delete=False) as f:
+    ...     _ = f.write(b'12345678901234567890*2\\n')
+    >>> [solve(Request(3, part, f.name, ()), (3, part, f.name))[0] for part in (1, 2)]
+    [12345678901234567892, 24691357802469135780]
+    >>> os.remove(f.name)
+    """
+    warm_puzzle = WARM_PUZZLES.get((request.day, request.part))
+    if warm_puzzle is None:
+        return get_entry(request.day, request.part)(request.file, *request.arguments), False
+
+    module = load_module(request.day, request.part)
+    parsed = parsed_inputs.get(input_key)
+    is_warm = parsed is not None
+    if is_warm:
+        parsed_inputs.move_to_end(input_key)
+    else:
+        parsed = warm_puzzle.prepare(module, request.file)
+        parsed_inputs[input_key] = parsed
+        if len(parsed_inputs) > PARSED_INPUTS_SIZE:
+            parsed_inputs.popitem(last=False)
+
+    return warm_puzzle.answer(module, parsed, *request.arguments), is_warm
+
+
+class SolveServer:
+    """Serves solve requests, one JSON object per line, on a local TCP or Unix socket.
+    CPU-bound solves run in a pool of worker processes that keep the solver modules imported and,
+    through solve, the parsed inputs. A pool broken by a crashed worker is replaced, and the requests
+    it was solving get an error.
+    Answers are kept in an LRU cache keyed by get_request_key, and concurrent requests with the same key
+    share the one solve in flight, so a burst of identical queries costs a single solve.
+    Each response is a JSON line with the request's id and either the answer and where it came from
+    ('solved', 'coalesced' or 'cached') or an error.
+    >>> async def ask(messages):
+    ...     async with SolveServer(workers=1) as service:
+    ...         server = await service.start(port=0)
+    ...         reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+    ...         writer.write(b''.join(json.dumps(message).encode() + b'\\n' for message in messages))
+    ...         responses = sorted([json.loads(await reader.readline()) for _ in messages], key=lambda r: r['id'])
+    ...         writer.write(json.dumps(messages[0]).encode() + b'\\n')
+    ...         responses.append(json.loads(await reader.readline()))
+    ...         writer.close()
+    ...         return responses, dict(sorted(service.stats.items()))
+    >>> responses, stats = asyncio.run(ask([{'id': 1, 'day': 3, 'part': 1}, {'id': 2, 'day': 3, 'part': 1}, \
+{'id': 3, 'day': 3}, {'id': 4, 'day': 2, 'part': 1}, {'id': 5, 'day': 2, 'part': 1, 'arguments': [20, 20, 20]}]))
+    >>> responses
+    [{'id': 1, 'answer': 512794, 'source': 'solved'}, {'id': 2, 'answer': 512794, 'source': 'coalesced'}, \
+{'id': 3, 'error': 'A request needs an integer day and part'}, {'id': 4, 'answer': 2156, 'source': 'solved'}, \
+{'id': 5, 'answer': 5050, 'source': 'solved'}, {'id': 1, 'answer': 512794, 'source': 'cached'}]
+    >>> stats
+    {'cached': 1, 'coalesced': 1, 'errors': 1, 'solved': 3, 'warm_inputs': 1}
+    """
+
+    def __init__(self, workers: int | None = None, cache_size: int = ANSWER_CACHE_SIZE):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.executor = None
+        self.answers = OrderedDict()
+        self.in_flight = {}
+        self.stats = Counter()
+
+    async def __aenter__(self) -> 'SolveServer':
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+        return self
+
+    async def __aexit__(self, *exception) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+    async def solve(self, request: Request) -> Tuple[Any, str]:
+        """Answers a request from the answer cache, from the identical solve in flight or from a new solve
+        in the worker pool.
+        Returns the answer and its source.
+        """
+        key = get_request_key(request)
+        if key in self.answers:
+            self.answers.move_to_end(key)
+            return self.answers[key], 'cached'
+
+        future = self.in_flight.get(key)
+        if future is not None:
+            return (await asyncio.shield(future))[0], 'coalesced'
+
+        executor = self.executor
+        try:
+            future = asyncio.get_running_loop().run_in_executor(executor, solve, request, get_input_key(key))
+        except BrokenProcessPool:
+            self.replace_executor(executor)
+            raise
+        self.in_flight[key] = future
+        try:
+            answer, is_warm = await asyncio.shield(future)
+        except BrokenProcessPool:
+            self.replace_executor(executor)
+            raise
+        finally:
+            del self.in_flight[key]
+        if is_warm:
+            self.stats['warm_inputs'] += 1
+
+        self.answers[key] = answer
+        if len(self.answers) > self.cache_size:
+            self.answers.popitem(last=False)
+        return answer, 'solved'
+
+    def replace_executor(self, broken: ProcessPoolExecutor) -> None:
+        """Starts a new worker pool in place of broken, unless another request already replaced it."""
+        if self.executor is not broken:
+            return
+
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+        self.stats['pool_restarts'] += 1
+
+    async def respond(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        """Answers one request line, writing the response line, with the request's id if it has one, to writer."""
+        request_id = None
+        try:
+            message = json.loads(line)
+            if isinstance(message, dict):
+                request_id = message.get('id')
+            request = parse_request(message)
+            answer, source = await self.solve(request)
+            response = {'id': request_id, 'answer': answer, 'source': source}
+        except Exception as error:  # Reported to the client, the server keeps going
+            source = 'errors'
+            response = {'id': request_id, 'error': str(error) or type(error).__name__}
+        self.stats[source] += 1
+
+        if not writer.is_closing():
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Reads request lines from a client until it disconnects. Requests are answered concurrently,
+        so responses can come back out of order and are matched to their requests by id.
+        """
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(self.respond(line, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except (ConnectionError, ValueError):  # The client went away, or sent a line over STREAM_LIMIT
+            pass
+        except asyncio.CancelledError:  # The server is shutting down
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, unix_path: str | None = None) -> asyncio.Server:
+        """Starts listening on a Unix socket at unix_path, or else on the TCP host and port.
+        Returns the asyncio.Server.
+        """
+        if unix_path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, unix_path, limit=STREAM_LIMIT)
+
+        return await asyncio.start_server(self.handle_connection, host, port, limit=STREAM_LIMIT)
+
+
+async def serve(host: str = '127.0.0.1', port: int = 0, unix_path: str | None = None, workers: int | None = None,
+                cache_size: int = ANSWER_CACHE_SIZE) -> None:
+    """Runs a SolveServer until it is cancelled, printing where it listens."""
+    async with SolveServer(workers, cache_size) as service:
+        server = await service.start(host, port, unix_path)
+        addresses = [str(socket.getsockname()) for socket in server.sockets]
+        print('Serving on', ', '.join(addresses), flush=True)
+        async with server:
+            await server.serve_forever()